@@ -7,11 +7,12 @@ from sqlalchemy import pool
 
 from alembic import context
 
-# Dodaj ścieżkę do głównego modułu aplikacji
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Dodaj ścieżkę do katalogu backend, żeby importować pakiet app (main używa importów względnych)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 # Importuj modele SQLModel
-from main import KnowledgeItem, SQLModel
+from app.main import KnowledgeItem, SQLModel
+from app.search import SEARCH_DB_OBJECTS
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -32,6 +33,13 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Pomijaj obiekty wyszukiwania tworzone ręcznym DDL (nie ma ich w metadata)."""
+    if name in SEARCH_DB_OBJECTS:
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -58,6 +66,7 @@ def run_migrations_offline():
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         compare_server_default=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -83,6 +92,7 @@ def run_migrations_online():
             target_metadata=target_metadata,
             compare_type=True,
             compare_server_default=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,43 @@
+"""pgvector embedding columns and HNSW index
+
+Revision ID: 3c1f9a2b7d4e
+Revises: ed73b2e67be3
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a2b7d4e'
+down_revision = 'ed73b2e67be3'
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIMENSIONS = 384
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+    # double precision[] -> vector(384); pgvector ma wbudowane rzutowanie z tablic liczb
+    for column in ("embedding", "tags_embedding"):
+        op.execute(
+            f"ALTER TABLE knowledgeitem ALTER COLUMN {column} "
+            f"TYPE vector({EMBEDDING_DIMENSIONS}) USING {column}::vector({EMBEDDING_DIMENSIONS})"
+        )
+
+    # Indeks ANN dla zapytań ORDER BY embedding <=> :q LIMIT k
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_knowledgeitem_embedding_hnsw ON knowledgeitem "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_knowledgeitem_embedding_hnsw")
+    for column in ("embedding", "tags_embedding"):
+        op.execute(
+            f"ALTER TABLE knowledgeitem ALTER COLUMN {column} "
+            f"TYPE double precision[] USING {column}::real[]::double precision[]"
+        )
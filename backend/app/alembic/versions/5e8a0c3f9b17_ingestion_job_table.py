@@ -0,0 +1,40 @@
+"""ingestion_job table for asynchronous PDF uploads
+
+Revision ID: 5e8a0c3f9b17
+Revises: c47e1d9b5f23
+Create Date: 2026-10-18 13:41:56.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a0c3f9b17'
+down_revision = 'c47e1d9b5f23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ingestion_job',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('original_filename', sa.String(), nullable=False),
+        sa.Column('tags', sa.ARRAY(sa.String()), nullable=True),
+        sa.Column('pages_total', sa.Integer(), nullable=True),
+        sa.Column('pages_extracted', sa.Integer(), nullable=False),
+        sa.Column('chunks_total', sa.Integer(), nullable=True),
+        sa.Column('chunks_embedded', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('ingestion_job')
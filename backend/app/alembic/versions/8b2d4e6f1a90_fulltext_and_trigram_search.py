@@ -0,0 +1,48 @@
+"""full-text and trigram search indexes
+
+Revision ID: 8b2d4e6f1a90
+Revises: 3c1f9a2b7d4e
+Create Date: 2026-10-18 11:02:17.540331
+
+Treść w search_vector jest przycięta do FTS_CONTENT_CHARS znaków - tsvector ma limit 1 MB
+i dla dużych PDF-ów zapis elementu kończyłby się błędem (app/search.py).
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4e6f1a90'
+down_revision = '3c1f9a2b7d4e'
+branch_labels = None
+depends_on = None
+
+FTS_CONTENT_CHARS = 100000
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION knowledge_tags_text(tags text[]) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT lower(coalesce(array_to_string(tags, ' '), '')) $$
+    """)
+    # Wagi: A - tytuł, B - tagi, C - treść
+    op.execute(f"""
+        ALTER TABLE knowledgeitem ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', knowledge_tags_text(tags)), 'B') ||
+            setweight(to_tsvector('simple', left(coalesce(text_content, ''), {FTS_CONTENT_CHARS})), 'C')
+        ) STORED
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_knowledgeitem_search_vector ON knowledgeitem USING gin (search_vector)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_knowledgeitem_title_trgm ON knowledgeitem USING gin (lower(title) gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_knowledgeitem_tags_trgm ON knowledgeitem USING gin (knowledge_tags_text(tags) gin_trgm_ops)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_knowledgeitem_tags_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_knowledgeitem_title_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_knowledgeitem_search_vector")
+    op.execute("ALTER TABLE knowledgeitem DROP COLUMN IF EXISTS search_vector")
+    op.execute("DROP FUNCTION IF EXISTS knowledge_tags_text(text[])")
@@ -0,0 +1,27 @@
+"""keyset listing indexes on created_at/updated_at and GIN index on tags
+
+Revision ID: 9d3b6a1e4c58
+Revises: 5e8a0c3f9b17
+Create Date: 2026-10-18 14:27:09.775310
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3b6a1e4c58'
+down_revision = '5e8a0c3f9b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_knowledgeitem_created_at_id', 'knowledgeitem', ['created_at', 'id'])
+    op.create_index('ix_knowledgeitem_updated_at_id', 'knowledgeitem', ['updated_at', 'id'])
+    op.create_index('ix_knowledgeitem_tags_gin', 'knowledgeitem', ['tags'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_knowledgeitem_tags_gin', table_name='knowledgeitem')
+    op.drop_index('ix_knowledgeitem_updated_at_id', table_name='knowledgeitem')
+    op.drop_index('ix_knowledgeitem_created_at_id', table_name='knowledgeitem')
@@ -0,0 +1,43 @@
+"""content hash and embedding cache
+
+Revision ID: a6c2e8f0d3b5
+Revises: e2f7c9a4b6d1
+Create Date: 2026-10-18 16:12:05.417320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c2e8f0d3b5'
+down_revision = 'e2f7c9a4b6d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('knowledgeitem', sa.Column('content_hash', sa.String(), nullable=True))
+    op.create_index('ix_knowledgeitem_content_hash', 'knowledgeitem', ['content_hash'])
+    # Notatki: hash liczony z treści tak jak w aplikacji (sha256 z UTF-8). PDF-y dostaną hash
+    # przy następnym uploadzie - bajtów pliku nie da się odtworzyć z text_content.
+    op.execute(
+        "UPDATE knowledgeitem SET content_hash = encode(sha256(convert_to(text_content, 'UTF8')), 'hex') "
+        "WHERE original_filename IS NULL"
+    )
+
+    op.create_table(
+        'embedding_cache',
+        sa.Column('text_hash', sa.String(), nullable=False),
+        sa.Column('model_name', sa.String(), nullable=False),
+        sa.Column('embedding', Vector(384), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('text_hash', 'model_name'),
+    )
+
+
+def downgrade():
+    op.drop_table('embedding_cache')
+    op.drop_index('ix_knowledgeitem_content_hash', table_name='knowledgeitem')
+    op.drop_column('knowledgeitem', 'content_hash')
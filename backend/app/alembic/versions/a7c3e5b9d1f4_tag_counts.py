@@ -0,0 +1,66 @@
+"""tag counts maintained by a trigger on knowledgeitem
+
+Revision ID: a7c3e5b9d1f4
+Revises: d5a1f7c3e9b2
+Create Date: 2026-10-18 20:14:09.532871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5b9d1f4'
+down_revision = 'd5a1f7c3e9b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tag_count',
+        sa.Column('tag', sa.String(), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('tag'),
+    )
+    # Trigger liczy tylko różnicę starych i nowych tagów; blokady wierszy w kolejności tagów
+    op.execute("""
+        CREATE OR REPLACE FUNCTION knowledge_tag_counts() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            old_tags text[] := '{}';
+            new_tags text[] := '{}';
+            removed_tag text;
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN old_tags := coalesce(OLD.tags, '{}'); END IF;
+            IF TG_OP <> 'DELETE' THEN new_tags := coalesce(NEW.tags, '{}'); END IF;
+            FOR removed_tag IN
+                SELECT DISTINCT t FROM unnest(old_tags) AS t WHERE NOT t = ANY(new_tags) ORDER BY t
+            LOOP
+                UPDATE tag_count SET item_count = item_count - 1 WHERE tag = removed_tag;
+            END LOOP;
+            DELETE FROM tag_count WHERE tag = ANY(old_tags) AND item_count <= 0;
+            INSERT INTO tag_count (tag, item_count)
+            SELECT DISTINCT t, 1 FROM unnest(new_tags) AS t WHERE NOT t = ANY(old_tags) ORDER BY t
+            ON CONFLICT (tag) DO UPDATE SET item_count = tag_count.item_count + 1;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE OR REPLACE TRIGGER knowledgeitem_tag_counts
+        AFTER INSERT OR DELETE OR UPDATE OF tags ON knowledgeitem
+        FOR EACH ROW EXECUTE FUNCTION knowledge_tag_counts()
+    """)
+    op.execute("""
+        INSERT INTO tag_count (tag, item_count)
+        SELECT t, count(DISTINCT k.id) FROM knowledgeitem AS k, unnest(k.tags) AS t
+        GROUP BY t
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS knowledgeitem_tag_counts ON knowledgeitem")
+    op.execute("DROP FUNCTION IF EXISTS knowledge_tag_counts()")
+    op.drop_table('tag_count')
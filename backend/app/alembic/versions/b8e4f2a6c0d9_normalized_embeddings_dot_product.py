@@ -0,0 +1,62 @@
+"""normalized embeddings with dot-product indexes and optional halfvec storage
+
+Revision ID: b8e4f2a6c0d9
+Revises: f1b7d3c9e5a2
+Create Date: 2026-10-18 17:20:44.518306
+
+Embeddingi są normalizowane (l2_normalize), a indeksy HNSW przechodzą z vector_cosine_ops
+na *_ip_ops. Format kolumn wynika z EMBEDDING_STORAGE (vector | halfvec) w chwili migracji;
+zmiana formatu później: `alembic downgrade f1b7d3c9e5a2 && alembic upgrade head`
+z nową wartością EMBEDDING_STORAGE. Wymaga pgvector >= 0.7 (halfvec, l2_normalize).
+"""
+import os
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4f2a6c0d9'
+down_revision = 'f1b7d3c9e5a2'
+branch_labels = None
+depends_on = None
+
+DIMENSIONS = 384
+
+# (tabela, kolumna, nazwa indeksu HNSW albo None)
+EMBEDDING_COLUMNS = [
+    ('knowledgeitem', 'embedding', 'ix_knowledgeitem_embedding_hnsw'),
+    ('knowledgeitem', 'tags_embedding', 'ix_knowledgeitem_tags_embedding_hnsw'),
+    ('knowledge_chunk', 'embedding', 'ix_knowledge_chunk_embedding_hnsw'),
+    ('embedding_cache', 'embedding', None),
+]
+
+
+def _convert(storage: str, ops: str):
+    for table, column, index in EMBEDDING_COLUMNS:
+        if index:
+            op.drop_index(index, table_name=table)
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {storage}({DIMENSIONS}) "
+            f"USING l2_normalize({column})::{storage}({DIMENSIONS})"
+        )
+        if index:
+            op.create_index(
+                index,
+                table,
+                [column],
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={column: ops},
+            )
+
+
+def upgrade():
+    storage = os.getenv('EMBEDDING_STORAGE', 'vector')
+    if storage not in ('vector', 'halfvec'):
+        raise ValueError(f"Unsupported EMBEDDING_STORAGE: {storage}")
+    _convert(storage, f'{storage}_ip_ops')
+
+
+def downgrade():
+    # Wektory zostają znormalizowane - dla odległości kosinusowej to bez znaczenia
+    _convert('vector', 'vector_cosine_ops')
@@ -0,0 +1,38 @@
+"""corpus state version and change log for in-memory vector index
+
+Revision ID: c3d9a7e1f4b8
+Revises: b8e4f2a6c0d9
+Create Date: 2026-10-18 17:58:12.730461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9a7e1f4b8'
+down_revision = 'b8e4f2a6c0d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'corpus_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute("INSERT INTO corpus_state (id, version) VALUES (1, 0)")
+    # Bez klucza obcego do knowledgeitem - wpisy usuniętych elementów zostają jako tombstone
+    op.create_table(
+        'corpus_change',
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('version', 'item_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('corpus_change')
+    op.drop_table('corpus_state')
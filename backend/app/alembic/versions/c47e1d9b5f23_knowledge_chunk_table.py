@@ -0,0 +1,42 @@
+"""knowledge_chunk table for page-aware chunk embeddings
+
+Revision ID: c47e1d9b5f23
+Revises: 8b2d4e6f1a90
+Create Date: 2026-10-18 12:20:03.118442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e1d9b5f23'
+down_revision = '8b2d4e6f1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'knowledge_chunk',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('page', sa.Integer(), nullable=True),
+        sa.Column('chunk_offset', sa.Integer(), nullable=False),
+        sa.Column('chunk_length', sa.Integer(), nullable=False),
+        sa.Column('embedding', Vector(384), nullable=True),
+        sa.ForeignKeyConstraint(['item_id'], ['knowledgeitem.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_knowledge_chunk_item_id', 'knowledge_chunk', ['item_id'])
+    op.execute(
+        "CREATE INDEX ix_knowledge_chunk_embedding_hnsw ON knowledge_chunk "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_knowledge_chunk_embedding_hnsw', table_name='knowledge_chunk')
+    op.drop_index('ix_knowledge_chunk_item_id', table_name='knowledge_chunk')
+    op.drop_table('knowledge_chunk')
@@ -0,0 +1,27 @@
+"""chunk offset in the item's full text for search snippets
+
+Revision ID: d5a1f7c3e9b2
+Revises: c3d9a7e1f4b8
+Create Date: 2026-10-18 19:02:44.118307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a1f7c3e9b2'
+down_revision = 'c3d9a7e1f4b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('knowledge_chunk', sa.Column('content_offset', sa.Integer(), nullable=True))
+    # Notatki mają jedną "stronę" - offset w stronie jest offsetem w całym tekście. Fragmentom PDF-ów
+    # sprzed migracji brakuje długości stron, więc zostają z NULL (snippet z ts_headline albo podglądu).
+    op.execute("UPDATE knowledge_chunk SET content_offset = chunk_offset WHERE page IS NULL")
+
+
+def downgrade():
+    op.drop_column('knowledge_chunk', 'content_offset')
@@ -0,0 +1,35 @@
+"""bulk import checkpoints and job counters
+
+Revision ID: e2f7c9a4b6d1
+Revises: 9d3b6a1e4c58
+Create Date: 2026-10-18 15:36:48.201937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f7c9a4b6d1'
+down_revision = '9d3b6a1e4c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ingest_checkpoint',
+        sa.Column('source_key', sa.String(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['knowledgeitem.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('source_key'),
+    )
+    op.add_column('ingestion_job', sa.Column('items_imported', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('ingestion_job', sa.Column('items_skipped', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('ingestion_job', 'items_skipped')
+    op.drop_column('ingestion_job', 'items_imported')
+    op.drop_table('ingest_checkpoint')
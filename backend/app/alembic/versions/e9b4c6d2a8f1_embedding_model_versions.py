@@ -0,0 +1,54 @@
+"""embedding model per vector and embedding migration state
+
+Revision ID: e9b4c6d2a8f1
+Revises: a7c3e5b9d1f4
+Create Date: 2026-10-18 21:37:52.104683
+
+Istniejące wektory dostają model z EMBEDDING_MODEL w chwili migracji (tym modelem były liczone).
+Zmiana modelu później: app/reembed.py.
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b4c6d2a8f1'
+down_revision = 'a7c3e5b9d1f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    model_name = os.getenv('EMBEDDING_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
+    op.add_column('knowledgeitem', sa.Column('embedding_model', sa.String(), nullable=True))
+    op.add_column('knowledge_chunk', sa.Column('embedding_model', sa.String(), nullable=True))
+    op.execute(
+        sa.text(
+            "UPDATE knowledgeitem SET embedding_model = :model "
+            "WHERE embedding IS NOT NULL OR tags_embedding IS NOT NULL"
+        ).bindparams(model=model_name)
+    )
+    op.execute(
+        sa.text("UPDATE knowledge_chunk SET embedding_model = :model WHERE embedding IS NOT NULL").bindparams(model=model_name)
+    )
+    op.create_table(
+        'embedding_migration',
+        sa.Column('model_name', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('items_total', sa.Integer(), nullable=False),
+        sa.Column('items_done', sa.Integer(), nullable=False),
+        sa.Column('chunks_done', sa.Integer(), nullable=False),
+        sa.Column('last_item_id', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('model_name'),
+    )
+
+
+def downgrade():
+    op.drop_table('embedding_migration')
+    op.drop_column('knowledge_chunk', 'embedding_model')
+    op.drop_column('knowledgeitem', 'embedding_model')
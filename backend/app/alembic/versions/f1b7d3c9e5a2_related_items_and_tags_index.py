@@ -0,0 +1,44 @@
+"""related item lists and tags embedding index
+
+Revision ID: f1b7d3c9e5a2
+Revises: a6c2e8f0d3b5
+Create Date: 2026-10-18 16:48:31.902214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d3c9e5a2'
+down_revision = 'a6c2e8f0d3b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_knowledgeitem_tags_embedding_hnsw',
+        'knowledgeitem',
+        ['tags_embedding'],
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'tags_embedding': 'vector_cosine_ops'},
+    )
+    # Listy wypełnia `python -m app.related` (albo leniwie pierwsze wywołanie /related dla elementu)
+    op.create_table(
+        'item_neighbor',
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), nullable=False),
+        sa.Column('similarity', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['knowledgeitem.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['neighbor_id'], ['knowledgeitem.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('item_id', 'neighbor_id'),
+    )
+    op.create_index('ix_item_neighbor_neighbor_id', 'item_neighbor', ['neighbor_id'])
+
+
+def downgrade():
+    op.drop_index('ix_item_neighbor_neighbor_id', table_name='item_neighbor')
+    op.drop_table('item_neighbor')
+    op.drop_index('ix_knowledgeitem_tags_embedding_hnsw', table_name='knowledgeitem')
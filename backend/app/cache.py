@@ -0,0 +1,229 @@
+# knowledge-assistant/backend/app/cache.py
+# Cache embeddingów zapytań i wyników wyszukiwania: Redis (REDIS_URL) albo LRU w procesie.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .models import EMBEDDING_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+# Czas życia wpisów (sekundy)
+QUERY_EMBEDDING_TTL = int(os.getenv("QUERY_EMBEDDING_TTL", str(24 * 3600)))
+SEARCH_RESULT_TTL = int(os.getenv("SEARCH_RESULT_TTL", "600"))
+# Rozmiar LRU w procesie (używany, gdy Redis nie jest dostępny)
+MEMORY_CACHE_ENTRIES = int(os.getenv("MEMORY_CACHE_ENTRIES", "2048"))
+
+_KEY_PREFIX = "ka:"
+_CORPUS_VERSION_KEY = f"{_KEY_PREFIX}corpus_version"
+
+
+class MemoryCacheBackend:
+    """LRU z TTL w pamięci procesu - fallback bez Redisa.
+
+    Licznik wersji korpusu jest tu per proces: zapis w jednym workerze gunicorna nie podbiłby go
+    w pozostałych. Dlatego bez współdzielonego backendu wyniki wyszukiwania są kluczowane wersją
+    z bazy (corpus_state) - patrz SearchCache.shared.
+    """
+
+    shared = False # Widoczny tylko w tym procesie
+
+    def __init__(self, max_entries: int = MEMORY_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCacheBackend:
+    """Wspólny cache dla wszystkich workerów; błędy Redisa traktujemy jak brak wpisu."""
+
+    shared = True
+
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self._client.set(key, value, ex=ttl)
+
+    def get_counter(self, key: str) -> int:
+        value = self._client.get(key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(key))
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """Dwa poziomy cache:
+
+    - embedding zapytania: klucz (model, znormalizowany tekst), wektor jako float32 bytes,
+    - wyniki wyszukiwania: klucz (wersja korpusu, zapytanie, top_k, threshold); podbicie wersji
+      przy każdym zapisie unieważnia wszystkie wyniki naraz, bez przeszukiwania kluczy.
+    """
+
+    def __init__(self, backend, model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+        self._stats = {"embedding_hits": 0, "embedding_misses": 0, "result_hits": 0, "result_misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    @property
+    def shared(self) -> bool:
+        """Czy wersja korpusu w cache jest wspólna dla workerów; jeśli nie, wołający podaje wersję z bazy."""
+        return self.backend.shared
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning("Cache get failed: %s", e)
+            return None
+
+    def _set(self, key: str, value: bytes, ttl: int):
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            self._count("errors")
+            logger.warning("Cache set failed: %s", e)
+
+    # --- Embedding zapytania ---
+    def query_embedding(self, query: str, compute: Callable[[str], List[float]], model_name: Optional[str] = None) -> List[float]:
+        """model_name - inny model niż aktywny (zapytania do wierszy poprzedniego modelu w trakcie migracji)."""
+        normalized = normalize_query(query)
+        # "unit" - wektory znormalizowane; wpisy sprzed normalizacji nie są już odczytywane
+        key = f"{_KEY_PREFIX}emb:{_digest(model_name or self.model_name, 'unit', normalized)}"
+        cached = self._get(key)
+        if cached is not None:
+            self._count("embedding_hits")
+            return np.frombuffer(cached, dtype=np.float32).tolist()
+        self._count("embedding_misses")
+        embedding = compute(normalized)
+        self._set(key, np.asarray(embedding, dtype=np.float32).tobytes(), QUERY_EMBEDDING_TTL)
+        return embedding
+
+    # --- Wersja korpusu ---
+    def corpus_version(self) -> int:
+        try:
+            return self.backend.get_counter(_CORPUS_VERSION_KEY)
+        except Exception as e:
+            self._count("errors")
+            logger.warning("Cache version read failed: %s", e)
+            return -1 # Wersja nieznana - wyników nie cache'ujemy
+
+    def bump_corpus_version(self):
+        """Wywoływane po każdym dodaniu, edycji i usunięciu elementu."""
+        try:
+            self.backend.incr(_CORPUS_VERSION_KEY)
+        except Exception as e:
+            self._count("errors")
+            logger.warning("Cache version bump failed: %s", e)
+
+    # --- Wyniki wyszukiwania ---
+    def _result_key(self, version: int, query: str, *params) -> str:
+        return f"{_KEY_PREFIX}search:{version}:{_digest(query.lower(), *params)}"
+
+    def get_results(self, query: str, *params, version: Optional[int] = None) -> Optional[list]:
+        version = self.corpus_version() if version is None else version
+        if version < 0:
+            return None
+        cached = self._get(self._result_key(version, query, *params))
+        if cached is None:
+            self._count("result_misses")
+            return None
+        self._count("result_hits")
+        return json.loads(cached)
+
+    def set_results(self, query: str, *params, results: list, version: Optional[int] = None):
+        """version - wersja korpusu odczytana PRZED wyszukiwaniem, żeby nie zapisać wyników pod nowszą."""
+        version = self.corpus_version() if version is None else version
+        if version < 0:
+            return
+        payload = json.dumps(results, ensure_ascii=False, default=str).encode("utf-8")
+        self._set(self._result_key(version, query, *params), payload, SEARCH_RESULT_TTL)
+
+
+def _create_backend():
+    if REDIS_URL:
+        try:
+            import redis # Opcjonalne - bez Redisa działa cache w procesie
+
+            client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.5)
+            client.ping()
+            logger.info("Search cache: using Redis at %s", REDIS_URL)
+            return RedisCacheBackend(client)
+        except Exception as e:
+            logger.warning("Search cache: Redis unavailable (%s), falling back to in-process cache", e)
+    return MemoryCacheBackend()
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Wspólna instancja cache - tworzona leniwie, żeby import nie łączył się z Redisem."""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache(_create_backend(), EMBEDDING_MODEL_NAME)
+    return _search_cache
@@ -0,0 +1,48 @@
+# knowledge-assistant/backend/app/chunking.py
+# Dzielenie dokumentów na nakładające się fragmenty (chunki) do embeddingów.
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+# paraphrase-multilingual-MiniLM-L12-v2 ucina wejście na 128 tokenach (word pieces), a polski wyraz
+# to zwykle 2-3 word pieces - okno 45 słów (~110 tokenów) mieści się w limicie. Przy dłuższym oknie
+# koniec fragmentu byłby po cichu obcinany i nie trafiałby do embeddingu.
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", "45"))
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", "10"))
+
+_WORD_RE = re.compile(r"\S+")
+
+
+@dataclass
+class TextChunk:
+    page: Optional[int]  # Numer strony PDF (od 1) lub None dla notatek tekstowych
+    offset: int  # Pozycja początku fragmentu w tekście strony (w znakach)
+    text: str
+    content_offset: int = 0  # Pozycja w pełnym tekście elementu (strony sklejone bez separatora)
+
+
+def chunk_pages(
+    pages: Iterable[Tuple[Optional[int], str]],
+    chunk_words: int = CHUNK_WORDS,
+    overlap_words: int = CHUNK_OVERLAP_WORDS,
+) -> List[TextChunk]:
+    """Dzieli tekst stron na okna po chunk_words słów z zakładką; fragmenty nie przekraczają granic stron."""
+    if chunk_words <= 0:
+        raise ValueError("chunk_words must be positive")
+    stride = max(1, chunk_words - max(0, overlap_words))
+
+    chunks: List[TextChunk] = []
+    page_start = 0
+    for page, page_text in pages:
+        if not page_text:
+            continue
+        spans = [match.span() for match in _WORD_RE.finditer(page_text)]
+        for start in range(0, len(spans), stride):
+            window = spans[start:start + chunk_words]
+            begin, end = window[0][0], window[-1][1]
+            chunks.append(TextChunk(page=page, offset=begin, text=page_text[begin:end], content_offset=page_start + begin))
+            if start + chunk_words >= len(spans):
+                break  # Ostatnie okno doszło do końca strony
+        page_start += len(page_text)
+    return chunks
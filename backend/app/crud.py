@@ -0,0 +1,59 @@
+# knowledge-assistant/backend/app/crud.py
+# Zapis elementów wiedzy wspólny dla endpointów i zadań w tle.
+from typing import List, Optional
+from sqlmodel import Session, select
+from sqlalchemy import delete
+from .models import EMBEDDING_MODEL_NAME, KnowledgeItem, KnowledgeChunk
+from .cache import get_search_cache
+from .related import refresh_related
+from .vector_index import bump_db_version, publish_changes
+
+def save_chunks(session: Session, item_id: int, knowledge_chunks: List[KnowledgeChunk]):
+    """Podmienia fragmenty elementu (stare usuwa, nowe dodaje) - bez commita."""
+    session.execute(delete(KnowledgeChunk).where(KnowledgeChunk.item_id == item_id))
+    for chunk in knowledge_chunks:
+        chunk.item_id = item_id
+        session.add(chunk)
+
+def find_pdf_by_hash(session: Session, content_hash: str) -> Optional[KnowledgeItem]:
+    """PDF o identycznych bajtach zapisany wcześniej (None, jeśli takiego nie ma)."""
+    return session.exec(
+        select(KnowledgeItem)
+        .where(KnowledgeItem.content_hash == content_hash, KnowledgeItem.original_filename.is_not(None))
+        .order_by(KnowledgeItem.id)
+        .limit(1)
+    ).first()
+
+def create_knowledge_item(
+    session: Session,
+    *,
+    title: str,
+    text_content: str,
+    tags: List[str],
+    knowledge_chunks: List[KnowledgeChunk],
+    embedding: Optional[List[float]],
+    tags_embedding: Optional[List[float]],
+    original_filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+) -> KnowledgeItem:
+    """Zapisuje element razem z fragmentami w jednej transakcji."""
+    knowledge_item = KnowledgeItem(
+        title=title,
+        text_content=text_content,
+        original_filename=original_filename,
+        content_hash=content_hash,
+        tags=tags,
+        embedding=embedding,
+        tags_embedding=tags_embedding, # Przypisujemy embedding tagów
+        embedding_model=EMBEDDING_MODEL_NAME,
+    )
+    session.add(knowledge_item)
+    session.flush() # Potrzebujemy id przed zapisem fragmentów
+    save_chunks(session, knowledge_item.id, knowledge_chunks)
+    refresh_related(session, knowledge_item.id) # Lista powiązanych elementów i wpisy u sąsiadów
+    version = bump_db_version(session, [knowledge_item.id])
+    session.commit()
+    get_search_cache().bump_corpus_version() # Unieważnia zapamiętane wyniki wyszukiwania
+    session.refresh(knowledge_item)
+    publish_changes(version, upserts=[(knowledge_item.id, knowledge_item.embedding, knowledge_item.tags_embedding)])
+    return knowledge_item
@@ -0,0 +1,143 @@
+# knowledge-assistant/backend/app/database.py
+import logging
+import os
+import time
+from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import inspect, text
+from fastapi import HTTPException
+from .search import SEARCH_DDL
+from .tags import TAG_DDL
+from . import models # noqa: F401 - rejestruje tabele w SQLModel.metadata
+from .metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# --- Konfiguracja bazy danych ---
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/knowledge_db")
+# Pula połączeń na proces (worker) - przy N workerach baza widzi do N * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# połączeń, co musi się mieścić w max_connections Postgresa (domyślnie 100)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+# Ile sekund żądanie czeka na wolne połączenie, zanim dostanie błąd
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Połączenia starsze niż tyle sekund są zamykane (restart bazy, limity proxy); -1 wyłącza
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# SELECT 1 przed wydaniem połączenia z puli - zerwane połączenia nie kończą się błędem żądania
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Limit czasu pojedynczego zapytania w ms (0 - bez limitu); CLI importu i przebudowy go wyłączają
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+engine = None # Inicjalizacja engine na None
+max_retries = 10
+retry_delay = 5 # seconds
+
+# --- Inicjalizacja silnika bazy danych ---
+# Klucz advisory locka dla zakładania schematu - workery gunicorna i repliki robią to po kolei
+_SCHEMA_LOCK_KEY = 0x6B615343
+
+# Schemat kompletny: rozszerzenia, kolumna search_vector i trigger liczników tagów (tabele sprawdza inspector)
+_SCHEMA_READY_SQL = text("""
+    SELECT (SELECT count(*) FROM pg_extension WHERE extname IN ('vector', 'pg_trgm')) = 2
+       AND EXISTS (SELECT 1 FROM pg_attribute
+                   WHERE attrelid = to_regclass('knowledgeitem') AND attname = 'search_vector' AND NOT attisdropped)
+       AND EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'knowledgeitem_tag_counts')
+""")
+
+def _schema_ready(connection) -> bool:
+    existing = set(inspect(connection).get_table_names())
+    if not all(table.name in existing for table in SQLModel.metadata.sorted_tables):
+        return False
+    return bool(connection.execute(_SCHEMA_READY_SQL).scalar())
+
+def create_db_and_tables():
+    """Zakłada brakujące tabele, kolumnę FTS i trigger (bazy bez alembica, pierwszy start).
+
+    Jedna transakcja pod pg_advisory_xact_lock: równoległe workery nie ścigają się o DDL, tylko
+    czekają na pierwszego. Gdy schemat już jest, nie wykonuje żadnego DDL - restart nie bierze
+    blokad ACCESS EXCLUSIVE na knowledgeitem.
+    """
+    # Upewniamy się, że engine jest zainicjalizowany przed użyciem
+    if engine is None:
+        logger.warning("Database engine not initialized. Retrying connection...")
+        _init_db_connection() # Spróbuj ponownie nawiązać połączenie
+
+    with engine.begin() as connection:
+        # Czekanie na locka i DDL na dużej tabeli mogą trwać dłużej niż limit zapytania
+        connection.execute(text("SET LOCAL statement_timeout = 0"))
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SCHEMA_LOCK_KEY})
+        if _schema_ready(connection):
+            logger.info("Database schema already in place")
+            return
+
+        # Rozszerzenie pgvector musi istnieć PRZED create_all - kolumny embedding mają typ vector
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        logger.info("Creating database tables if they don't exist...")
+        SQLModel.metadata.create_all(connection)
+
+        # Kolumna tsvector + indeksy GIN/trigram dla wyszukiwania tekstowego
+        for statement in SEARCH_DDL:
+            connection.execute(text(statement))
+        # Liczniki tagów utrzymywane triggerem
+        for statement in TAG_DDL:
+            connection.execute(text(statement))
+    logger.info("Database tables, full-text search columns and tag count trigger ensured")
+
+def _create_engine(statement_timeout_ms: int):
+    connect_args = {}
+    if statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    new_engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_engine(new_engine, DB_POOL_SIZE)
+    return new_engine
+
+# Funkcja do nawiązania połączenia z bazą danych z ponawianiem
+def _init_db_connection(statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
+    """Tworzy engine raz i ponawia tylko test połączenia; poprzedni engine (ponowienie kroku startu) jest zamykany."""
+    global engine
+    new_engine = _create_engine(statement_timeout_ms)
+    for i in range(max_retries):
+        try:
+            logger.info("Attempting to connect to database (%d/%d)...", i + 1, max_retries)
+            # Testowe zapytanie aby sprawdzić połączenie
+            with new_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            break
+        except Exception as e:
+            logger.warning("Database connection failed: %s", e)
+            if i < max_retries - 1:
+                logger.info("Retrying in %d seconds...", retry_delay)
+                time.sleep(retry_delay)
+            else:
+                logger.error("Max retries reached. Could not connect to database.")
+                new_engine.dispose()
+                raise # Rzuć wyjątek, jeśli nie udało się połączyć po wielu próbach
+    old_engine, engine = engine, new_engine
+    if old_engine is not None:
+        old_engine.dispose()
+    logger.info("Successfully connected to the database")
+
+# --- Zależność do sesji bazy danych ---
+def get_session():
+    if engine is None:
+        # Połączenie nawiązuje wątek startowy (startup.py) - do tego czasu /ready zwraca 503
+        raise HTTPException(status_code=503, detail="Database is not ready yet.")
+    with Session(engine) as session:
+        yield session
+
+def pool_status() -> dict:
+    """Stan puli połączeń tego procesu."""
+    if engine is None:
+        return {}
+    pool = engine.pool
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
+
+def open_session() -> Session:
+    """Sesja poza cyklem żądania HTTP (zadania w tle, CLI)."""
+    return Session(engine)
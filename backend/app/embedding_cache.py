@@ -0,0 +1,132 @@
+# knowledge-assistant/backend/app/embedding_cache.py
+# Trwały cache embeddingów w bazie: klucz (sha256 tekstu, model). Niezmienione fragmenty
+# treści i tagi nie trafiają ponownie do modelu - przy edycji, ponownym uploadzie i imporcie.
+import hashlib
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+
+from .database import open_session
+from .embeddings import agenerate_embeddings, generate_embeddings
+from .models import EMBEDDING_MODEL_NAME, EmbeddingCacheEntry, vector_to_list
+
+# Maks. liczba hashy w jednym zapytaniu IN (duże partie importu dzielimy)
+_LOOKUP_CHUNK = 1000
+
+_stats = {"encoded": 0, "reused": 0}
+_stats_lock = threading.Lock()
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embedding_reuse_stats() -> dict:
+    """encoded - teksty wysłane do modelu, reused - pominięte dzięki cache (per worker)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _count(encoded: int, reused: int):
+    with _stats_lock:
+        _stats["encoded"] += encoded
+        _stats["reused"] += reused
+
+
+def lookup(session: Session, hashes: List[str]) -> Dict[str, List[float]]:
+    found: Dict[str, List[float]] = {}
+    unique = list(dict.fromkeys(hashes))
+    for start in range(0, len(unique), _LOOKUP_CHUNK):
+        rows = session.exec(
+            select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).where(
+                EmbeddingCacheEntry.model_name == EMBEDDING_MODEL_NAME,
+                EmbeddingCacheEntry.text_hash.in_(unique[start:start + _LOOKUP_CHUNK]),
+            )
+        ).all()
+        for text_hash, embedding in rows:
+            found[text_hash] = vector_to_list(embedding)
+    return found
+
+
+def store(session: Session, vectors: Dict[str, List[float]]):
+    """Dopisuje nowe wpisy (równoległy zapis tego samego tekstu nie jest błędem) - bez commita."""
+    if not vectors:
+        return
+    now = datetime.utcnow()
+    session.execute(
+        pg_insert(EmbeddingCacheEntry).on_conflict_do_nothing(),
+        [
+            {"text_hash": text_hash, "model_name": EMBEDDING_MODEL_NAME, "embedding": vector, "created_at": now}
+            for text_hash, vector in vectors.items()
+        ],
+    )
+
+
+def _missing(texts: List[str], hashes: List[str], cached: Dict[str, List[float]]) -> Dict[str, str]:
+    """hash -> tekst dla tekstów spoza cache (powtórzenia w obrębie wywołania kodujemy raz)."""
+    missing: Dict[str, str] = {}
+    for text, text_hash in zip(texts, hashes):
+        if text_hash not in cached and text_hash not in missing:
+            missing[text_hash] = text
+    return missing
+
+
+def _assemble(hashes: List[str], cached: Dict[str, List[float]], missing: Dict[str, str]) -> List[List[float]]:
+    _count(encoded=len(missing), reused=len(hashes) - len(missing))
+    return [cached[text_hash] for text_hash in hashes]
+
+
+def embed_texts_cached(
+    texts: List[str],
+    session: Optional[Session] = None,
+    encode: Callable[[List[str]], List[List[float]]] = generate_embeddings,
+) -> List[List[float]]:
+    """Embeddingi w kolejności texts; do modelu trafiają tylko teksty, których nie ma w cache.
+
+    Bez session otwiera własną i commituje; z session wpisy zapisują się razem z transakcją wywołującego.
+    """
+    if not texts:
+        return []
+    hashes = [text_sha256(text) for text in texts]
+    if session is None:
+        with open_session() as own_session:
+            vectors = embed_texts_cached(texts, own_session, encode)
+            own_session.commit()
+            return vectors
+
+    cached = lookup(session, hashes)
+    missing = _missing(texts, hashes, cached)
+    if missing:
+        new_vectors = dict(zip(missing.keys(), encode(list(missing.values()))))
+        store(session, new_vectors)
+        cached.update(new_vectors)
+    return _assemble(hashes, cached, missing)
+
+
+def _lookup_in_new_session(hashes: List[str]) -> Dict[str, List[float]]:
+    with open_session() as session:
+        return lookup(session, hashes)
+
+
+def _store_in_new_session(vectors: Dict[str, List[float]]):
+    with open_session() as session:
+        store(session, vectors)
+        session.commit()
+
+
+async def aembed_texts_cached(texts: List[str]) -> List[List[float]]:
+    """Wersja dla endpointów async: zapytania do bazy w puli wątków, model przez serwis embeddingów."""
+    if not texts:
+        return []
+    hashes = [text_sha256(text) for text in texts]
+    cached = await run_in_threadpool(_lookup_in_new_session, hashes)
+    missing = _missing(texts, hashes, cached)
+    if missing:
+        new_vectors = dict(zip(missing.keys(), await agenerate_embeddings(list(missing.values()))))
+        await run_in_threadpool(_store_in_new_session, new_vectors)
+        cached.update(new_vectors)
+    return _assemble(hashes, cached, missing)
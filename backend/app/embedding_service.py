@@ -0,0 +1,195 @@
+# knowledge-assistant/backend/app/embedding_service.py
+# Serwis embeddingów: kolejka + wątek roboczy, który skleja równoległe żądania w jeden batch.
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional
+
+from .metrics import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_ENCODE_DURATION,
+    EMBEDDING_QUEUE_DEPTH,
+    EMBEDDING_QUEUE_REJECTED,
+    EMBEDDING_QUEUE_WAIT,
+)
+
+EncodeFn = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingQueueFullError(RuntimeError):
+    """Kolejka embeddingów jest pełna - klient powinien spróbować ponownie."""
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: Future
+    enqueued_at: float
+    taken: int = 0  # Ile tekstów z początku listy trafiło już do batchy
+    vectors: List[List[float]] = field(default_factory=list)
+
+
+class EmbeddingService:
+    """Micro-batching: żądania zebrane w oknie max_wait_ms kodowane są jednym wywołaniem encode_fn.
+
+    Model działa w osobnym wątku, więc endpointy async nie blokują pętli zdarzeń. Batch ma najwyżej
+    max_batch_size tekstów - większe żądanie (np. PDF) jest kodowane kawałkami i po każdym wraca na
+    koniec kolejki, więc zapytania, które przyszły w międzyczasie, nie czekają na cały dokument.
+    max_queue_size ogranicza liczbę czekających tekstów, nie żądań.
+    """
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 2048,
+    ):
+        self._encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self._pending: Deque[_Request] = deque()
+        self._queued_texts = 0  # Teksty w kolejce, jeszcze niewzięte do batcha
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # --- Cykl życia wątku ---
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            with self._cond:
+                self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            with self._cond:
+                self._stopping = True  # Wątek kończy po opróżnieniu kolejki
+                self._cond.notify_all()
+            thread.join(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        """Teksty czekające w kolejce."""
+        with self._cond:
+            return self._queued_texts
+
+    # --- API dla wywołujących ---
+    def _has_room(self, count: int) -> bool:
+        # Żądanie większe niż cały limit wchodzi do pustej kolejki - inaczej nie weszłoby nigdy
+        return self._queued_texts == 0 or self._queued_texts + count <= self.max_queue_size
+
+    def submit(self, texts: List[str], block: bool = False) -> Future:
+        """Wstawia teksty do kolejki i zwraca Future z listą embeddingów.
+
+        block - czeka na miejsce w kolejce zamiast rzucać EmbeddingQueueFullError.
+        """
+        self.start()
+        future: Future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        texts = list(texts)
+        with self._cond:
+            if not self._has_room(len(texts)):
+                if not block:
+                    EMBEDDING_QUEUE_REJECTED.inc()
+                    raise EmbeddingQueueFullError("Embedding queue is full")
+                self._cond.wait_for(lambda: self._has_room(len(texts)))
+            # Czas wstawienia - do histogramu oczekiwania w kolejce
+            self._pending.append(_Request(texts, future, time.monotonic()))
+            self._queued_texts += len(texts)
+            self._cond.notify_all()
+        return future
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Wersja dla endpointów async - czeka na wynik bez blokowania pętli."""
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        """Wersja dla kodu synchronicznego (endpointy def działają w puli wątków)."""
+        return self.submit(texts, block=True).result()
+
+    # --- Wątek roboczy ---
+    def _collect_batch(self) -> Optional[List[tuple]]:
+        """Bierze teksty z czoła kolejki, dopóki nie minie max_wait albo batch się nie zapełni.
+
+        Zwraca listę (żądanie, początek, koniec) albo None, gdy serwis się zatrzymuje, a kolejka jest pusta.
+        """
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+            batch = []
+            size = 0
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                if not self._pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stopping:
+                        break
+                    self._cond.wait(remaining)
+                    continue
+                request = self._pending.popleft()
+                if request.taken == 0:
+                    # Żądania anulowane przez klienta pomijamy
+                    if not request.future.set_running_or_notify_cancel():
+                        self._queued_texts -= len(request.texts)
+                        continue
+                    EMBEDDING_QUEUE_WAIT.observe(time.monotonic() - request.enqueued_at)
+                begin = request.taken
+                request.taken = min(len(request.texts), begin + self.max_batch_size - size)
+                batch.append((request, begin, request.taken))
+                size += request.taken - begin
+                self._queued_texts -= request.taken - begin
+            EMBEDDING_QUEUE_DEPTH.set(self._queued_texts)
+            self._cond.notify_all()  # Zwolnione miejsce dla submit(block=True)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            if batch:
+                self._encode(batch)
+
+    def _encode(self, batch: List[tuple]):
+        all_texts = [text for request, begin, end in batch for text in request.texts[begin:end]]
+        EMBEDDING_BATCH_SIZE.observe(len(all_texts))
+        try:
+            with EMBEDDING_ENCODE_DURATION.time():
+                vectors = self._encode_fn(all_texts)
+        except Exception as e:
+            with self._cond:
+                for request, _, _ in batch:
+                    # Reszty żądania nie kodujemy - zwalniamy jej miejsce w kolejce
+                    self._queued_texts -= len(request.texts) - request.taken
+                    request.future.set_exception(e)
+                self._cond.notify_all()
+            return
+        position = 0
+        unfinished = []
+        for request, begin, end in batch:
+            request.vectors.extend(vectors[position:position + end - begin])
+            position += end - begin
+            if request.taken < len(request.texts):
+                unfinished.append(request)
+            else:
+                request.future.set_result(request.vectors)
+        if unfinished:
+            with self._cond:
+                # Reszta dużego żądania staje za tymi, które przyszły w trakcie kodowania
+                self._pending.extend(unfinished)
+                self._cond.notify_all()
@@ -0,0 +1,177 @@
+# knowledge-assistant/backend/app/embeddings.py
+from typing import List, Optional
+import json
+import logging
+import os
+import sys
+import threading
+import numpy as np # Do pracy z numpy array (embeddingami)
+from .chunking import TextChunk
+from .embedding_service import EmbeddingService
+from .models import KnowledgeChunk, EMBEDDING_FALLBACK_MODEL, EMBEDDING_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+# Rozmiar batcha dla model.encode przy embeddingu wielu fragmentów naraz
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Micro-batching w serwisie embeddingów: maks. liczba tekstów w batchu, czas zbierania, limit tekstów w kolejce
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "128"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "2048"))
+# Lokalna, przypięta kopia modelu (zapisana przez `python -m app.embeddings download`) - start bez sieci.
+# Obok wag leży _MODEL_ID_FILE z nazwą modelu: kopia jest używana tylko dla tego modelu, więc
+# po zmianie EMBEDDING_MODEL obraz z wagami poprzedniego nie podszywa się pod nowy.
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH")
+# Commit modelu na Hugging Face Hub używany przy pobieraniu (None = najnowszy)
+EMBEDDING_MODEL_REVISION = os.getenv("EMBEDDING_MODEL_REVISION")
+# torch | onnx (wymaga optimum[onnxruntime]; eksport ONNX zapisuje `download`)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# --- Funkcja do generowania embeddingów ---
+model = None # Model do embeddingów
+fallback_model = None # Poprzedni model (EMBEDDING_FALLBACK_MODEL) - tylko do zapytań w trakcie migracji
+_model_lock = threading.Lock()
+_MODEL_ID_FILE = "knowledge_assistant_model.json"
+
+def _local_copy(model_name: str, revision: Optional[str]) -> Optional[str]:
+    """EMBEDDING_MODEL_PATH, jeśli zapisano tam ten model (i rewizję, gdy jest przypięta) w tym backendzie."""
+    if not EMBEDDING_MODEL_PATH or not os.path.isdir(EMBEDDING_MODEL_PATH):
+        return None
+    try:
+        with open(os.path.join(EMBEDDING_MODEL_PATH, _MODEL_ID_FILE), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        logger.warning("%s has no %s - not using it for %s", EMBEDDING_MODEL_PATH, _MODEL_ID_FILE, model_name)
+        return None
+    if saved.get("model") != model_name or saved.get("backend") != EMBEDDING_BACKEND:
+        return None
+    if revision and saved.get("revision") != revision:
+        return None
+    return EMBEDDING_MODEL_PATH
+
+def load_model(model_name: str = EMBEDDING_MODEL_NAME):
+    """Nowa instancja modelu - z lokalnej kopii, jeśli to ten model, inaczej z huba."""
+    # Import leniwy - sentence_transformers ciągnie torch i sklearn (kilka sekund przy imporcie)
+    from sentence_transformers import SentenceTransformer
+    revision = EMBEDDING_MODEL_REVISION if model_name == EMBEDDING_MODEL_NAME else None
+    local_path = _local_copy(model_name, revision)
+    if local_path is not None:
+        logger.info("Loading embedding model %s from %s (%s)", model_name, local_path, EMBEDDING_BACKEND)
+        return SentenceTransformer(local_path, backend=EMBEDDING_BACKEND, local_files_only=True)
+    logger.info("Loading embedding model %s (%s)", model_name, EMBEDDING_BACKEND)
+    return SentenceTransformer(model_name, revision=revision, backend=EMBEDDING_BACKEND)
+
+def get_embedding_model():
+    global model
+    if model is None:
+        with _model_lock: # Ładowanie w tle i pierwsze żądanie nie mogą wczytać modelu dwa razy
+            if model is None:
+                # Użyj modelu wielojęzycznego który lepiej obsługuje polski
+                model = load_model(EMBEDDING_MODEL_NAME)
+                logger.info("Multilingual Sentence Transformer model loaded")
+    return model
+
+def get_fallback_model():
+    global fallback_model
+    if fallback_model is None and EMBEDDING_FALLBACK_MODEL:
+        with _model_lock:
+            if fallback_model is None:
+                fallback_model = load_model(EMBEDDING_FALLBACK_MODEL)
+    return fallback_model
+
+def warm_up_model():
+    """Pierwsze encode alokuje bufory i inicjalizuje kernele - robimy je przed przyjęciem ruchu."""
+    get_embedding_model().encode(["rozgrzewka modelu", "model warm-up"], batch_size=EMBEDDING_BATCH_SIZE)
+
+def encode_texts(embedding_model, texts: List[str]) -> List[List[float]]:
+    # Normalizacja przy zapisie - w bazie ranking to iloczyn skalarny (patrz similarity.py)
+    embeddings = embedding_model.encode(texts, batch_size=EMBEDDING_BATCH_SIZE, normalize_embeddings=True)
+    return embeddings.tolist() # Zwracamy listę floatów, aby pasowało do typu w SQLModel/pgvector
+
+def _encode_batch(texts: List[str]) -> List[List[float]]:
+    """Jedno wywołanie model.encode dla całego batcha - wykonywane w wątku serwisu embeddingów."""
+    return encode_texts(get_embedding_model(), texts)
+
+def _encode_fallback_batch(texts: List[str]) -> List[List[float]]:
+    return encode_texts(get_fallback_model(), texts)
+
+# Wszystkie wywołania modelu przechodzą przez jedną kolejkę z wątkiem roboczym
+embedding_service = EmbeddingService(
+    _encode_batch,
+    max_batch_size=EMBEDDING_MAX_BATCH,
+    max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+    max_queue_size=EMBEDDING_QUEUE_SIZE,
+)
+
+# Zapytania do wierszy poprzedniego modelu (wątek startuje przy pierwszym użyciu)
+fallback_embedding_service = EmbeddingService(
+    _encode_fallback_batch,
+    max_batch_size=EMBEDDING_MAX_BATCH,
+    max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+    max_queue_size=EMBEDDING_QUEUE_SIZE,
+)
+
+def generate_embedding(text: str) -> List[float]:
+    # Ensure input is a string
+    if not isinstance(text, str):
+        text = str(text) # Convert to string if not already
+    return embedding_service.embed_sync([text])[0]
+
+def generate_fallback_embedding(text: str) -> List[float]:
+    """Embedding zapytania modelem EMBEDDING_FALLBACK_MODEL."""
+    return fallback_embedding_service.embed_sync([str(text)])[0]
+
+def generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embeddingi dla wielu tekstów (kod synchroniczny, np. endpointy def)."""
+    return embedding_service.embed_sync(texts)
+
+async def agenerate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embeddingi dla wielu tekstów z endpointów async - nie blokuje pętli zdarzeń."""
+    return await embedding_service.embed(texts)
+
+def embed_chunks(chunks: List[TextChunk], vectors: List[List[float]]) -> tuple:
+    """Zwraca (obiekty KnowledgeChunk bez item_id, embedding całego dokumentu).
+
+    Embedding dokumentu to znormalizowana średnia embeddingów fragmentów,
+    więc nie wymaga osobnego przejścia modelu po całym tekście.
+    """
+    if not vectors:
+        return [], None
+    knowledge_chunks = [
+        KnowledgeChunk(
+            page=chunk.page,
+            chunk_offset=chunk.offset,
+            chunk_length=len(chunk.text),
+            content_offset=chunk.content_offset,
+            embedding=vector,
+            embedding_model=EMBEDDING_MODEL_NAME,
+        )
+        for chunk, vector in zip(chunks, vectors)
+    ]
+    return knowledge_chunks, document_embedding(vectors)
+
+def document_embedding(vectors: List[List[float]]) -> List[float]:
+    """Znormalizowana średnia embeddingów fragmentów."""
+    mean = np.asarray(vectors, dtype=np.float32).mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return (mean / norm if norm > 0 else mean).tolist()
+
+def download_model(path: str):
+    """Zapisuje model (w wybranym backendzie) pod path - potem EMBEDDING_MODEL_PATH=path."""
+    from sentence_transformers import SentenceTransformer
+    SentenceTransformer(EMBEDDING_MODEL_NAME, revision=EMBEDDING_MODEL_REVISION, backend=EMBEDDING_BACKEND).save(path)
+    # Nazwa modelu obok wag - load_model sprawdza ją przed użyciem kopii
+    with open(os.path.join(path, _MODEL_ID_FILE), "w", encoding="utf-8") as f:
+        json.dump({"model": EMBEDDING_MODEL_NAME, "revision": EMBEDDING_MODEL_REVISION, "backend": EMBEDDING_BACKEND}, f)
+    print(f"Saved {EMBEDDING_MODEL_NAME} ({EMBEDDING_BACKEND}) to {path}")
+
+if __name__ == "__main__":
+    # python -m app.embeddings download [ścieżka]
+    if len(sys.argv) < 2 or sys.argv[1] != "download":
+        sys.exit("usage: python -m app.embeddings download [path]")
+    target = sys.argv[2] if len(sys.argv) > 2 else EMBEDDING_MODEL_PATH
+    if not target:
+        sys.exit("Set EMBEDDING_MODEL_PATH or pass a target path")
+    from .logging_config import configure_logging
+    configure_logging()
+    download_model(target)
@@ -0,0 +1,233 @@
+# knowledge-assistant/backend/app/export.py
+# Eksport: notatka jako PDF (czcionka Unicode, cache na dysku) i eksport całej bazy (ZIP/NDJSON).
+#
+# PDF notatki renderujemy raz na wersję elementu - klucz to id + updated_at, więc edycja
+# notatki automatycznie daje nowy plik, a starsze wersje są usuwane przy renderowaniu nowej.
+# Plik powstaje pod tymczasową nazwą i trafia na miejsce przez os.replace, a sprzątanie
+# usuwa tylko wersje starsze od właśnie zapisanej - żądanie z nieaktualnym updated_at nie
+# skasuje nowszego pliku, który inne żądanie właśnie wysyła.
+# Gotowy plik serwuje FileResponse (Range, Last-Modified); ETag wynika z klucza, więc
+# If-None-Match sprawdzamy bez dotykania dysku.
+#
+# Eksport bazy to generatory: elementy czytane z bazy partiami (yield_per), PDF-y kopiowane
+# porcjami z magazynu (app/storage.py), ZIP zapisywany do strumienia bez seek - pamięć nie
+# zależy od rozmiaru bazy.
+import glob
+import io
+import json
+import logging
+import os
+import uuid
+import zipfile
+from contextlib import closing
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlmodel import select
+
+from .database import open_session
+from .models import KnowledgeItem
+from .storage import open_item_pdf
+from .uploads import PDF_UPLOAD_DIR, UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Katalog z wyrenderowanymi PDF-ami notatek
+PDF_EXPORT_CACHE_DIR = os.getenv("PDF_EXPORT_CACHE_DIR", os.path.join(PDF_UPLOAD_DIR, ".exports"))
+os.makedirs(PDF_EXPORT_CACHE_DIR, exist_ok=True)
+# Czcionki TTF z polskimi znakami (w obrazie Dockera: pakiet fonts-dejavu-core)
+PDF_EXPORT_FONT = os.getenv("PDF_EXPORT_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+PDF_EXPORT_FONT_BOLD = os.getenv("PDF_EXPORT_FONT_BOLD", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+# Elementy pobierane z bazy naraz przy eksporcie całej bazy
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "200"))
+# Zmiana sposobu renderowania unieważnia wszystkie PDF-y w cache
+_RENDER_VERSION = "1"
+
+
+# --- PDF notatki ---
+def _version_stamp(updated_at: datetime) -> str:
+    return f"{int(updated_at.timestamp() * 1_000_000)}-{_RENDER_VERSION}"
+
+
+def note_pdf_etag(item_id: int, updated_at: datetime) -> str:
+    return f'"note-{item_id}-{_version_stamp(updated_at)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match może zawierać listę tagów, słabe tagi (W/) albo *."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _cache_path(item_id: int, updated_at: datetime) -> str:
+    return os.path.join(PDF_EXPORT_CACHE_DIR, f"note-{item_id}-{_version_stamp(updated_at)}.pdf")
+
+
+def _cached_versions(item_id: int) -> Iterator[tuple]:
+    """(updated_at w mikrosekundach, ścieżka) PDF-ów notatki w cache."""
+    for path in glob.glob(os.path.join(PDF_EXPORT_CACHE_DIR, f"note-{item_id}-*.pdf")):
+        stamp = os.path.basename(path)[len(f"note-{item_id}-"):-len(".pdf")].split("-", 1)[0]
+        if stamp.isdigit():
+            yield int(stamp), path
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass # Usunięty już przez równoległe żądanie
+
+
+def _render_note_pdf(title: str, text_content: str, path: str):
+    from fpdf import FPDF # Import leniwy - potrzebny tylko przy renderowaniu
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    if os.path.exists(PDF_EXPORT_FONT):
+        pdf.add_font("DejaVu", "", PDF_EXPORT_FONT)
+        bold = "B" if os.path.exists(PDF_EXPORT_FONT_BOLD) else ""
+        if bold:
+            pdf.add_font("DejaVu", "B", PDF_EXPORT_FONT_BOLD)
+        family = "DejaVu"
+    else:
+        # Bez czcionki TTF zostaje Latin-1 - znaki spoza niego zamieniamy, zamiast przerywać eksport
+        logger.warning("PDF export font %s not found, falling back to Helvetica (Latin-1 only)", PDF_EXPORT_FONT)
+        title = title.encode("latin-1", "replace").decode("latin-1")
+        text_content = text_content.encode("latin-1", "replace").decode("latin-1")
+        family, bold = "Helvetica", "B"
+    pdf.add_page()
+    pdf.set_font(family, bold, size=16)
+    pdf.multi_cell(0, 9, title)
+    pdf.ln(4)
+    pdf.set_font(family, "", size=11)
+    pdf.multi_cell(0, 6, text_content)
+    pdf.output(path)
+
+
+def cached_note_pdf(item_id: int, updated_at: datetime, load_item) -> str:
+    """Ścieżka do PDF-u notatki w tej wersji; renderuje go (load_item() -> (tytuł, treść)) tylko przy braku w cache."""
+    path = _cache_path(item_id, updated_at)
+    if os.path.exists(path):
+        return path
+    title, text_content = load_item()
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part" # Równoległe renderowanie tej samej wersji nie psuje pliku
+    try:
+        _render_note_pdf(title, text_content, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    # Tylko wersje starsze od tej - plik tej samej wersji (np. inny _RENDER_VERSION) i nowsze zostają
+    current = int(updated_at.timestamp() * 1_000_000)
+    for stamp, stale in _cached_versions(item_id):
+        if stamp < current:
+            _remove(stale)
+    return path
+
+
+def drop_cached_note_pdfs(item_id: int):
+    """Po usunięciu elementu."""
+    for _, path in _cached_versions(item_id):
+        _remove(path)
+
+
+# --- Eksport całej bazy ---
+_EXPORT_COLUMNS = (
+    KnowledgeItem.id,
+    KnowledgeItem.title,
+    KnowledgeItem.text_content,
+    KnowledgeItem.original_filename,
+    KnowledgeItem.content_hash,
+    KnowledgeItem.tags,
+    KnowledgeItem.created_at,
+    KnowledgeItem.updated_at,
+)
+
+
+def _iter_items(with_content: bool = True) -> Iterator[dict]:
+    columns = _EXPORT_COLUMNS if with_content else tuple(c for c in _EXPORT_COLUMNS if c is not KnowledgeItem.text_content)
+    statement = select(*columns).order_by(KnowledgeItem.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    # Własna sesja - odpowiedź strumieniowa trwa dłużej niż sesja z zależności żądania
+    with open_session() as session:
+        for row in session.exec(statement):
+            yield dict(row._mapping)
+
+
+def _record(item: dict) -> dict:
+    return {
+        **{key: value for key, value in item.items() if key != "content_hash"},
+        "tags": item["tags"] or [],
+        "created_at": item["created_at"].isoformat() if item["created_at"] else None,
+        "updated_at": item["updated_at"].isoformat() if item["updated_at"] else None,
+    }
+
+
+def iter_ndjson_export() -> Iterator[bytes]:
+    """Jedna linia JSON na element (treść notatek i tekst wyciągnięty z PDF-ów, bez embeddingów)."""
+    for item in _iter_items():
+        yield (json.dumps(_record(item), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _StreamSink(io.RawIOBase):
+    """Plik tylko do zapisu bez seek - zipfile pisze wtedy nagłówki z data descriptor, a my
+    oddajemy zebrane bajty po każdym kawałku."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_entry(name: str, modified: Optional[datetime], size: int = 0) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=(modified or datetime.utcnow()).timetuple()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = size # Przy pisaniu bez seek zipfile decyduje na tej podstawie o ZIP64
+    return info
+
+
+def iter_zip_export(include_pdfs: bool = True) -> Iterator[bytes]:
+    """ZIP: notes/<id>.md dla notatek, pdfs/<id>_<nazwa> dla oryginalnych PDF-ów i items.ndjson z metadanymi."""
+    sink = _StreamSink()
+    missing_pdfs = set()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for item in _iter_items():
+            filename = item["original_filename"]
+            if filename:
+                if not include_pdfs:
+                    continue
+                opened = open_item_pdf(filename, item["content_hash"])
+                if opened is None:
+                    missing_pdfs.add(item["id"])
+                    continue
+                source, size = opened
+                entry = _zip_entry(f"pdfs/{item['id']}_{os.path.basename(filename)}", item["updated_at"], size)
+                with closing(source), archive.open(entry, "w") as target:
+                    while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                        target.write(chunk)
+                        yield sink.drain()
+            else:
+                body = f"# {item['title']}\n\n{item['text_content']}\n".encode("utf-8")
+                archive.writestr(_zip_entry(f"notes/{item['id']}.md", item["updated_at"], len(body)), body)
+            yield sink.drain()
+
+        # Metadane (tagi, daty, nazwy plików) - drugi przebieg bez treści, też strumieniowo
+        with archive.open(_zip_entry("items.ndjson", None), "w") as manifest:
+            for item in _iter_items(with_content=False):
+                record = _record(item)
+                if item["id"] in missing_pdfs:
+                    record["pdf_missing"] = True
+                manifest.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                yield sink.drain()
+    yield sink.drain() # Katalog centralny ZIP-a
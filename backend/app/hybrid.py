@@ -0,0 +1,136 @@
+# knowledge-assistant/backend/app/hybrid.py
+# Fuzja rankingów dla wyszukiwania hybrydowego (mode=hybrid w /semantic_search).
+#
+# Gałąź leksykalna i wektorowa zwracają niezależnie po N najlepszych kandydatów (posortowane
+# malejąco po swoim wyniku); łączymy je:
+#   rrf       - Reciprocal Rank Fusion: suma w / (RRF_K + pozycja) - nie zależy od skali wyników
+#   weighted  - suma ważona wyników znormalizowanych do [0, 1] (leksykalny / najlepszy leksykalny,
+#               podobieństwo kosinusowe obcięte do [0, 1])
+#
+# Wczesne zakończenie: listy pobieramy coraz głębiej (top_k * HYBRID_INITIAL_DEPTH, potem x2,
+# najwyżej HYBRID_CANDIDATES). Po każdym kroku liczymy górną granicę wyniku, jaki może jeszcze
+# zdobyć element spoza pobranych pozycji (próg jak w algorytmie Fagina); jeśli k-ty wynik ją
+# przekracza, zbiór top_k się nie zmieni i głębsze zapytania są zbędne.
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Maks. liczba kandydatów z każdej gałęzi
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "100"))
+# Początkowa głębokość list jako wielokrotność top_k
+HYBRID_INITIAL_DEPTH = int(os.getenv("HYBRID_INITIAL_DEPTH", "2"))
+# Stała RRF - większa spłaszcza różnice między pierwszymi pozycjami
+RRF_K = int(os.getenv("RRF_K", "60"))
+# rrf | weighted
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_SEMANTIC_WEIGHT = float(os.getenv("HYBRID_SEMANTIC_WEIGHT", "1.0"))
+
+
+@dataclass
+class LegResult:
+    """Pobrany prefiks listy jednej gałęzi: [(id, wynik)] malejąco; exhausted = gałąź nie ma więcej wyników."""
+    hits: List[Tuple[int, float]]
+    exhausted: bool
+
+
+@dataclass
+class FusedHit:
+    id: int
+    score: float
+    lexical_score: Optional[float] = None
+    lexical_rank: Optional[int] = None # Pozycja w gałęzi, od 1
+    semantic_score: Optional[float] = None
+    semantic_rank: Optional[int] = None
+
+
+@dataclass
+class FusionStats:
+    depth: int = 0
+    rounds: int = 0
+    settled_early: bool = False
+    candidates: Dict[str, int] = field(default_factory=dict)
+
+
+def _contribution(fusion: str, weight: float, rank: int, score: float, best: float) -> float:
+    if fusion == "rrf":
+        return weight / (RRF_K + rank)
+    normalized = score / best if best > 0 else 0.0
+    return weight * min(max(normalized, 0.0), 1.0)
+
+
+def _unseen_bound(fusion: str, weight: float, leg: LegResult, best: float) -> float:
+    """Najwyższy wkład gałęzi dla elementu, którego nie ma w jej pobranym prefiksie."""
+    if leg.exhausted or weight <= 0:
+        return 0.0 # Elementy spoza wyczerpanej listy nic z niej nie dostaną
+    if fusion == "rrf":
+        return weight / (RRF_K + len(leg.hits) + 1)
+    if not leg.hits:
+        return weight
+    # Listy są malejące - dalsze pozycje mają wynik najwyżej taki jak ostatnia pobrana
+    return _contribution(fusion, weight, len(leg.hits), leg.hits[-1][1], best)
+
+
+def fuse(legs: Dict[str, LegResult], weights: Dict[str, float], fusion: str) -> Tuple[List[FusedHit], Dict[int, float]]:
+    """Połączony ranking (malejąco) i górne granice wyniku dla każdego elementu."""
+    fused: Dict[int, FusedHit] = {}
+    bounds: Dict[str, float] = {}
+    for name, leg in legs.items():
+        # Kosinus jest już w skali [0, 1] - nie rozciągamy słabych dopasowań; wynik leksykalny dzielimy przez najlepszy
+        best = 1.0 if name == "semantic" else max((score for _, score in leg.hits), default=0.0)
+        bounds[name] = _unseen_bound(fusion, weights[name], leg, best)
+        for rank, (item_id, score) in enumerate(leg.hits, start=1):
+            hit = fused.setdefault(item_id, FusedHit(id=item_id, score=0.0))
+            hit.score += _contribution(fusion, weights[name], rank, score, best)
+            setattr(hit, f"{name}_score", score)
+            setattr(hit, f"{name}_rank", rank)
+    upper = {
+        hit.id: hit.score + sum(bound for name, bound in bounds.items() if getattr(hit, f"{name}_rank") is None)
+        for hit in fused.values()
+    }
+    upper[-1] = sum(bounds.values()) # Element nieobecny w żadnym prefiksie
+    ranked = sorted(fused.values(), key=lambda hit: (hit.score, -hit.id), reverse=True)
+    return ranked, upper
+
+
+def is_settled(ranked: List[FusedHit], upper: Dict[int, float], top_k: int) -> bool:
+    """Czy dalsze pozycje list mogą jeszcze zmienić zbiór top_k."""
+    if len(ranked) < top_k:
+        return upper[-1] == 0.0 # Za mało kandydatów - tylko gdy obie listy są wyczerpane
+    threshold = ranked[top_k - 1].score
+    outside = [upper[hit.id] for hit in ranked[top_k:]] + [upper[-1]]
+    return threshold > max(outside)
+
+
+def hybrid_rank(
+    fetch_legs: Dict[str, Callable[[int], LegResult]],
+    top_k: int,
+    fusion: str = HYBRID_FUSION,
+    weights: Optional[Dict[str, float]] = None,
+    max_depth: int = HYBRID_CANDIDATES,
+) -> Tuple[List[FusedHit], FusionStats]:
+    """Pogłębia listy gałęzi (fetch_legs[nazwa](głębokość)) aż top_k będzie ustalone albo osiągnie max_depth.
+
+    Gałąź wyczerpana albo z zerową wagą nie jest odpytywana ponownie.
+    """
+    weights = weights or {"lexical": HYBRID_LEXICAL_WEIGHT, "semantic": HYBRID_SEMANTIC_WEIGHT}
+    stats = FusionStats()
+    depth = min(max(top_k * HYBRID_INITIAL_DEPTH, top_k), max_depth)
+    legs: Dict[str, LegResult] = {}
+    while True:
+        stats.rounds += 1
+        stats.depth = depth
+        for name, fetch in fetch_legs.items():
+            if weights.get(name, 0) <= 0:
+                legs[name] = LegResult([], exhausted=True)
+            elif name not in legs or not legs[name].exhausted:
+                legs[name] = fetch(depth)
+        ranked, upper = fuse(legs, weights, fusion)
+        if is_settled(ranked, upper, top_k):
+            stats.settled_early = depth < max_depth
+            break
+        if depth >= max_depth:
+            break
+        depth = min(depth * 2, max_depth)
+    stats.candidates = {name: len(leg.hits) for name, leg in legs.items()}
+    return ranked[:top_k], stats
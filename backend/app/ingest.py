@@ -0,0 +1,411 @@
+# knowledge-assistant/backend/app/ingest.py
+# Import masowy notatek i PDF-ów: katalog, NDJSON albo ZIP.
+#
+#   python -m app.ingest <katalog | plik.ndjson | plik.zip> [--batch-size 200] [--tags archiwum]
+#
+# Wejście czytane jest strumieniowo i przetwarzane partiami: ekstrakcja PDF w puli procesów,
+# jeden batch embeddingów dla treści i tagów całej partii, wielowierszowe INSERT-y i commit
+# na partię. Klucze źródeł zapisywane są w ingest_checkpoint razem z elementami, więc
+# przerwany import można uruchomić ponownie - gotowe pliki zostaną pominięte. PDF-y o bajtach
+# identycznych z już zapisanymi (SHA-256) są pomijane przed parsowaniem, a fragmenty zakodowane
+# wcześniej biorą embeddingi z cache.
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Callable, IO, Iterable, Iterator, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlmodel import select
+
+from .cache import get_search_cache
+from .chunking import chunk_pages
+from .database import open_session
+from .embedding_cache import embed_texts_cached, text_sha256
+from .embeddings import embed_chunks
+from .ingestion import _update_job, get_process_pool, track_job, update_job
+from .models import EMBEDDING_MODEL_NAME, IngestCheckpoint, KnowledgeChunk, KnowledgeItem
+from .pdf_text import extract_pdf_pages
+from .related import refresh_related
+from .vector_index import bump_db_version, publish_changes
+from .storage import get_blob_store
+from .uploads import incoming_upload_path
+
+logger = logging.getLogger(__name__)
+
+# Liczba elementów zapisywanych w jednej transakcji
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+
+NOTE_EXTENSIONS = {".txt", ".md"}
+NDJSON_EXTENSIONS = {".ndjson", ".jsonl"}
+
+
+@dataclass
+class IngestRecord:
+    source_key: str # Stabilny klucz źródła - podstawa wznawiania importu
+    title: str
+    tags: List[str] = field(default_factory=list)
+    text: Optional[str] = None # Treść notatki
+    pdf_path: Optional[str] = None # Źródło PDF (plik albo nazwa w ZIP); po skopiowaniu - plik tymczasowy
+    original_filename: Optional[str] = None
+    content_hash: Optional[str] = None # SHA-256 bajtów PDF-a (liczony przy kopiowaniu)
+
+
+@dataclass
+class IngestStats:
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    chunks: int = 0
+
+
+# --- Źródła rekordów (generatory - nic nie jest wczytywane w całości) ---
+def _parse_tags(value) -> List[str]:
+    if isinstance(value, list):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    if isinstance(value, str):
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+    return []
+
+
+def _stage_pdf(source: IO[bytes]) -> tuple:
+    """Kopiuje PDF pod tymczasową nazwę, licząc SHA-256; zwraca (ścieżka, hash). Źródło zostaje nietknięte."""
+    digest = hashlib.sha256()
+    staged = incoming_upload_path()
+    with open(staged, "wb") as out:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+            out.write(block)
+    return staged, digest.hexdigest()
+
+
+def iter_ndjson(lines: Iterable, source: str, extra_tags: List[str]) -> Iterator[IngestRecord]:
+    """Każda linia: {"title": ..., "content": ..., "tags": [...] | "a,b", "id": opcjonalny klucz}."""
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning("%s:%d: invalid JSON skipped (%s)", source, line_number, e)
+            continue
+        if not data.get("content"):
+            logger.warning("%s:%d: missing content, skipped", source, line_number)
+            continue
+        key = data.get("id") or hashlib.sha256(line.encode("utf-8")).hexdigest()
+        yield IngestRecord(
+            source_key=f"ndjson:{key}",
+            title=data.get("title") or f"Notatka {line_number}",
+            text=data["content"],
+            tags=_parse_tags(data.get("tags")) + extra_tags,
+        )
+
+
+def iter_directory(root: str, extra_tags: List[str]) -> Iterator[IngestRecord]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            stem, extension = os.path.splitext(filename)
+            extension = extension.lower()
+            stat = os.stat(path)
+            key = f"file:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+            if extension == ".pdf":
+                yield IngestRecord(source_key=key, title=stem, tags=list(extra_tags), pdf_path=path, original_filename=filename)
+            elif extension in NOTE_EXTENSIONS:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    yield IngestRecord(source_key=key, title=stem, tags=list(extra_tags), text=f.read())
+            elif extension in NDJSON_EXTENSIONS:
+                with open(path, encoding="utf-8") as f:
+                    yield from iter_ndjson(f, path, extra_tags)
+
+
+def iter_zip(path: str, extra_tags: List[str]) -> Iterator[IngestRecord]:
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            filename = os.path.basename(info.filename)
+            stem, extension = os.path.splitext(filename)
+            extension = extension.lower()
+            key = f"zip:{info.filename}:{info.CRC}:{info.file_size}"
+            if extension == ".pdf":
+                yield IngestRecord(source_key=key, title=stem, tags=list(extra_tags), pdf_path=info.filename, original_filename=filename)
+            elif extension in NOTE_EXTENSIONS:
+                with archive.open(info) as member:
+                    text = member.read().decode("utf-8", errors="replace")
+                yield IngestRecord(source_key=key, title=stem, tags=list(extra_tags), text=text)
+            elif extension in NDJSON_EXTENSIONS:
+                with archive.open(info) as member:
+                    yield from iter_ndjson(member, info.filename, extra_tags)
+
+
+def iter_source(path: str, extra_tags: Optional[List[str]] = None) -> Iterator[IngestRecord]:
+    extra_tags = extra_tags or []
+    if os.path.isdir(path):
+        return iter_directory(path, extra_tags)
+    if zipfile.is_zipfile(path):
+        return iter_zip(path, extra_tags)
+    return _iter_ndjson_file(path, extra_tags)
+
+
+def _iter_ndjson_file(path: str, extra_tags: List[str]) -> Iterator[IngestRecord]:
+    with open(path, encoding="utf-8") as f:
+        yield from iter_ndjson(f, path, extra_tags)
+
+
+# --- Przetwarzanie partii ---
+class BulkIngestor:
+    def __init__(self, batch_size: int = INGEST_BATCH_SIZE, zip_path: Optional[str] = None):
+        self.batch_size = batch_size
+        self.zip_path = zip_path # PDF-y z archiwum ZIP są wypakowywane dopiero w partii
+        self.stats = IngestStats()
+
+    def run(self, records: Iterable[IngestRecord], progress: Optional[Callable[[IngestStats], None]] = None) -> IngestStats:
+        iterator = iter(records)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                break
+            self._process_batch(batch)
+            if progress is not None:
+                progress(self.stats)
+        return self.stats
+
+    def _pending(self, batch: List[IngestRecord]) -> List[IngestRecord]:
+        keys = [record.source_key for record in batch]
+        with open_session() as session:
+            done = set(session.exec(select(IngestCheckpoint.source_key).where(IngestCheckpoint.source_key.in_(keys))).all())
+        pending, seen = [], set()
+        for record in batch:
+            if record.source_key in done or record.source_key in seen:
+                self.stats.skipped += 1
+                continue
+            seen.add(record.source_key)
+            pending.append(record)
+        return pending
+
+    def _materialize_pdfs(self, records: List[IngestRecord]) -> List[IngestRecord]:
+        """Kopiuje PDF-y partii do plików tymczasowych (z katalogu albo z archiwum ZIP).
+
+        Zwraca rekordy do dalszego przetwarzania - duplikaty (po SHA-256, także w obrębie partii)
+        są usuwane z dysku i liczone jako pominięte. Do magazynu pliki trafiają przy zapisie partii.
+        """
+        staged = []
+        archive = zipfile.ZipFile(self.zip_path) if self.zip_path else None
+        try:
+            for record in records:
+                if archive is not None:
+                    with archive.open(record.pdf_path) as member:
+                        staged.append((record, *_stage_pdf(member)))
+                else:
+                    with open(record.pdf_path, "rb") as source:
+                        staged.append((record, *_stage_pdf(source)))
+        finally:
+            if archive is not None:
+                archive.close()
+
+        hashes = [content_hash for _, _, content_hash in staged]
+        with open_session() as session:
+            known = set(session.exec(
+                select(KnowledgeItem.content_hash).where(
+                    KnowledgeItem.content_hash.in_(hashes), KnowledgeItem.original_filename.is_not(None)
+                )
+            ).all()) if hashes else set()
+        unique = []
+        for record, path, content_hash in staged:
+            if content_hash in known:
+                os.remove(path)
+                self.stats.skipped += 1
+                continue
+            known.add(content_hash)
+            record.content_hash = content_hash
+            record.pdf_path = path
+            unique.append(record)
+        return unique
+
+    def _process_batch(self, batch: List[IngestRecord]):
+        records = self._pending(batch)
+        if not records:
+            return
+
+        pdf_records = self._materialize_pdfs([record for record in records if record.pdf_path])
+        try:
+            self._store_batch(records, pdf_records)
+        finally:
+            # Pliki tymczasowe przejęte przez magazyn już nie istnieją - zostają te z nieudanych rekordów
+            for record in pdf_records:
+                if os.path.exists(record.pdf_path):
+                    os.remove(record.pdf_path)
+
+    def _store_batch(self, records: List[IngestRecord], pdf_records: List[IngestRecord]):
+        # 1. Tekst PDF-ów partii - równolegle w puli procesów
+        kept = {id(record) for record in pdf_records}
+        records = [record for record in records if not record.pdf_path or id(record) in kept]
+        pages_by_record = {}
+        futures = {id(record): get_process_pool().submit(extract_pdf_pages, record.pdf_path) for record in pdf_records}
+        for record in pdf_records:
+            try:
+                pages_by_record[id(record)] = futures[id(record)].result()
+            except Exception as e:
+                logger.warning("Failed to extract %s: %s", record.original_filename, e)
+        prepared = []
+        for record in records:
+            pages = pages_by_record.get(id(record)) if record.pdf_path else [(None, record.text or "")]
+            text = "".join(page_text for _, page_text in pages or [])
+            if not text.strip():
+                self.stats.failed += 1
+                continue
+            prepared.append((record, text, chunk_pages(pages)))
+
+        # 2. Jeden batch embeddingów dla fragmentów i tagów całej partii
+        texts = []
+        for record, _, chunks in prepared:
+            texts.extend(chunk.text for chunk in chunks)
+            tags_text = " ".join(record.tags)
+            if tags_text:
+                texts.append(tags_text)
+        vectors = embed_texts_cached(texts)
+
+        item_rows, chunk_groups = [], []
+        position = 0
+        now = datetime.utcnow()
+        for record, text, chunks in prepared:
+            chunk_vectors = vectors[position:position + len(chunks)]
+            position += len(chunks)
+            tags_embedding = None
+            if record.tags:
+                tags_embedding = vectors[position]
+                position += 1
+            knowledge_chunks, content_embedding = embed_chunks(chunks, chunk_vectors)
+            item_rows.append({
+                "title": record.title,
+                "text_content": text,
+                "original_filename": record.original_filename,
+                "content_hash": record.content_hash or text_sha256(text),
+                "tags": record.tags,
+                "embedding": content_embedding,
+                "tags_embedding": tags_embedding,
+                "embedding_model": EMBEDDING_MODEL_NAME,
+                "created_at": now,
+                "updated_at": now,
+            })
+            chunk_groups.append(knowledge_chunks)
+
+        # 3. PDF-y do magazynu (przed elementami, które je wskazują), potem wielowierszowe
+        #    INSERT-y (insertmanyvalues) i jeden commit na partię
+        store = get_blob_store()
+        for record, _, _ in prepared:
+            if record.content_hash and record.pdf_path:
+                store.put_file(record.content_hash, record.pdf_path)
+        with open_session() as session:
+            item_ids = session.execute(
+                insert(KnowledgeItem).returning(KnowledgeItem.id, sort_by_parameter_order=True),
+                item_rows,
+            ).scalars().all()
+            chunk_rows = [
+                {
+                    "item_id": item_id,
+                    "page": chunk.page,
+                    "chunk_offset": chunk.chunk_offset,
+                    "chunk_length": chunk.chunk_length,
+                    "content_offset": chunk.content_offset,
+                    "embedding": chunk.embedding,
+                    "embedding_model": chunk.embedding_model,
+                }
+                for item_id, knowledge_chunks in zip(item_ids, chunk_groups)
+                for chunk in knowledge_chunks
+            ]
+            if chunk_rows:
+                session.execute(insert(KnowledgeChunk), chunk_rows)
+            for item_id in item_ids:
+                refresh_related(session, item_id)
+            session.execute(
+                insert(IngestCheckpoint),
+                [
+                    {"source_key": record.source_key, "item_id": item_id, "created_at": now}
+                    for (record, _, _), item_id in zip(prepared, item_ids)
+                ],
+            )
+            version = bump_db_version(session, item_ids)
+            session.commit()
+        get_search_cache().bump_corpus_version()
+        publish_changes(version, upserts=[
+            (item_id, row["embedding"], row["tags_embedding"]) for item_id, row in zip(item_ids, item_rows)
+        ])
+
+        self.stats.imported += len(item_ids)
+        self.stats.chunks += len(chunk_rows)
+
+
+def ingest_path(path: str, batch_size: int = INGEST_BATCH_SIZE, tags: Optional[List[str]] = None,
+                progress: Optional[Callable[[IngestStats], None]] = None) -> IngestStats:
+    zip_path = path if not os.path.isdir(path) and zipfile.is_zipfile(path) else None
+    ingestor = BulkIngestor(batch_size=batch_size, zip_path=zip_path)
+    return ingestor.run(iter_source(path, tags), progress)
+
+
+# --- Import masowy jako zadanie w tle (endpoint bulk_import) ---
+async def run_bulk_job(job_id: str, path: str, tags: List[str]):
+    def progress(stats: IngestStats):
+        # Wywoływane w wątku puli - zapis synchroniczny
+        _update_job(job_id, items_imported=stats.imported, items_skipped=stats.skipped, chunks_embedded=stats.chunks)
+
+    try:
+        await update_job(job_id, status="embedding")
+        stats = await run_in_threadpool(ingest_path, path, INGEST_BATCH_SIZE, tags, progress)
+        await update_job(job_id, status="completed", items_imported=stats.imported, items_skipped=stats.skipped,
+                         chunks_embedded=stats.chunks)
+    except Exception as e:
+        logger.exception("Bulk import job %s failed", job_id)
+        await update_job(job_id, status="failed", error=str(e))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def schedule_bulk_job(job_id: str, path: str, tags: List[str]):
+    task = asyncio.create_task(run_bulk_job(job_id, path, tags))
+    track_job(job_id, task)
+
+
+def main():
+    from .database import _init_db_connection, create_db_and_tables
+    from .ingestion import shutdown_process_pool
+    from .logging_config import configure_logging
+    from .embeddings import embedding_service
+
+    parser = argparse.ArgumentParser(description="Import masowy notatek i PDF-ów do Knowledge Assistant")
+    parser.add_argument("path", help="Katalog, plik NDJSON albo archiwum ZIP")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Elementy na transakcję")
+    parser.add_argument("--tags", default="", help="Tagi dodawane do każdego elementu (oddzielone przecinkami)")
+    args = parser.parse_args()
+
+    configure_logging()
+    _init_db_connection(statement_timeout_ms=0) # Przebiegi wsadowe - długie zapytania są tu normalne
+    create_db_and_tables()
+
+    def report(stats: IngestStats):
+        print(f"imported={stats.imported} skipped={stats.skipped} failed={stats.failed} chunks={stats.chunks}")
+
+    try:
+        stats = ingest_path(args.path, args.batch_size, _parse_tags(args.tags), progress=report)
+    finally:
+        embedding_service.stop()
+        shutdown_process_pool()
+    print("Done.")
+    report(stats)
+
+
+if __name__ == "__main__":
+    main()
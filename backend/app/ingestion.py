@@ -0,0 +1,240 @@
+# knowledge-assistant/backend/app/ingestion.py
+# Asynchroniczna ingestia PDF: ekstrakcja w puli procesów, embedding w serwisie embeddingów,
+# zapis w bazie. Stan zadania trzymamy w tabeli ingestion_job, więc widzą go wszystkie workery.
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlmodel import Session
+
+from .chunking import chunk_pages
+from .crud import create_knowledge_item
+from .database import open_session
+from .embeddings import embed_chunks, embedding_service
+from .embedding_cache import embed_texts_cached
+from .models import IngestionJob
+from .pdf_text import count_pdf_pages, extract_page_range
+from .storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# Liczba procesów parsujących PDF (pypdf jest czysto pythonowy - wątki nie dają równoległości)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 2)))
+# Ile stron parsuje jedno zadanie w puli - duże PDF-y dzielą się na kilka procesów
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "25"))
+# Ile fragmentów wysyłamy naraz do serwisu embeddingów (co tyle aktualizujemy postęp)
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "256"))
+# Maks. liczba zadań przetwarzanych równolegle w jednym workerze aplikacji
+INGEST_MAX_CONCURRENT_JOBS = int(os.getenv("INGEST_MAX_CONCURRENT_JOBS", "4"))
+# Zadania działają w pętli zdarzeń workera - po jego śmierci (restart, OOM) nikt ich nie dokończy.
+# Worker co INGEST_JOB_HEARTBEAT_S odświeża updated_at swoich zadań; zadanie w toku bez odświeżenia
+# od INGEST_JOB_STALE_S sekund jest oznaczane jako failed (przy starcie i okresowo w każdym workerze).
+INGEST_JOB_HEARTBEAT_S = int(os.getenv("INGEST_JOB_HEARTBEAT_S", "30"))
+INGEST_JOB_STALE_S = int(os.getenv("INGEST_JOB_STALE_S", "120"))
+
+FINISHED_JOB_STATUSES = ("completed", "failed")
+INTERRUPTED_JOB_ERROR = "Job interrupted: the server stopped before it finished. Please submit it again."
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_job_slots: Optional[asyncio.Semaphore] = None
+_running_tasks: set = set() # Silne referencje, żeby zadania nie zostały zebrane przez GC
+_active_jobs: set = set() # Id zadań wykonywanych w tym procesie (heartbeat)
+_job_monitor: Optional[asyncio.Task] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn zamiast fork: proces rodzica ma już wątki torcha i połączenia do bazy
+        _process_pool = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+# --- Stan zadań ---
+def create_job(title: str, original_filename: str, tags: List[str], **fields) -> IngestionJob:
+    job = IngestionJob(id=uuid.uuid4().hex, title=title, original_filename=original_filename, tags=tags, **fields)
+    with open_session() as session:
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    return job
+
+
+def _update_job(job_id: str, **fields):
+    with open_session() as session:
+        job = session.get(IngestionJob, job_id)
+        if job is None:
+            return
+        for name, value in fields.items():
+            setattr(job, name, value)
+        session.add(job)
+        session.commit()
+
+
+async def update_job(job_id: str, **fields):
+    await run_in_threadpool(_update_job, job_id, **fields)
+
+
+def track_job(job_id: str, task: asyncio.Task):
+    """Trzyma referencję do zadania w tle i odświeża jego heartbeat, dopóki się nie skończy."""
+    _running_tasks.add(task)
+    _active_jobs.add(job_id)
+
+    def finished(done: asyncio.Task):
+        _running_tasks.discard(done)
+        _active_jobs.discard(job_id)
+
+    task.add_done_callback(finished)
+
+
+def check_jobs(session: Session, now: Optional[datetime] = None) -> int:
+    """Heartbeat zadań tego procesu; zadania w toku bez heartbeatu od INGEST_JOB_STALE_S oznacza jako failed.
+
+    Zwraca liczbę zadań oznaczonych jako przerwane.
+    """
+    now = now or datetime.utcnow()
+    unfinished = IngestionJob.status.not_in(FINISHED_JOB_STATUSES)
+    if _active_jobs:
+        session.execute(
+            update(IngestionJob).where(IngestionJob.id.in_(list(_active_jobs)), unfinished).values(updated_at=now)
+        )
+    interrupted = session.execute(
+        update(IngestionJob)
+        .where(unfinished, IngestionJob.updated_at < now - timedelta(seconds=INGEST_JOB_STALE_S))
+        .values(status="failed", error=INTERRUPTED_JOB_ERROR, updated_at=now)
+    ).rowcount
+    session.commit()
+    if interrupted:
+        logger.warning("Marked %d interrupted ingestion jobs as failed", interrupted)
+    return interrupted
+
+
+def _check_jobs():
+    with open_session() as session:
+        check_jobs(session)
+
+
+async def _monitor_jobs():
+    while True:
+        await asyncio.sleep(INGEST_JOB_HEARTBEAT_S)
+        try:
+            await run_in_threadpool(_check_jobs)
+        except Exception as e:
+            logger.warning("Ingestion job check failed: %s", e)
+
+
+def start_job_monitor():
+    """Uruchamia okresowy heartbeat / sprzątanie zadań w pętli zdarzeń workera (on_startup)."""
+    global _job_monitor
+    if _job_monitor is None or _job_monitor.done():
+        _job_monitor = asyncio.get_running_loop().create_task(_monitor_jobs())
+
+
+# --- Przetwarzanie ---
+async def _extract_pages(job_id: str, pdf_path: str) -> List[tuple]:
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    pages_total = await loop.run_in_executor(pool, count_pdf_pages, pdf_path)
+    await update_job(job_id, status="extracting", pages_total=pages_total)
+
+    tasks = [
+        loop.run_in_executor(pool, extract_page_range, pdf_path, start, min(start + INGEST_PAGES_PER_TASK, pages_total))
+        for start in range(0, pages_total, INGEST_PAGES_PER_TASK)
+    ]
+    pages: List[tuple] = []
+    for finished in asyncio.as_completed(tasks):
+        pages.extend(await finished)
+        await update_job(job_id, pages_extracted=len(pages))
+    pages.sort(key=lambda page: page[0])
+    return pages
+
+
+async def _embed_texts(job_id: str, texts: List[str]) -> List[List[float]]:
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), INGEST_EMBED_BATCH):
+        # embed_sync czeka na miejsce w kolejce zamiast zwracać 503 - zadanie w tle może poczekać;
+        # fragmenty zakodowane już wcześniej (cache embeddingów) omijają model
+        vectors.extend(await run_in_threadpool(
+            embed_texts_cached, texts[start:start + INGEST_EMBED_BATCH], None, embedding_service.embed_sync
+        ))
+        await update_job(job_id, chunks_embedded=len(vectors))
+    return vectors
+
+
+def _store(title: str, full_text: str, original_filename: str, tags: List[str], knowledge_chunks, embedding, tags_embedding,
+           content_hash: Optional[str]) -> int:
+    with open_session() as session:
+        item = create_knowledge_item(
+            session,
+            title=title,
+            text_content=full_text,
+            original_filename=original_filename,
+            tags=tags,
+            knowledge_chunks=knowledge_chunks,
+            embedding=embedding,
+            tags_embedding=tags_embedding,
+            content_hash=content_hash,
+        )
+        return item.id
+
+
+async def run_pdf_job(job_id: str, pdf_path: str, title: str, original_filename: str, tags: List[str],
+                      content_hash: Optional[str] = None):
+    """Pełna ingestia jednego pliku (pdf_path - plik tymczasowy uploadu); błędy zapisujemy w zadaniu zamiast zwracać 500."""
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(INGEST_MAX_CONCURRENT_JOBS)
+    async with _job_slots:
+        try:
+            pages = await _extract_pages(job_id, pdf_path)
+            full_text = "".join(page_text for _, page_text in pages)
+            if not full_text.strip():
+                await update_job(job_id, status="failed", error="Could not extract text from PDF or PDF is empty.")
+                return
+
+            chunks = chunk_pages(pages)
+            await update_job(job_id, status="embedding", chunks_total=len(chunks))
+            vectors = await _embed_texts(job_id, [chunk.text for chunk in chunks])
+            tags_concatenated = " ".join(tags)
+            tags_embedding = (await run_in_threadpool(embed_texts_cached, [tags_concatenated], None, embedding_service.embed_sync))[0] if tags_concatenated else None
+            knowledge_chunks, content_embedding = embed_chunks(chunks, vectors)
+
+            await update_job(job_id, status="storing")
+            if content_hash:
+                # Blob przed elementem; put_file przejmuje plik tymczasowy z uploadu
+                await run_in_threadpool(get_blob_store().put_file, content_hash, pdf_path)
+            item_id = await run_in_threadpool(
+                _store, title, full_text, original_filename, tags, knowledge_chunks, content_embedding, tags_embedding, content_hash
+            )
+            await update_job(job_id, status="completed", item_id=item_id)
+        except Exception as e:
+            logger.exception("Ingestion job %s failed", job_id)
+            await update_job(job_id, status="failed", error=str(e))
+        finally:
+            # Plik tymczasowy uploadu zostaje tylko po błędzie albo pustym PDF-ie
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+
+
+def schedule_pdf_job(job_id: str, pdf_path: str, title: str, original_filename: str, tags: List[str],
+                     content_hash: Optional[str] = None):
+    """Uruchamia zadanie w tle w bieżącej pętli zdarzeń."""
+    task = asyncio.create_task(run_pdf_job(job_id, pdf_path, title, original_filename, tags, content_hash))
+    track_job(job_id, task)
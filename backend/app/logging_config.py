@@ -0,0 +1,52 @@
+# knowledge-assistant/backend/app/logging_config.py
+# Logowanie z poziomami zamiast print(): LOG_LEVEL wybiera poziom, LOG_FORMAT=json daje jedną linię
+# JSON na wpis (pola z extra={...} trafiają do obiektu). Argumenty w stylu logger.debug("%s", x)
+# są formatowane tylko wtedy, gdy poziom jest włączony.
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# text | json
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Atrybuty każdego LogRecord - wszystko poza nimi pochodzi z extra
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_configured = False
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """Handler na stderr dla loggera "app" (idempotentne - wołane przez aplikację i CLI)."""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger = logging.getLogger("app")
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    _configured = True
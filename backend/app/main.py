@@ -1,21 +1,60 @@
 # knowledge-assistant/backend/app/main.py
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Query
-from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import Field, SQLModel, create_engine, Session, select
+from sqlmodel import Session, select
+from sqlalchemy import func, text, tuple_
 from typing import Optional, List
+import logging
 import os
-import time
-from pypdf import PdfReader # Do ekstrakcji PDF
-from sentence_transformers import SentenceTransformer # Do generowania embeddingów
-import numpy as np # Do pracy z numpy array (embeddingami)
-from sqlalchemy import Column, ARRAY, Float, String, text # Dodaj String tutaj
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse, JSONResponse, Response
 from datetime import datetime
-from sklearn.metrics.pairwise import cosine_similarity # Do obliczania podobieństwa cosinusowego
-from fastapi.responses import FileResponse, StreamingResponse
-from fpdf import FPDF
-import shutil
-from io import BytesIO
+from .search import lexical_matches, ranked_lexical_matches, search_hits
+from .hybrid import HYBRID_FUSION, HYBRID_LEXICAL_WEIGHT, HYBRID_SEMANTIC_WEIGHT, LegResult, hybrid_rank
+from .chunking import chunk_pages
+from .pdf_text import extract_pdf_pages
+from .embedding_service import EmbeddingQueueFullError
+from .models import (
+    EMBEDDING_FALLBACK_MODEL,
+    EMBEDDING_MODEL_NAME,
+    EmbeddingMigrationStatus,
+    IngestionJob,
+    KnowledgeChunk,
+    KnowledgeItem,
+    KnowledgeItemRead,
+    KnowledgeItemSummary,
+    RelatedItem,
+    SemanticSearchHit,
+    TagCount,
+)
+from .database import get_session, pool_status
+from .embeddings import (
+    embedding_service,
+    fallback_embedding_service,
+    generate_embedding,
+    generate_fallback_embedding,
+    embed_chunks,
+)
+from .embedding_cache import aembed_texts_cached, embed_texts_cached, embedding_reuse_stats, text_sha256
+from .crud import save_chunks, create_knowledge_item, find_pdf_by_hash
+from .cache import get_search_cache
+from .related import RELATED_K, get_related, rebuild_related, referencing_items, refresh_related
+from .vector_index import bump_db_version, get_vector_index, publish_changes, read_db_version
+from .similarity import SEARCH_CONTENT_WEIGHT, SEARCH_TAGS_WEIGHT, blend_similarity, dot_distance, item_similarities, to_similarity
+from .uploads import PDF_UPLOAD_DIR, MAX_UPLOAD_BYTES, UploadTooLargeError, incoming_upload_path, save_upload
+from .ingestion import create_job, schedule_pdf_job, shutdown_process_pool, start_job_monitor
+from .ingest import schedule_bulk_job
+from . import startup
+from .storage import get_blob_store, resolve_legacy_path
+from .reembed import MigrationRunningError, fallback_in_use, migration_status, request_pause, start_migration, stop_migration
+from .tags import facet_counts, list_tags, parse_tags, tag_condition
+from .export import cached_note_pdf, drop_cached_note_pdfs, etag_matches, iter_ndjson_export, iter_zip_export, note_pdf_etag
+from . import metrics
+from .metrics import TimingMiddleware, stage
+from .logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # --- Aplikacja FastAPI ---
 app = FastAPI()
@@ -28,121 +67,87 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
 )
+# Czas każdego żądania (histogram per trasa) - GET /metrics
+app.add_middleware(TimingMiddleware)
 
-# --- Konfiguracja bazy danych ---
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/knowledge_db")
-engine = None # Inicjalizacja engine na None
-max_retries = 10
-retry_delay = 5 # seconds
-
-# --- Modele Danych (SQLModel) ---
-class KnowledgeItem(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    title: str
-    text_content: str
-    original_filename: Optional[str] = None
-
-    # Zmieniona definicja tags: teraz używamy Column(ARRAY(String))
-    # Należy zaimportować String z sqlalchemy.
-    # Field() w SQLModel nie zawsze dobrze współpracuje z List[str] i sa_column_kwargs={"type": "text[]"}
-    # Jawne użycie Column(ARRAY(String)) jest bardziej klarowne i niezawodne.
-    tags: List[str] = Field(default_factory=list, sa_column=Column(ARRAY(String))) # <- ZMIANA TUTAJ
-
-    # Embedding wektorowy dla treści (zostaje)
-    embedding: Optional[List[float]] = Field(default=None, sa_column=Column(ARRAY(Float)))
-
-    # NOWOŚĆ: Embedding wektorowy dla skonsolidowanych tagów (zostaje)
-    tags_embedding: Optional[List[float]] = Field(default=None, sa_column=Column(ARRAY(Float)))
-
-    # Domyślne daty
-    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, nullable=False)
-    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow}, nullable=False)
-
-    __tablename__ = "knowledgeitem"
-
-# --- Inicjalizacja silnika bazy danych ---
-def create_db_and_tables():
-    # Upewniamy się, że engine jest zainicjalizowany przed użyciem
-    if engine is None:
-        print("Database engine not initialized. Retrying connection...")
-        _init_db_connection() # Spróbuj ponownie nawiązać połączenie
-
-    print("Creating database tables if they don't exist...")
-    SQLModel.metadata.create_all(engine)
-    print("Database tables created (or already exist).")
-    # NOWOŚĆ: Upewniamy się, że pgvector jest włączony
-    try:
-        with Session(engine) as session:
-            session.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
-            session.commit()
-            print("pgvector extension ensured.")
-    except Exception as e:
-        print(f"Failed to ensure pgvector extension: {e}")
-        # Nie rzucamy wyjątku, jeśli to nie jest krytyczne dla startu, ale logujemy.
-
-# Funkcja do nawiązania połączenia z bazą danych z ponawianiem
-def _init_db_connection():
-    global engine
-    for i in range(max_retries):
-        try:
-            print(f"Attempting to connect to database ({i+1}/{max_retries})...")
-            engine = create_engine(DATABASE_URL)
-            # Testowe zapytanie aby sprawdzić połączenie
-            with Session(engine) as session:
-                session.execute(text("SELECT 1"))
-            print("Successfully connected to the database!")
-            return
-        except Exception as e:
-            print(f"Database connection failed: {e}")
-            if i < max_retries - 1:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-            else:
-                print("Max retries reached. Could not connect to database.")
-                raise # Rzuć wyjątek, jeśli nie udało się połączyć po wielu próbach
-
-# --- Funkcja do generowania embeddingów ---
-model = None # Model do embeddingów
-def get_embedding_model():
-    global model
-    if model is None:
-        print("Loading Sentence Transformer model...")
-        # Użyj modelu wielojęzycznego który lepiej obsługuje polski
-        model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-        print("Multilingual Sentence Transformer model loaded.")
-    return model
-
-def generate_embedding(text: str) -> List[float]:
-    embedding_model = get_embedding_model()
-    # Ensure input is a string
-    if not isinstance(text, str):
-        text = str(text) # Convert to string if not already
-    embedding = embedding_model.encode(text)
-    return embedding.tolist() # Zwracamy listę floatów, aby pasowało do typu w SQLModel/pgvector
-
-# --- Zależność do sesji bazy danych ---
-def get_session():
-    with Session(engine) as session:
-        yield session
-
-# Ścieżka do katalogu na pliki PDF
-PDF_UPLOAD_DIR = os.getenv("PDF_UPLOAD_DIR", "uploaded_pdfs")
-os.makedirs(PDF_UPLOAD_DIR, exist_ok=True)
+# Ile najbliższych chunków pobieramy na jeden oczekiwany wynik (dokument ma zwykle kilka trafień)
+CHUNK_CANDIDATES_PER_ITEM = int(os.getenv("CHUNK_CANDIDATES_PER_ITEM", "5"))
+
+# Skan HNSW w pgvector 0.7 zwraca najwyżej hnsw.ef_search wierszy (domyślnie 40, maksymalnie 1000) -
+# zapytanie z większym LIMIT po cichu dostałoby mniej kandydatów
+HNSW_EF_SEARCH_DEFAULT = 40
+HNSW_EF_SEARCH_MAX = 1000
+
+# Liczba znaków treści zwracana jako podgląd na liście elementów
+LIST_PREVIEW_CHARS = int(os.getenv("LIST_PREVIEW_CHARS", "300"))
 
 # Zdarzenia startu/stopu aplikacji
 @app.on_event("startup")
 def on_startup():
-    _init_db_connection() # Nawiąż połączenie przy starcie
-    create_db_and_tables() # Utwórz tabele i włącz pgvector
-    # W przyszłości uruchom model do generowania embeddingów tutaj asynchronicznie, jeśli jest duży
-    # Upewnij się, że model jest załadowany przy starcie dla lepszej wydajności
-    get_embedding_model()
-
+    # Baza, model (z rozgrzewką) i indeks wektorowy ładują się w tle - worker od razu
+    # odpowiada na /health, a /ready zwraca 200 dopiero po załadowaniu wszystkiego
+    embedding_service.start()
+    start_job_monitor() # Heartbeat zadań ingestii tego workera i sprzątanie przerwanych
+    startup.start_background_startup()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_migration() # Zadanie migracji kończy bieżącą partię (status paused) - wznowienie od kolejnej
+    embedding_service.stop()
+    fallback_embedding_service.stop()
+    shutdown_process_pool()
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Odrzuć zbyt duże żądania po nagłówku, zanim FastAPI zacznie parsować formularz
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large."})
+    return await call_next(request)
+
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+@app.exception_handler(EmbeddingQueueFullError)
+async def embedding_queue_full_handler(request: Request, exc: EmbeddingQueueFullError):
+    # Przeciążenie - klient może ponowić żądanie
+    return JSONResponse(status_code=503, content={"detail": "Embedding service is busy, try again later."}, headers={"Retry-After": "1"})
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Liczniki trafień/chybień cache embeddingów zapytań i wyników wyszukiwania,
+    liczba tekstów, których nie trzeba było ponownie kodować, i stan puli połączeń (per worker)."""
+    vector_index = get_vector_index()
+    return {
+        **get_search_cache().stats(),
+        "embedding_reuse": embedding_reuse_stats(),
+        "vector_index": vector_index.stats() if vector_index is not None else None,
+        "db_pool": pool_status(),
+    }
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Metryki w formacie tekstowym Prometheusa (przy gunicornie - zsumowane ze wszystkich workerów)."""
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
 
 @app.get("/health")
 async def health_check():
+    """Liveness - proces działa i obsługuje żądania (bez sprawdzania bazy i modelu)."""
     return {"status": "ok", "message": "Backend is running!"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness - 200 dopiero, gdy baza, model i (opcjonalnie) indeks wektorowy są gotowe."""
+    state = startup.readiness
+    if state is None:
+        return JSONResponse(status_code=503, content={"status": "starting", "components": {}})
+    if state.is_ready():
+        return {"status": "ready", "components": state.snapshot()}
+    return JSONResponse(status_code=503, content={"status": "not_ready", "components": state.snapshot()})
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Knowledge Assistant Backend! Access /health to check status."}
@@ -157,26 +162,58 @@ async def upload_text_note(
     session: Session = Depends(get_session)
 ):
     item_tags = [tag.strip() for tag in tags.split(',')] if tags else []
-    # Generowanie embeddingu dla treści
-    content_embedding = generate_embedding(content)
+    # Podział długiej notatki to praca CPU - w puli wątków, żeby nie blokować pętli zdarzeń
+    with stage("upload_text", "chunk"):
+        chunks = await run_in_threadpool(chunk_pages, [(None, content)])
 
     # NOWOŚĆ: Generowanie embeddingu dla skonsolidowanych tagów
     # Łączymy wszystkie tagi w jeden string, aby wygenerować jeden embedding dla całej "kategorii"
     tags_concatenated = " ".join(item_tags)
-    tags_embedding = generate_embedding(tags_concatenated) if tags_concatenated else None
 
+    # Fragmenty treści i tagi w jednym żądaniu do serwisu embeddingów (await - pętla nie jest blokowana);
+    # teksty już raz zakodowane (np. ta sama notatka dodana ponownie) bierzemy z cache embeddingów
+    with stage("upload_text", "embed"):
+        vectors = await aembed_texts_cached([chunk.text for chunk in chunks] + ([tags_concatenated] if tags_concatenated else []))
+    tags_embedding = vectors.pop() if tags_concatenated else None
+
+    with stage("upload_text", "commit"):
+        return await run_in_threadpool(
+            _store_item,
+            session,
+            chunks,
+            vectors,
+            title=title,
+            text_content=content,
+            tags=item_tags,
+            tags_embedding=tags_embedding,
+            content_hash=text_sha256(content),
+        )
 
-    knowledge_item = KnowledgeItem(
-        title=title,
-        text_content=content,
-        tags=item_tags,
-        embedding=content_embedding,
-        tags_embedding=tags_embedding # Przypisujemy embedding tagów
-    )
-    session.add(knowledge_item)
-    session.commit()
-    session.refresh(knowledge_item)
-    return knowledge_item
+def _store_item(session: Session, chunks, vectors, **fields) -> KnowledgeItem:
+    """Średnia embeddingów fragmentów i zapis elementu (synchroniczne zapytania) - wołane z puli wątków."""
+    # Embedding notatki to średnia embeddingów fragmentów
+    knowledge_chunks, content_embedding = embed_chunks(chunks, vectors)
+    return create_knowledge_item(session, knowledge_chunks=knowledge_chunks, embedding=content_embedding, **fields)
+
+def _extract_pdf_chunks(pdf_path: str):
+    """Tekst stron i fragmenty - pypdf i dzielenie są synchroniczne, wołane z puli wątków."""
+    pages = extract_pdf_pages(pdf_path)
+    return "".join(page_text for _, page_text in pages), chunk_pages(pages)
+
+async def _save_pdf_upload(pdf_file: UploadFile, session: Session):
+    """Zapisuje upload pod tymczasową nazwą i sprawdza hash; zwraca (plik tymczasowy, hash, istniejący duplikat).
+
+    Duplikat jest usuwany od razu i nie jest parsowany. Plik tymczasowy trafia do magazynu
+    (pod swoim hashem) dopiero tuż przed zapisem elementu - _store_pdf_blob.
+    """
+    incoming_path = incoming_upload_path()
+    saved = await save_upload(pdf_file, incoming_path)
+    duplicate = await run_in_threadpool(find_pdf_by_hash, session, saved.sha256)
+    if duplicate is not None:
+        os.remove(incoming_path)
+        logger.info("Duplicate PDF %s matches item %s, skipping", pdf_file.filename, duplicate.id)
+        return None, saved.sha256, duplicate
+    return incoming_path, saved.sha256, None
 
 @app.post("/api/knowledge_items/upload_pdf", response_model=KnowledgeItem)
 async def upload_pdf_file(
@@ -185,204 +222,412 @@ async def upload_pdf_file(
     tags: Optional[str] = File(None), # Tags from form data
     session: Session = Depends(get_session)
 ):
+    pdf_path = None
     try:
         # Zapisz oryginalny plik PDF na dysku
-        pdf_path = os.path.join(PDF_UPLOAD_DIR, pdf_file.filename)
-        with open(pdf_path, "wb") as f:
-            shutil.copyfileobj(pdf_file.file, f)
-        pdf_file.file.seek(0)  # Reset do ekstrakcji tekstu
+        # Kopiujemy porcjami z limitem rozmiaru, a tekst czytamy już z pliku na dysku
+        # Ten sam plik (identyczne bajty) zwraca istniejący element bez parsowania i embeddingu
+        with stage("upload_pdf", "save"):
+            pdf_path, content_hash, duplicate = await _save_pdf_upload(pdf_file, session)
+        if duplicate is not None:
+            return duplicate
         # Ekstrakcja tekstu z PDF
-        reader = PdfReader(pdf_file.file)
-        full_text = ""
-        for page in reader.pages:
-            full_text += page.extract_text() or ""
+        # Tekst per strona - potrzebny do fragmentów z numerami stron.
+        # Embeddingi nakładających się fragmentów stron (batch) zamiast jednego
+        # embeddingu całego pliku, który model i tak uciąłby po pierwszym akapicie.
+        # pypdf jest synchroniczny, więc parsujemy i dzielimy w puli wątków.
+        with stage("upload_pdf", "extract"):
+            full_text, chunks = await run_in_threadpool(_extract_pdf_chunks, pdf_path)
 
         if not full_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract text from PDF or PDF is empty.")
 
         item_tags = [tag.strip() for tag in tags.split(',')] if tags else []
 
-        # Generowanie embeddingu dla treści
-        content_embedding = generate_embedding(full_text)
-
         # NOWOŚĆ: Generowanie embeddingu dla skonsolidowanych tagów
         tags_concatenated = " ".join(item_tags)
-        tags_embedding = generate_embedding(tags_concatenated) if tags_concatenated else None
 
-        knowledge_item = KnowledgeItem(
-            title=title,
-            text_content=full_text,
-            original_filename=pdf_file.filename,
-            tags=item_tags,
-            embedding=content_embedding,
-            tags_embedding=tags_embedding # Przypisujemy embedding tagów
-        )
-        session.add(knowledge_item)
-        session.commit()
-        session.refresh(knowledge_item)
-        return knowledge_item
+        with stage("upload_pdf", "embed"):
+            vectors = await aembed_texts_cached([chunk.text for chunk in chunks] + ([tags_concatenated] if tags_concatenated else []))
+        tags_embedding = vectors.pop() if tags_concatenated else None
+
+        # Blob przed elementem - element nigdy nie wskazuje brakującego pliku (najwyżej zostaje
+        # osierocony blob, który kolejny upload tych samych bajtów i tak wykorzysta)
+        with stage("upload_pdf", "store"):
+            await run_in_threadpool(get_blob_store().put_file, content_hash, pdf_path)
+        with stage("upload_pdf", "commit"):
+            return await run_in_threadpool(
+                _store_item,
+                session,
+                chunks,
+                vectors,
+                title=title,
+                text_content=full_text,
+                original_filename=pdf_file.filename,
+                content_hash=content_hash,
+                tags=item_tags,
+                tags_embedding=tags_embedding,
+            )
+    except (HTTPException, EmbeddingQueueFullError, UploadTooLargeError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
+    finally:
+        # put_file przejmuje plik tymczasowy; zostaje tylko po błędzie wcześniejszego etapu
+        if pdf_path and os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+@app.post("/api/knowledge_items/upload_pdf_async", response_model=IngestionJob, status_code=202)
+async def upload_pdf_file_async(
+    title: str = File(...),
+    pdf_file: UploadFile = File(...),
+    tags: Optional[str] = File(None),
+    session: Session = Depends(get_session),
+):
+    """Zapisuje PDF i od razu zwraca 202 z id zadania; ekstrakcja, embedding i zapis dzieją się w tle."""
+    pdf_path, content_hash, duplicate = await _save_pdf_upload(pdf_file, session)
+
+    item_tags = [tag.strip() for tag in tags.split(',')] if tags else []
+    if duplicate is not None:
+        # Duplikat - zadanie od razu zakończone i wskazuje istniejący element
+        return await run_in_threadpool(create_job, title, pdf_file.filename, item_tags, status="completed", item_id=duplicate.id)
+    job = await run_in_threadpool(create_job, title, pdf_file.filename, item_tags)
+    schedule_pdf_job(job.id, pdf_path, title, pdf_file.filename, item_tags, content_hash)
+    return job
+
+@app.post("/api/knowledge_items/bulk_import", response_model=IngestionJob, status_code=202)
+async def bulk_import(
+    archive: UploadFile = File(...), # NDJSON ({"title", "content", "tags"} w każdej linii) albo ZIP z PDF/TXT/MD/NDJSON
+    tags: Optional[str] = Form(None), # Tagi dodawane do każdego elementu
+):
+    """Import masowy w tle - postęp (items_imported/items_skipped) pod GET /api/jobs/{id}."""
+    import_dir = os.path.join(PDF_UPLOAD_DIR, ".imports")
+    os.makedirs(import_dir, exist_ok=True)
+    job = await run_in_threadpool(create_job, "Bulk import", archive.filename, parse_tags(tags))
+    extension = os.path.splitext(archive.filename or "")[1].lower() or ".ndjson"
+    import_path = os.path.join(import_dir, f"{job.id}{extension}")
+    await save_upload(archive, import_path)
+    schedule_bulk_job(job.id, import_path, parse_tags(tags))
+    return job
+
+@app.get("/api/jobs/{job_id}", response_model=IngestionJob)
+def get_ingestion_job(job_id: str, session: Session = Depends(get_session)):
+    """Status i postęp zadania ingestii (strony wyekstrahowane, fragmenty z embeddingami, id elementu)."""
+    job = session.get(IngestionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/api/knowledge_items", response_model=List[KnowledgeItemSummary])
+def get_all_knowledge_items(
+    limit: int = Query(50, ge=1, le=500, description="Rozmiar strony"),
+    after_id: Optional[int] = Query(None, description="Id ostatniego elementu z poprzedniej strony (kursor keyset)"),
+    tags: Optional[str] = Query(None, description="Tagi oddzielone przecinkami"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="any - co najmniej jeden z tagów, all - wszystkie"),
+    sort: str = Query("created_at", pattern="^(created_at|updated_at)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    session: Session = Depends(get_session)
+):
+    """Strona listy bez embeddingów i z podglądem treści; następna strona: after_id = id ostatniego elementu."""
+    sort_column = getattr(KnowledgeItem, sort)
+    statement = select(
+        KnowledgeItem.id,
+        KnowledgeItem.title,
+        func.left(KnowledgeItem.text_content, LIST_PREVIEW_CHARS).label("text_content"),
+        func.length(KnowledgeItem.text_content).label("content_length"),
+        KnowledgeItem.original_filename,
+        KnowledgeItem.tags,
+        KnowledgeItem.created_at,
+        KnowledgeItem.updated_at,
+    )
 
-@app.get("/api/knowledge_items", response_model=List[KnowledgeItem])
-async def get_all_knowledge_items(session: Session = Depends(get_session)):
-    items = session.exec(select(KnowledgeItem)).all()
-    return items
+    tag_filter = parse_tags(tags)
+    if tag_filter:
+        statement = statement.where(tag_condition(tag_filter, tags_mode)) # && / @> - korzysta z indeksu GIN
+
+    if after_id is not None:
+        # Kursor: (wartość sortowania, id) elementu after_id - bez OFFSET, koszt stały niezależnie od strony
+        cursor_value = session.exec(select(sort_column).where(KnowledgeItem.id == after_id)).first()
+        if cursor_value is None:
+            # Bez tego warunek porównywałby z NULL i zwracał pustą stronę, jakby lista się skończyła
+            raise HTTPException(status_code=400, detail="after_id does not refer to an existing item.")
+        key = tuple_(sort_column, KnowledgeItem.id)
+        cursor = tuple_(cursor_value, after_id)
+        statement = statement.where(key < cursor if order == "desc" else key > cursor)
+
+    if order == "desc":
+        statement = statement.order_by(sort_column.desc(), KnowledgeItem.id.desc())
+    else:
+        statement = statement.order_by(sort_column.asc(), KnowledgeItem.id.asc())
 
-@app.get("/api/knowledge_items/pdf/{item_id}") #NOT WORKING
-def download_pdf(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(KnowledgeItem, item_id)
-    if not item or not item.original_filename:
+    rows = session.exec(statement.limit(limit)).all()
+    return [KnowledgeItemSummary(**row._mapping) for row in rows]
+
+@app.get("/api/knowledge_items/pdf/{item_id}")
+def download_pdf(
+    item_id: int,
+    request: Request,
+    download: bool = Query(False, description="Content-Disposition: attachment zamiast inline (podgląd w przeglądarce)"),
+    session: Session = Depends(get_session),
+):
+    """Oryginalny PDF z magazynu: ETag = hash treści, Last-Modified i Range (podgląd może dociągać strony)."""
+    row = session.exec(
+        select(KnowledgeItem.original_filename, KnowledgeItem.content_hash).where(KnowledgeItem.id == item_id)
+    ).first()
+    if not row or not row.original_filename:
         raise HTTPException(status_code=404, detail="PDF not found for this item.")
-    
-    pdf_path = os.path.join(PDF_UPLOAD_DIR, item.original_filename)
-    if not os.path.exists(pdf_path):
+
+    store = get_blob_store()
+    pdf_path = None
+    headers = {"Cache-Control": "private, max-age=86400"} # Bajty pod danym hashem nigdy się nie zmieniają
+    if row.content_hash and store.exists(row.content_hash):
+        headers["ETag"] = f'"{row.content_hash}"'
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        presigned_url = store.presigned_url(row.content_hash, row.original_filename)
+        if presigned_url:
+            return RedirectResponse(presigned_url, status_code=307)
+        pdf_path = store.local_path(row.content_hash)
+    else:
+        # Plik sprzed magazynu - ETag i Last-Modified wylicza FileResponse ze stat()
+        pdf_path = resolve_legacy_path(row.original_filename)
+    if pdf_path is None:
         raise HTTPException(status_code=404, detail="PDF file not found on server.")
-    
+
     return FileResponse(
-        pdf_path, 
-        media_type="application/pdf", 
-        filename=item.original_filename,
-        headers={"Content-Disposition": f"attachment; filename={item.original_filename}"}
+        pdf_path,
+        media_type="application/pdf",
+        filename=row.original_filename,
+        content_disposition_type="attachment" if download else "inline",
+        headers=headers,
     )
 
-@app.get("/api/knowledge_items/note_pdf/{item_id}") ##NOT WORKING
-def download_note_as_pdf(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(KnowledgeItem, item_id)
-    if not item:
+@app.get("/api/knowledge_items/note_pdf/{item_id}")
+def download_note_as_pdf(item_id: int, request: Request, session: Session = Depends(get_session)):
+    """PDF notatki z cache na dysku (renderowany raz na wersję); obsługuje If-None-Match i Range."""
+    row = session.exec(select(KnowledgeItem.id, KnowledgeItem.updated_at).where(KnowledgeItem.id == item_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Note not found.")
-    
-    # Create PDF from note text
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Add content with proper encoding
-    title_text = f"Tytuł: {item.title}"
-    content_text = f"\n\n{item.text_content}"
-    
-    pdf.multi_cell(0, 10, title_text)
-    pdf.multi_cell(0, 10, content_text)
-    
-    # Generate PDF as bytes
-    pdf_bytes = BytesIO()
-    pdf_output = pdf.output(dest='S').encode('latin1')
-    pdf_bytes.write(pdf_output)
-    pdf_bytes.seek(0)
-    
-    filename = f"note_{item_id}.pdf"
-    
+    etag = note_pdf_etag(item_id, row.updated_at)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"} # no-cache = zawsze rewalidacja ETagiem
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    def load_item():
+        # Treść czytamy tylko wtedy, gdy trzeba wyrenderować nową wersję
+        return session.exec(select(KnowledgeItem.title, KnowledgeItem.text_content).where(KnowledgeItem.id == item_id)).one()
+
+    pdf_path = cached_note_pdf(item_id, row.updated_at, load_item)
+    return FileResponse(pdf_path, media_type="application/pdf", filename=f"note_{item_id}.pdf", headers=headers)
+
+@app.get("/api/export")
+def export_knowledge_base(
+    format: str = Query("zip", pattern="^(zip|ndjson)$", description="zip (notatki, PDF-y, metadane) albo ndjson (jeden element na linię)"),
+    include_pdfs: bool = Query(True, description="ZIP: dołącz oryginalne pliki PDF"),
+):
+    """Eksport całej bazy strumieniowo - stała pamięć niezależnie od liczby elementów i rozmiaru PDF-ów."""
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    if format == "ndjson":
+        return StreamingResponse(
+            iter_ndjson_export(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename=knowledge-export-{stamp}.ndjson"},
+        )
     return StreamingResponse(
-        BytesIO(pdf_output),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        iter_zip_export(include_pdfs),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=knowledge-export-{stamp}.zip"},
     )
 
-
-
 @app.get("/api/knowledge_items/delete/{item_id}")
-async def delete_knowledge_item(item_id: int, session: Session = Depends(get_session)):
+def delete_knowledge_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(KnowledgeItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Knowledge item not found.")
+    # Listy powiązanych, na których był element, trzeba uzupełnić po usunięciu (wiersze znikną kaskadowo)
+    affected = referencing_items(session, item_id)
     session.delete(item)
+    session.flush()
+    for other_id in affected:
+        rebuild_related(session, other_id)
+    version = bump_db_version(session, [item_id])
     session.commit()
+    get_search_cache().bump_corpus_version()
+    publish_changes(version, removals=[item_id])
+    drop_cached_note_pdfs(item_id)
+    # Blob PDF-a zostaje - może go współdzielić inny element albo równoległy upload tych samych
+    # bajtów; nieużywane bloby usuwa `python -m app.storage gc` (storage.py)
     return {"message": "Knowledge item deleted successfully."}
 
-@app.get("/api/knowledge_items/semantic_search", response_model=List[KnowledgeItem])
-def semantic_search(
-    query: str = Query(..., description="Fraza do wyszukania semantycznego"),
-    top_k: int = Query(10, description="Liczba wyników do zwrócenia"),
-    threshold: float = Query(0.3, description="Minimalny próg podobieństwa (0.0-1.0)"),
-    session: Session = Depends(get_session)
-):
-    print(f"Hybrid search: query='{query}', top_k={top_k}, threshold={threshold}")
-    
-    # Pobierz wszystkie notatki
-    items = session.exec(select(KnowledgeItem)).all()
-    
-    if not items:
-        print("No items found")
+def _set_ef_search(session: Session, limit: int):
+    """hnsw.ef_search >= limit do końca bieżącej transakcji (SET LOCAL) - dla zapytań ORDER BY ... LIMIT limit."""
+    ef_search = min(max(limit, HNSW_EF_SEARCH_DEFAULT), HNSW_EF_SEARCH_MAX)
+    session.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef_search)})
+
+def _semantic_candidates(
+    session: Session,
+    query_emb: List[float],
+    limit: int,
+    threshold: float,
+    exclude_ids: set,
+    content_weight: float = SEARCH_CONTENT_WEIGHT,
+    tags_weight: float = SEARCH_TAGS_WEIGHT,
+    tags: Optional[List[str]] = None,
+    tags_mode: str = "any",
+    model_name: str = EMBEDDING_MODEL_NAME,
+) -> List[tuple]:
+    """Najbliżsi sąsiedzi jako (id, podobieństwo, strony, (offset, długość) najlepszego fragmentu), malejąco.
+
+    Podobieństwo treści to najlepiej pasujący fragment (albo embedding całego elementu, jeśli
+    element nie ma fragmentów); mieszamy je z podobieństwem zapytania do tags_embedding.
+    Pozycja najlepszego fragmentu w text_content (albo None) służy do snippetu wyniku.
+    tags zawęża kandydatów do elementów z tymi tagami (warunek w tych samych zapytaniach).
+    query_emb pochodzi z modelu model_name i jest porównywany tylko z wektorami tego modelu.
+    """
+    if limit <= 0:
         return []
-    
-    print(f"Found {len(items)} total items")
-    
-    # 1. WYSZUKIWANIE TEKSTOWE (dokładne dopasowania)
-    query_lower = query.lower()
-    text_matches = []
-    exact_matches = []  # Dla bardzo dokładnych dopasowań
-    
-    for item in items:
-        text_score = 0.0
-        is_exact = False
-        
-        # Sprawdź tytuł (największa waga)
-        if query_lower == item.title.lower():
-            text_score += 10.0  # Bardzo wysoka waga dla dokładnego tytułu
-            is_exact = True
-        elif query_lower in item.title.lower():
-            text_score += 5.0
-            is_exact = True
-        
-        # Sprawdź tagi (bardzo wysoka waga)
-        for tag in item.tags:
-            if query_lower == tag.lower():
-                text_score += 8.0
-                is_exact = True
-            elif query_lower in tag.lower():
-                text_score += 3.0
-        
-        # Sprawdź treść (niższa waga)
-        if query_lower in item.text_content.lower():
-            text_score += 1.0
-        
-        if text_score > 0:
-            text_matches.append((item, text_score, is_exact))
-            if is_exact:
-                exact_matches.append((item, text_score))
-    
-    print(f"Text matches: {len(text_matches)}, exact matches: {len(exact_matches)}")
+    # Operator <#> (ujemny iloczyn skalarny wektorów jednostkowych) + ORDER BY ... LIMIT korzysta z indeksów HNSW.
+    # Pobieramy kilka wierszy więcej, bo część może już być w wynikach tekstowych.
+    wanted = limit + len(exclude_ids)
+
+    with stage("semantic_search", "vector_search"):
+        # Największy LIMIT poniżej ma zapytanie o fragmenty; zapytania o elementy mieszczą się w nim
+        _set_ef_search(session, wanted * CHUNK_CANDIDATES_PER_ITEM)
+        chunk_distance = dot_distance(KnowledgeChunk.embedding, query_emb)
+        chunk_statement = (
+            select(KnowledgeChunk.item_id, KnowledgeChunk.page, KnowledgeChunk.content_offset, KnowledgeChunk.chunk_length, chunk_distance)
+            .where(KnowledgeChunk.embedding.is_not(None), KnowledgeChunk.embedding_model == model_name)
+        )
+        tag_filter = tag_condition(tags, tags_mode) if tags else None
+        if tag_filter is not None:
+            chunk_statement = chunk_statement.join(KnowledgeItem, KnowledgeItem.id == KnowledgeChunk.item_id).where(tag_filter)
+        chunk_rows = session.exec(chunk_statement.order_by(chunk_distance).limit(wanted * CHUNK_CANDIDATES_PER_ITEM)).all()
+
+        # Indeks w pamięci trzyma tylko wektory aktywnego modelu
+        vector_index = get_vector_index() if model_name == EMBEDDING_MODEL_NAME else None
+        if vector_index is not None:
+            # Indeks w pamięci: jeden iloczyn macierz-wektor (treść i tagi) + argpartition
+            vector_index.sync(session)
+            # Z filtrem tagów liczymy tylko wiersze elementów z tymi tagami (id z indeksu GIN)
+            allowed_ids = session.exec(select(KnowledgeItem.id).where(tag_filter)).all() if tag_filter is not None else None
+            candidate_ids = {
+                item_id for item_id, _ in vector_index.top_k(query_emb, wanted, content_weight, tags_weight, item_ids=allowed_ids)
+            }
+        else:
+            item_distance = dot_distance(KnowledgeItem.embedding, query_emb)
+            same_model = KnowledgeItem.embedding_model == model_name
+            item_statement = select(KnowledgeItem.id).where(KnowledgeItem.embedding.is_not(None), same_model)
+            if tag_filter is not None:
+                item_statement = item_statement.where(tag_filter)
+            candidate_ids = set(session.exec(item_statement.order_by(item_distance).limit(wanted)).all())
+            if tags_weight > 0:
+                # Elementy, które pasują głównie tagami, też muszą trafić do kandydatów
+                tags_distance = dot_distance(KnowledgeItem.tags_embedding, query_emb)
+                tags_statement = select(KnowledgeItem.id).where(KnowledgeItem.tags_embedding.is_not(None), same_model)
+                if tag_filter is not None:
+                    tags_statement = tags_statement.where(tag_filter)
+                candidate_ids.update(session.exec(tags_statement.order_by(tags_distance).limit(wanted)).all())
+        candidate_ids = (candidate_ids | {row[0] for row in chunk_rows}) - exclude_ids
+
+        # Podobieństwo całego elementu i tagów dla wszystkich kandydatów - z indeksu albo jednym zapytaniem po id
+        if vector_index is not None:
+            similarities = vector_index.similarities(candidate_ids, query_emb)
+        else:
+            similarities = item_similarities(
+                session, candidate_ids, query_emb, query_emb if tags_weight > 0 else None, model_name=model_name
+            )
+
+    with stage("semantic_search", "rank"):
+        best_chunk = {}
+        best_span = {}
+        pages = {}
+        for item_id, page, content_offset, chunk_length, dist in chunk_rows:
+            if item_id in exclude_ids:
+                continue
+            if item_id not in best_chunk:
+                # Wiersze są posortowane po odległości - pierwszy fragment elementu jest najlepszy
+                best_chunk[item_id] = to_similarity(dist)
+                best_span[item_id] = (content_offset, chunk_length) if content_offset is not None else None
+            if page is not None:
+                pages.setdefault(item_id, set()).add(page)
+
+        best = {}
+        for item_id, (item_similarity, tags_similarity) in similarities.items():
+            scores = [score for score in (best_chunk.get(item_id), item_similarity) if score is not None]
+            if not scores:
+                continue # Brak jakiegokolwiek embeddingu treści
+            content = max(scores)
+            similarity = blend_similarity(content, tags_similarity, content_weight, tags_weight)
+            if similarity >= threshold:
+                best[item_id] = similarity
+
+        ranked = sorted(best.items(), key=lambda pair: pair[1], reverse=True)[:limit]
+    return [(item_id, similarity, sorted(pages.get(item_id, ())), best_span.get(item_id)) for item_id, similarity in ranked]
+
+def _query_embeddings(session: Session, search_cache, query: str) -> List[tuple]:
+    """(model, embedding zapytania) dla aktywnego modelu i - w trakcie migracji - poprzedniego."""
+    embeddings = [(EMBEDDING_MODEL_NAME, search_cache.query_embedding(query, generate_embedding))]
+    if fallback_in_use(session):
+        embeddings.append((
+            EMBEDDING_FALLBACK_MODEL,
+            search_cache.query_embedding(query, generate_fallback_embedding, EMBEDDING_FALLBACK_MODEL),
+        ))
+    return embeddings
+
+def _semantic_matches(session: Session, query_embs: List[tuple], limit: int, threshold: float, exclude_ids: set, *args) -> List[tuple]:
+    """_semantic_candidates dla każdego modelu z query_embs; element ma wektory jednego modelu, a przy
+    zmianie w trakcie wyszukiwania zostaje lepszy wynik."""
+    if len(query_embs) == 1:
+        model_name, query_emb = query_embs[0]
+        return _semantic_candidates(session, query_emb, limit, threshold, exclude_ids, *args, model_name=model_name)
+    best = {}
+    for model_name, query_emb in query_embs:
+        for match in _semantic_candidates(session, query_emb, limit, threshold, exclude_ids, *args, model_name=model_name):
+            if match[0] not in best or match[1] > best[match[0]][1]:
+                best[match[0]] = match
+    return sorted(best.values(), key=lambda match: match[1], reverse=True)[:limit]
+
+def _classic_search(
+    session: Session,
+    search_cache,
+    query: str,
+    top_k: int,
+    threshold: float,
+    content_weight: float,
+    tags_weight: float,
+    tags: List[str],
+    tags_mode: str,
+) -> List[SemanticSearchHit]:
+    """Dokładne dopasowania tekstowe na początku, wyniki semantyczne dołączane za nimi."""
+    # 1. WYSZUKIWANIE TEKSTOWE - jedno zapytanie po indeksach (trigramy + FTS)
+    with stage("semantic_search", "lexical"):
+        text_matches = lexical_matches(session, query, tags, tags_mode)
+    exact_matches = [(item_id, score) for item_id, score, is_exact in text_matches if is_exact]
     
     # 2. STRATEGIA WYSZUKIWANIA
     if exact_matches:
         # Jeśli mamy dokładne dopasowania, ogranicz semantic search
-        print("Found exact matches, using stricter semantic search")
         semantic_threshold = max(threshold, 0.5)  # Wyższy próg
         max_semantic = 3  # Maksymalnie 3 dodatkowe wyniki semantyczne
     else:
         # Brak dokładnych dopasowań, użyj normalnego semantic search
-        print("No exact matches, using normal semantic search")
         semantic_threshold = threshold
         max_semantic = top_k
     
-    # 3. WYSZUKIWANIE SEMANTYCZNE
-    query_emb = generate_embedding(query)
-    embeddings = [item.embedding for item in items if item.embedding]
-    
-    semantic_matches = []
-    if embeddings:
-        similarities = cosine_similarity([query_emb], embeddings)[0]
-        semantic_candidates = [
-            (item, sim)
-            for item, sim in zip(items, similarities)
-            if item.embedding is not None and sim >= semantic_threshold
-        ]
-        
-        # Usuń elementy które już są w text_matches
-        text_match_ids = {item.id for item, _, _ in text_matches}
-        semantic_matches = [
-            (item, sim) for item, sim in semantic_candidates
-            if item.id not in text_match_ids
-        ][:max_semantic]
-        
-        print(f"Semantic matches above {semantic_threshold}: {len(semantic_matches)}")
+    # 3. WYSZUKIWANIE SEMANTYCZNE (ranking w bazie, bez ładowania embeddingów do Pythona)
+    with stage("semantic_search", "embed"):
+        query_embs = _query_embeddings(session, search_cache, query)
+    text_match_ids = {item_id for item_id, _, _ in text_matches}
+    semantic_matches = _semantic_matches(
+        session, query_embs, max_semantic, semantic_threshold, text_match_ids, content_weight, tags_weight, tags, tags_mode
+    )
     
     # 4. KOMBINUJ WYNIKI
     combined_scores = {}
     
     # Dodaj wyniki tekstowe (najwyższa waga)
-    for item, score, is_exact in text_matches:
-        combined_scores[item.id] = {
-            'item': item,
+    for item_id, score, is_exact in text_matches:
+        combined_scores[item_id] = {
             'text_score': score,
             'semantic_score': 0.0,
             'combined_score': score,
@@ -390,9 +635,8 @@ def semantic_search(
         }
     
     # Dodaj wyniki semantyczne (tylko te nie z text_matches)
-    for item, score in semantic_matches:
-        combined_scores[item.id] = {
-            'item': item,
+    for item_id, score, _, _ in semantic_matches:
+        combined_scores[item_id] = {
             'text_score': 0.0,
             'semantic_score': score,
             'combined_score': score * 2.0,  # Niższa waga niż tekst
@@ -400,23 +644,217 @@ def semantic_search(
         }
     
     # 5. POSORTUJ I ZWRÓĆ WYNIKI
-    sorted_results = sorted(
-        combined_scores.values(),
-        key=lambda x: (x['is_exact'], x['combined_score']),  # Najpierw exact, potem score
+    sorted_ids = sorted(
+        combined_scores,
+        key=lambda i: (combined_scores[i]['is_exact'], combined_scores[i]['combined_score']),  # Najpierw exact, potem score
         reverse=True
-    )
+    )[:top_k]
     
-    print(f"Combined unique results: {len(sorted_results)}")
-    for i, result in enumerate(sorted_results[:5]):  # Log first 5
-        exact_flag = " [EXACT]" if result['is_exact'] else ""
-        print(f"  {i+1}. {result['item'].title[:40]}...{exact_flag} "
-              f"text:{result['text_score']:.1f} semantic:{result['semantic_score']:.3f}")
+    # Pola wyników i snippety tylko dla top_k - bez pełnej treści
+    matched_pages = {item_id: item_pages for item_id, _, item_pages, _ in semantic_matches}
+    best_chunks = {item_id: span for item_id, _, _, span in semantic_matches}
+    with stage("semantic_search", "db_fetch"):
+        hits_by_id = search_hits(session, query, {i: best_chunks.get(i) for i in sorted_ids})
+    final_results = [
+        SemanticSearchHit(
+            **hits_by_id[i],
+            score=combined_scores[i]['combined_score'],
+            matched_pages=matched_pages.get(i, []),
+        )
+        for i in sorted_ids if i in hits_by_id
+    ]
     
-    # Zwróć top_k wyników
-    final_results = [result['item'] for result in sorted_results[:top_k]]
-    print(f"Returning {len(final_results)} results")
+    if logger.isEnabledFor(logging.DEBUG): # Podsumowanie liczone tylko przy włączonym DEBUG
+        logger.debug(
+            "Search %r: text=%d exact=%d semantic=%d (threshold %.2f) returned=%d",
+            query, len(text_matches), len(exact_matches), len(semantic_matches), semantic_threshold, len(final_results),
+            extra={"top": [
+                {"id": result.id, "exact": combined_scores[result.id]['is_exact'],
+                 "text": combined_scores[result.id]['text_score'], "semantic": round(combined_scores[result.id]['semantic_score'], 3)}
+                for result in final_results[:5]
+            ]},
+        )
+    return final_results
+
+def _hybrid_search(
+    session: Session,
+    search_cache,
+    query: str,
+    top_k: int,
+    threshold: float,
+    content_weight: float,
+    tags_weight: float,
+    weights: dict,
+    fusion: str,
+    tags: List[str],
+    tags_mode: str,
+) -> List[SemanticSearchHit]:
+    """Niezależne listy top-N obu gałęzi połączone fuzją (hybrid.py), z wynikami i snippetami."""
+    matched_pages = {}
+    best_chunks = {}
+    query_embs = None
+
+    def fetch_lexical(depth: int) -> LegResult:
+        with stage("semantic_search", "lexical"):
+            hits = ranked_lexical_matches(session, query, depth, tags, tags_mode)
+        return LegResult(hits, exhausted=len(hits) < depth)
+
+    def fetch_semantic(depth: int) -> LegResult:
+        nonlocal query_embs
+        if query_embs is None:
+            with stage("semantic_search", "embed"):
+                query_embs = _query_embeddings(session, search_cache, query)
+        hits = _semantic_matches(session, query_embs, depth, threshold, set(), content_weight, tags_weight, tags, tags_mode)
+        matched_pages.update({item_id: pages for item_id, _, pages, _ in hits})
+        best_chunks.update({item_id: span for item_id, _, _, span in hits})
+        return LegResult([(item_id, similarity) for item_id, similarity, _, _ in hits], exhausted=len(hits) < depth)
+
+    with stage("semantic_search", "fusion"):
+        fused, stats = hybrid_rank({"lexical": fetch_lexical, "semantic": fetch_semantic}, top_k, fusion, weights)
+
+    with stage("semantic_search", "db_fetch"):
+        hits_by_id = search_hits(session, query, {hit.id: best_chunks.get(hit.id) for hit in fused})
+    final_results = [
+        SemanticSearchHit(
+            **hits_by_id[hit.id],
+            score=hit.score,
+            matched_pages=matched_pages.get(hit.id, []),
+            lexical_score=hit.lexical_score,
+            lexical_rank=hit.lexical_rank,
+            semantic_score=hit.semantic_score,
+            semantic_rank=hit.semantic_rank,
+        )
+        for hit in fused if hit.id in hits_by_id
+    ]
+    logger.debug(
+        "Hybrid search %r (%s): depth=%d rounds=%d settled_early=%s candidates=%s returned=%d",
+        query, fusion, stats.depth, stats.rounds, stats.settled_early, stats.candidates, len(final_results),
+    )
     return final_results
 
+@app.get("/api/knowledge_items/semantic_search", response_model=List[SemanticSearchHit])
+def semantic_search(
+    query: str = Query(..., description="Fraza do wyszukania semantycznego"),
+    top_k: int = Query(10, ge=1, le=500, description="Liczba wyników do zwrócenia"),
+    threshold: float = Query(0.3, description="Minimalny próg podobieństwa (0.0-1.0)"),
+    content_weight: float = Query(SEARCH_CONTENT_WEIGHT, ge=0, description="Waga podobieństwa treści"),
+    tags_weight: float = Query(SEARCH_TAGS_WEIGHT, ge=0, description="Waga podobieństwa tagów"),
+    mode: str = Query("classic", pattern="^(classic|hybrid|lexical|semantic)$",
+                      description="classic - dotychczasowy ranking; hybrid - fuzja list leksykalnej i wektorowej; lexical/semantic - jedna gałąź"),
+    fusion: str = Query(HYBRID_FUSION, pattern="^(rrf|weighted)$", description="Fuzja w trybie hybrid"),
+    tags: Optional[str] = Query(None, description="Tylko elementy z tymi tagami (oddzielone przecinkami)"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="any - co najmniej jeden z tagów, all - wszystkie"),
+    session: Session = Depends(get_session)
+):
+    # 0. CACHE - wersję korpusu czytamy przed wyszukiwaniem, więc równoległy zapis nie utrwali starych wyników
+    search_cache = get_search_cache()
+    tag_filter = sorted(set(parse_tags(tags)))
+    params = (top_k, threshold, content_weight, tags_weight, mode, fusion, ",".join(tag_filter), tags_mode if tag_filter else "")
+    with stage("semantic_search", "cache"):
+        # LRU w procesie: licznik w cache nie widzi zapisów z innych workerów - wersja z corpus_state
+        cache_version = search_cache.corpus_version() if search_cache.shared else read_db_version(session)
+        cached_results = search_cache.get_results(query, *params, version=cache_version)
+    if cached_results is not None:
+        logger.debug("Search %r: %d cached results", query, len(cached_results))
+        return cached_results
+
+    if mode == "classic":
+        final_results = _classic_search(
+            session, search_cache, query, top_k, threshold, content_weight, tags_weight, tag_filter, tags_mode
+        )
+    else:
+        weights = {
+            "lexical": HYBRID_LEXICAL_WEIGHT if mode != "semantic" else 0.0,
+            "semantic": HYBRID_SEMANTIC_WEIGHT if mode != "lexical" else 0.0,
+        }
+        final_results = _hybrid_search(
+            session, search_cache, query, top_k, threshold, content_weight, tags_weight, weights, fusion, tag_filter, tags_mode
+        )
+
+    search_cache.set_results(
+        query, *params,
+        results=[result.model_dump(mode="json") for result in final_results],
+        version=cache_version,
+    )
+    return final_results
+
+@app.get("/api/knowledge_items/semantic_search/facets", response_model=List[TagCount])
+def semantic_search_facets(
+    query: str = Query(..., description="Fraza do wyszukania semantycznego"),
+    top_k: int = Query(100, ge=1, le=500, description="Liczba wyników, po których liczone są tagi"),
+    threshold: float = Query(0.3, description="Minimalny próg podobieństwa (0.0-1.0)"),
+    content_weight: float = Query(SEARCH_CONTENT_WEIGHT, ge=0, description="Waga podobieństwa treści"),
+    tags_weight: float = Query(SEARCH_TAGS_WEIGHT, ge=0, description="Waga podobieństwa tagów"),
+    mode: str = Query("classic", pattern="^(classic|hybrid|lexical|semantic)$"),
+    fusion: str = Query(HYBRID_FUSION, pattern="^(rrf|weighted)$"),
+    tags: Optional[str] = Query(None, description="Tylko elementy z tymi tagami (oddzielone przecinkami)"),
+    tags_mode: str = Query("any", pattern="^(any|all)$"),
+    limit: int = Query(50, ge=1, le=500, description="Maks. liczba tagów"),
+    session: Session = Depends(get_session)
+):
+    """Tagi wyników wyszukiwania z liczbą trafień - ten sam ranking (i cache wyników) co /semantic_search."""
+    results = semantic_search(query, top_k, threshold, content_weight, tags_weight, mode, fusion, tags, tags_mode, session)
+    with stage("semantic_search_facets", "count"):
+        # Z cache wyniki wracają jako słowniki, świeże - jako modele
+        return facet_counts((hit["tags"] if isinstance(hit, dict) else hit.tags for hit in results), limit)
+
+@app.get("/api/tags", response_model=List[TagCount])
+def get_tags(
+    prefix: Optional[str] = Query(None, description="Tylko tagi zaczynające się od tego tekstu (bez rozróżniania wielkości liter)"),
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session)
+):
+    """Tagi z liczbą elementów, od najczęstszych - liczniki utrzymuje trigger (tags.py), bez skanowania elementów."""
+    return list_tags(session, prefix, limit)
+
+@app.get("/api/embeddings/migration", response_model=EmbeddingMigrationStatus)
+def get_embedding_migration(session: Session = Depends(get_session)):
+    """Postęp przeliczania embeddingów na aktywny model (reembed.py)."""
+    return migration_status(session)
+
+@app.post("/api/embeddings/migration", response_model=EmbeddingMigrationStatus, status_code=202)
+def start_embedding_migration(session: Session = Depends(get_session)):
+    """Uruchamia albo wznawia migrację w tle tego workera; postęp - GET tej samej ścieżki."""
+    try:
+        start_migration(session)
+    except MigrationRunningError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return migration_status(session)
+
+@app.post("/api/embeddings/migration/pause", response_model=EmbeddingMigrationStatus)
+def pause_embedding_migration(session: Session = Depends(get_session)):
+    """Zatrzymuje zadanie po bieżącej partii (także uruchomione w innym procesie); wznowienie - POST /migration."""
+    if request_pause(session) is None:
+        raise HTTPException(status_code=409, detail="Embedding migration is not running.")
+    return migration_status(session)
+
+
+# Musi być zadeklarowany po /semantic_search, inaczej "semantic_search" trafiłby tutaj jako item_id
+@app.get("/api/knowledge_items/{item_id}", response_model=KnowledgeItemRead)
+def get_knowledge_item(item_id: int, session: Session = Depends(get_session)):
+    """Pełna treść jednego elementu (lista zwraca tylko podgląd)."""
+    item = session.get(KnowledgeItem, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Knowledge item not found.")
+    return item
+
+@app.get("/api/knowledge_items/{item_id}/related", response_model=List[RelatedItem])
+def get_related_items(
+    item_id: int,
+    k: int = Query(RELATED_K, ge=1, le=RELATED_K, description="Liczba powiązanych elementów"),
+    session: Session = Depends(get_session),
+):
+    """Najbliższe elementy z wstępnie policzonej listy (odczyt po kluczu, bez przeszukiwania korpusu)."""
+    item = session.get(KnowledgeItem, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Knowledge item not found.")
+    related = get_related(session, item_id, k)
+    if not related and item.embedding is not None:
+        # Element sprzed wprowadzenia list (albo po migracji bez przebudowy) - liczymy jego listę raz
+        rebuild_related(session, item_id)
+        session.commit()
+        related = get_related(session, item_id, k)
+    return related
 
 # --- Endpoint do edycji notatki ---
 @app.put("/api/knowledge_items/{item_id}", response_model=KnowledgeItem)
@@ -428,10 +866,11 @@ def update_knowledge_item(
     session: Session = Depends(get_session)
 ):
     """Aktualizacja istniejącej notatki (tylko treść tekstowa, nie pliki PDF)"""
-    print(f"Updating item {item_id}: title='{title}', tags='{tags}'")
+    logger.debug("Updating item %s", item_id, extra={"title": title, "tags": tags})
     
     # Znajdź istniejący element
-    item = session.get(KnowledgeItem, item_id)
+    with stage("update_item", "db_fetch"):
+        item = session.get(KnowledgeItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -439,26 +878,47 @@ def update_knowledge_item(
     if item.original_filename:
         raise HTTPException(status_code=400, detail="Cannot edit PDF files, only text notes")
     
+    new_tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    content_hash = text_sha256(content)
+    # Embeddingi innego modelu (element jeszcze nieprzeliczony przez migrację) liczymy od nowa w całości
+    model_changed = item.embedding_model != EMBEDDING_MODEL_NAME
+    content_changed = item.content_hash != content_hash or model_changed
+    tags_changed = item.tags != new_tags or (bool(new_tags) and item.tags_embedding is None) or model_changed
+
     # Aktualizuj dane
     item.title = title
     item.text_content = content
-    
-    # Aktualizuj tagi
-    if tags.strip():
-        item.tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
-    else:
-        item.tags = []
-    
-    # Wygeneruj nowy embedding dla zaktualizowanej treści
-    combined_text = f"{title} {content} {' '.join(item.tags)}"
-    item.embedding = generate_embedding(combined_text)
+    item.tags = new_tags
+
+    # Embeddingi liczymy tylko dla tego, co się zmieniło - sama zmiana tytułu nie wymaga modelu
+    # (tytuł jest przeszukiwany leksykalnie). Embedding notatki to, jak przy uploadzie, średnia
+    # embeddingów fragmentów; niezmienione fragmenty edytowanej treści pochodzą z cache.
+    with stage("update_item", "embed"):
+        if content_changed:
+            chunks = chunk_pages([(None, content)])
+            knowledge_chunks, item.embedding = embed_chunks(chunks, embed_texts_cached([chunk.text for chunk in chunks], session))
+            save_chunks(session, item.id, knowledge_chunks)
+            item.content_hash = content_hash
+        if tags_changed:
+            tags_concatenated = " ".join(new_tags)
+            item.tags_embedding = embed_texts_cached([tags_concatenated], session)[0] if tags_concatenated else None
+        item.embedding_model = EMBEDDING_MODEL_NAME
+    if content_changed or tags_changed:
+        with stage("update_item", "related"):
+            session.add(item)
+            session.flush()
+            refresh_related(session, item.id)
     
     # Zapisz zmiany
-    session.add(item)
-    session.commit()
+    with stage("update_item", "commit"):
+        session.add(item)
+        version = bump_db_version(session, [item.id])
+        session.commit()
+    get_search_cache().bump_corpus_version()
     session.refresh(item)
+    publish_changes(version, upserts=[(item.id, item.embedding, item.tags_embedding)])
     
-    print(f"Item {item_id} updated successfully")
+    logger.info("Item %s updated", item_id, extra={"content_changed": content_changed, "tags_changed": tags_changed})
     return item
 
 
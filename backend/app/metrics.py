@@ -0,0 +1,132 @@
+# knowledge-assistant/backend/app/metrics.py
+# Metryki Prometheusa (GET /metrics): czas żądań HTTP, czasy etapów wewnątrz endpointów,
+# batche i kolejka serwisu embeddingów, pula połączeń do bazy.
+#
+# Przy kilku workerach gunicorna (gunicorn.conf.py) każdy proces zapisuje wartości do plików
+# w PROMETHEUS_MULTIPROC_DIR, a /metrics sumuje je ze wszystkich workerów - inaczej scrape
+# trafiałby w jeden losowy worker.
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Kubełki w sekundach - od pojedynczego zapytania po kluczu do uploadu dużego PDF-a
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Czas obsługi żądania HTTP",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "endpoint_stage_duration_seconds",
+    "Czas etapu wewnątrz endpointu (db_fetch, embed, extract, rank, commit, ...)",
+    ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Liczba tekstów w jednym wywołaniu modelu",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+EMBEDDING_QUEUE_WAIT = Histogram(
+    "embedding_queue_wait_seconds",
+    "Czas żądania w kolejce serwisu embeddingów do rozpoczęcia kodowania",
+    buckets=LATENCY_BUCKETS,
+)
+EMBEDDING_ENCODE_DURATION = Histogram(
+    "embedding_encode_duration_seconds",
+    "Czas jednego wywołania modelu (cały batch)",
+    buckets=LATENCY_BUCKETS,
+)
+EMBEDDING_QUEUE_DEPTH = Gauge(
+    "embedding_queue_depth",
+    "Teksty czekające w kolejce serwisu embeddingów",
+    multiprocess_mode="livesum",
+)
+EMBEDDING_QUEUE_REJECTED = Counter(
+    "embedding_queue_rejected_total",
+    "Żądania odrzucone z powodu pełnej kolejki (503)",
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Skonfigurowany rozmiar puli połączeń (bez overflow)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS_OPEN = Gauge(
+    "db_pool_connections_open",
+    "Otwarte połączenia do bazy",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Połączenia wydane z puli (w użyciu przez żądania i zadania)",
+    multiprocess_mode="livesum",
+)
+
+
+def stage(endpoint: str, name: str):
+    """Kontekst mierzący etap: `with stage("semantic_search", "embed"): ...`"""
+    return STAGE_DURATION.labels(endpoint, name).time()
+
+
+def instrument_engine(engine, pool_size: int):
+    """Liczniki połączeń na zdarzeniach puli - bez odpytywania przy każdym scrape."""
+    from sqlalchemy import event
+
+    DB_POOL_SIZE.set(pool_size)
+    event.listen(engine, "connect", lambda *_: DB_POOL_CONNECTIONS_OPEN.inc())
+    event.listen(engine, "close", lambda *_: DB_POOL_CONNECTIONS_OPEN.dec())
+    event.listen(engine, "checkout", lambda *_: DB_POOL_CONNECTIONS_IN_USE.inc())
+    event.listen(engine, "checkin", lambda *_: DB_POOL_CONNECTIONS_IN_USE.dec())
+
+
+class TimingMiddleware:
+    """Middleware ASGI: histogram czasu żądań z etykietą szablonu trasy (/api/knowledge_items/{item_id}),
+    nie surowej ścieżki - liczba serii nie rośnie z liczbą elementów."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+
+def render() -> tuple:
+    """(treść, content-type) w formacie tekstowym Prometheusa."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Wołane przez gunicorna po zakończeniu workera - jego gauge przestają się sumować."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
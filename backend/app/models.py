@@ -0,0 +1,266 @@
+# knowledge-assistant/backend/app/models.py
+from typing import Dict, Optional, List
+import os
+from datetime import datetime
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, ARRAY, String, Index, ForeignKey, Integer, Float, BigInteger
+from pgvector.sqlalchemy import HALFVEC, Vector # Typy kolumn vector(n) / halfvec(n) z rozszerzenia pgvector
+from pydantic import field_validator
+
+# Model embeddingów (wielojęzyczny - lepiej obsługuje polski)
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+# Poprzedni model na czas migracji embeddingów (reembed.py): wiersze jeszcze nieprzeliczone są
+# wyszukiwane embeddingiem zapytania z tego modelu; po zakończeniu migracji zmienną można usunąć
+EMBEDDING_FALLBACK_MODEL = os.getenv("EMBEDDING_FALLBACK_MODEL") or None
+# Wymiar embeddingów - musi zgadzać się z modelem (MiniLM-L12 zwraca 384)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "384"))
+# Format przechowywania embeddingów: vector (float32, 4 B/wymiar) albo halfvec (float16, 2 B/wymiar).
+# Embeddingi są normalizowane przy zapisie, więc ranking liczymy iloczynem skalarnym (operator <#>).
+# Zmiana formatu na istniejącej bazie: patrz migracja b8e4f2a6c0d9.
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "vector")
+if EMBEDDING_STORAGE not in ("vector", "halfvec"):
+    raise ValueError(f"Unsupported EMBEDDING_STORAGE: {EMBEDDING_STORAGE}")
+EmbeddingVector = HALFVEC if EMBEDDING_STORAGE == "halfvec" else Vector
+EMBEDDING_INDEX_OPS = f"{EMBEDDING_STORAGE}_ip_ops"
+
+
+def vector_to_list(value):
+    """Wektor z bazy (numpy.ndarray dla vector, HalfVector dla halfvec) jako lista floatów."""
+    if value is None or isinstance(value, list):
+        return value
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "to_list"):
+        return value.to_list()
+    return list(value)
+
+# --- Modele Danych (SQLModel) ---
+class KnowledgeItem(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    title: str
+    text_content: str
+    original_filename: Optional[str] = None
+    # SHA-256 treści: bajtów pliku dla PDF-ów, tekstu (UTF-8) dla notatek - wykrywanie duplikatów i zmian treści
+    content_hash: Optional[str] = Field(default=None, index=True)
+
+    # Zmieniona definicja tags: teraz używamy Column(ARRAY(String))
+    # Należy zaimportować String z sqlalchemy.
+    # Field() w SQLModel nie zawsze dobrze współpracuje z List[str] i sa_column_kwargs={"type": "text[]"}
+    # Jawne użycie Column(ARRAY(String)) jest bardziej klarowne i niezawodne.
+    tags: List[str] = Field(default_factory=list, sa_column=Column(ARRAY(String))) # <- ZMIANA TUTAJ
+
+    # Embedding wektorowy dla treści - natywny typ vector(384) / halfvec(384) z pgvector,
+    # dzięki czemu ranking (operator <#>) liczy się w bazie z użyciem indeksu HNSW
+    embedding: Optional[List[float]] = Field(default=None, sa_column=Column(EmbeddingVector(EMBEDDING_DIMENSIONS)))
+
+    # NOWOŚĆ: Embedding wektorowy dla skonsolidowanych tagów (zostaje)
+    tags_embedding: Optional[List[float]] = Field(default=None, sa_column=Column(EmbeddingVector(EMBEDDING_DIMENSIONS)))
+    # Model, którym policzono embedding i tags_embedding - wyszukiwanie porównuje tylko wektory tego samego modelu
+    embedding_model: Optional[str] = None
+
+    # Domyślne daty
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow}, nullable=False)
+
+    __tablename__ = "knowledgeitem"
+    __table_args__ = (
+        # Indeks ANN (HNSW) dla iloczynu skalarnego (wektory znormalizowane) - patrz migracja b8e4f2a6c0d9
+        Index(
+            "ix_knowledgeitem_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": EMBEDDING_INDEX_OPS},
+        ),
+        # Kandydaci po podobieństwie tagów (wyszukiwanie i powiązane elementy)
+        Index(
+            "ix_knowledgeitem_tags_embedding_hnsw",
+            "tags_embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"tags_embedding": EMBEDDING_INDEX_OPS},
+        ),
+        # Stronicowanie keyset po dacie (id rozstrzyga remisy) i filtrowanie po tagach
+        Index("ix_knowledgeitem_created_at_id", "created_at", "id"),
+        Index("ix_knowledgeitem_updated_at_id", "updated_at", "id"),
+        Index("ix_knowledgeitem_tags_gin", "tags", postgresql_using="gin"),
+    )
+
+    # pgvector zwraca numpy.ndarray / HalfVector - zamieniamy na listę, żeby odpowiedź JSON się serializowała
+    @field_validator("embedding", "tags_embedding", mode="before")
+    @classmethod
+    def _vector_to_list(cls, value):
+        return vector_to_list(value)
+
+# Fragment dokumentu z własnym embeddingiem (strona PDF + pozycja w tekście strony)
+class KnowledgeChunk(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    item_id: int = Field(sa_column=Column(Integer, ForeignKey("knowledgeitem.id", ondelete="CASCADE"), nullable=False, index=True))
+    page: Optional[int] = None # Numer strony (od 1), None dla notatek tekstowych
+    chunk_offset: int = 0 # Offset początku fragmentu w tekście strony (znaki)
+    chunk_length: int = 0 # Długość fragmentu (znaki)
+    content_offset: Optional[int] = None # Offset w text_content elementu - snippet bez szukania w treści (None: PDF sprzed migracji)
+    embedding: Optional[List[float]] = Field(default=None, sa_column=Column(EmbeddingVector(EMBEDDING_DIMENSIONS)))
+    embedding_model: Optional[str] = None # Model, którym policzono embedding
+
+    __tablename__ = "knowledge_chunk"
+    __table_args__ = (
+        Index(
+            "ix_knowledge_chunk_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": EMBEDDING_INDEX_OPS},
+        ),
+    )
+
+# Wstępnie policzona lista najbliższych elementów (GET /api/knowledge_items/{id}/related),
+# odświeżana przyrostowo przy dodaniu, edycji i usunięciu elementu - patrz related.py
+class ItemNeighbor(SQLModel, table=True):
+    item_id: int = Field(sa_column=Column(Integer, ForeignKey("knowledgeitem.id", ondelete="CASCADE"), primary_key=True))
+    neighbor_id: int = Field(sa_column=Column(Integer, ForeignKey("knowledgeitem.id", ondelete="CASCADE"), primary_key=True, index=True))
+    similarity: float = Field(sa_column=Column(Float, nullable=False))
+
+    __tablename__ = "item_neighbor"
+
+# Wersja korpusu (jeden wiersz, id=1) podbijana w transakcji każdego zapisu - workery porównują
+# ją z wersją swojego indeksu w pamięci (vector_index.py)
+class CorpusState(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+
+    __tablename__ = "corpus_state"
+
+# Dziennik zmian korpusu: elementy dodane, zmienione i usunięte w danej wersji (bez klucza obcego -
+# wpis usuniętego elementu zostaje jako tombstone). Worker dociąga tylko elementy z wersji nowszych niż jego.
+class CorpusChange(SQLModel, table=True):
+    version: int = Field(sa_column=Column(BigInteger, primary_key=True))
+    item_id: int = Field(primary_key=True)
+
+    __tablename__ = "corpus_change"
+
+# Liczba elementów z danym tagiem (GET /api/tags) - utrzymywana triggerem na knowledgeitem, patrz tags.py
+class TagCount(SQLModel, table=True):
+    tag: str = Field(primary_key=True)
+    item_count: int = Field(default=0, sa_column=Column(Integer, nullable=False))
+
+    __tablename__ = "tag_count"
+
+# Cache embeddingów: sha256 tekstu + nazwa modelu -> wektor (patrz embedding_cache.py)
+class EmbeddingCacheEntry(SQLModel, table=True):
+    text_hash: str = Field(primary_key=True)
+    model_name: str = Field(primary_key=True)
+    embedding: List[float] = Field(sa_column=Column(EmbeddingVector(EMBEDDING_DIMENSIONS), nullable=False))
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, nullable=False)
+
+    __tablename__ = "embedding_cache"
+
+# Migracja embeddingów do modelu model_name (reembed.py) - stan widoczny dla wszystkich workerów,
+# last_item_id pozwala wznowić przerwane zadanie od miejsca, w którym się zatrzymało
+class EmbeddingMigration(SQLModel, table=True):
+    model_name: str = Field(primary_key=True)
+    status: str = Field(default="running") # running | pausing | paused | completed | failed
+    items_total: int = 0 # Elementy do przeliczenia (przeliczone + pozostałe przy ostatnim starcie)
+    items_done: int = 0
+    chunks_done: int = 0
+    last_item_id: int = 0
+    error: Optional[str] = None
+
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow}, nullable=False)
+
+    __tablename__ = "embedding_migration"
+
+# Postęp migracji embeddingów (GET /api/embeddings/migration)
+class EmbeddingMigrationStatus(SQLModel):
+    active_model: str
+    fallback_model: Optional[str] = None
+    fallback_in_use: bool # Czy wyszukiwanie odpytuje jeszcze wektory poprzedniego modelu
+    job_running: bool = False # Czy zadanie trzyma teraz lock (w dowolnym procesie)
+    items_by_model: Dict[str, int] = {} # Liczba elementów wg modelu embeddingu ("" - bez embeddingu)
+    job: Optional[EmbeddingMigration] = None
+
+# Pełny element bez embeddingów (GET /api/knowledge_items/{id})
+class KnowledgeItemRead(SQLModel):
+    id: int
+    title: str
+    text_content: str
+    original_filename: Optional[str] = None
+    tags: List[str] = []
+    created_at: datetime
+    updated_at: datetime
+
+# Podświetlenia trafienia: tytuł z <mark>...</mark> wokół słów zapytania (reszta tekstu
+# escapowana jako HTML) i tagi pasujące do zapytania
+class SearchHighlights(SQLModel):
+    title: str
+    tags: List[str] = []
+
+# Wynik wyszukiwania bez treści: 1-3 snippety (HTML z <mark>) zamiast text_content - pełny element
+# pobiera GET /api/knowledge_items/{id}. score to wynik rankingu trybu; wyniki i pozycje w gałęziach
+# tylko w trybach z fuzją (mode=hybrid/lexical/semantic)
+class SemanticSearchHit(SQLModel):
+    id: int
+    title: str
+    original_filename: Optional[str] = None
+    tags: List[str] = []
+    created_at: datetime
+    updated_at: datetime
+    content_length: int
+    score: float
+    snippets: List[str] = []
+    matched_pages: List[int] = []
+    highlights: Optional[SearchHighlights] = None
+    lexical_score: Optional[float] = None
+    lexical_rank: Optional[int] = None
+    semantic_score: Optional[float] = None
+    semantic_rank: Optional[int] = None
+
+# Powiązany element (bez treści) z podobieństwem do elementu źródłowego
+class RelatedItem(SQLModel):
+    id: int
+    title: str
+    original_filename: Optional[str] = None
+    tags: List[str] = []
+    similarity: float
+
+# Lekka pozycja listy: text_content to tylko podgląd początku treści
+class KnowledgeItemSummary(SQLModel):
+    id: int
+    title: str
+    text_content: str # Podgląd (pierwsze LIST_PREVIEW_CHARS znaków)
+    content_length: int # Długość pełnej treści w znakach
+    original_filename: Optional[str] = None
+    tags: List[str] = []
+    created_at: datetime
+    updated_at: datetime
+
+# Zadanie asynchronicznej ingestii PDF (status + postęp widoczny przez GET /api/jobs/{id})
+class IngestionJob(SQLModel, table=True):
+    id: str = Field(primary_key=True) # uuid4 hex
+    status: str = Field(default="queued") # queued | extracting | embedding | storing | completed | failed
+    title: str
+    original_filename: str
+    tags: List[str] = Field(default_factory=list, sa_column=Column(ARRAY(String)))
+    pages_total: Optional[int] = None
+    pages_extracted: int = 0
+    chunks_total: Optional[int] = None
+    chunks_embedded: int = 0
+    item_id: Optional[int] = None # Id utworzonego KnowledgeItem po zakończeniu
+    items_imported: int = 0 # Import masowy: liczba zapisanych elementów
+    items_skipped: int = 0 # Import masowy: elementy pominięte (już zaimportowane wcześniej)
+    error: Optional[str] = None
+
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow}, nullable=False)
+
+    __tablename__ = "ingestion_job"
+
+# Punkt kontrolny importu masowego - wpis powstaje w tej samej transakcji co element,
+# więc po awarii import wznawia się bez ponownego embeddingu zapisanych już plików
+class IngestCheckpoint(SQLModel, table=True):
+    source_key: str = Field(primary_key=True) # np. "file:<ścieżka>:<rozmiar>:<mtime>" albo "ndjson:<id>"
+    item_id: int = Field(sa_column=Column(Integer, ForeignKey("knowledgeitem.id", ondelete="CASCADE"), nullable=False))
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, nullable=False)
+
+    __tablename__ = "ingest_checkpoint"
@@ -0,0 +1,58 @@
+# knowledge-assistant/backend/app/pdf_text.py
+# Ekstrakcja tekstu z PDF. Moduł celowo importuje tylko pypdf, bo jego funkcje
+# są uruchamiane w procesach potomnych puli ingestii (start metodą spawn).
+import mmap
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Tuple, Union
+
+PdfSource = Union[str, BinaryIO]
+
+
+def _pdf_reader(source: PdfSource):
+    from pypdf import PdfReader # Import leniwy - nie spowalnia startu aplikacji
+
+    return PdfReader(source)
+
+
+@contextmanager
+def open_pdf_source(path: str) -> Iterator[BinaryIO]:
+    """Plik z dysku jako strumień dla PdfReader - przez mmap, jeśli się da.
+
+    PdfReader(ścieżka) wczytuje cały plik do BytesIO; mmap oddaje stronicowanie systemowi,
+    więc rezydentne są tylko faktycznie czytane fragmenty pliku.
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mapped = None # Pusty plik albo system plików bez mmap - czytamy z deskryptora
+        if mapped is None:
+            yield f
+        else:
+            with mapped:
+                yield mapped
+
+
+def iter_pdf_pages(source: PdfSource) -> Iterator[Tuple[int, str]]:
+    """Generator (numer strony od 1, tekst) - strony ekstrahowane są po kolei, na żądanie."""
+    reader = _pdf_reader(source)
+    for number, page in enumerate(reader.pages, start=1):
+        yield number, page.extract_text() or ""
+
+
+def extract_pdf_pages(path: str) -> List[Tuple[int, str]]:
+    """Tekst każdej strony PDF zapisanego na dysku jako lista (numer strony od 1, tekst)."""
+    with open_pdf_source(path) as source:
+        return list(iter_pdf_pages(source))
+
+
+def count_pdf_pages(path: str) -> int:
+    with open_pdf_source(path) as source:
+        return len(_pdf_reader(source).pages)
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Tekst stron [start, stop) (indeksy od 0) - jednostka pracy dla puli procesów."""
+    with open_pdf_source(path) as source:
+        reader = _pdf_reader(source)
+        return [(number + 1, reader.pages[number].extract_text() or "") for number in range(start, stop)]
@@ -0,0 +1,410 @@
+# knowledge-assistant/backend/app/reembed.py
+# Migracja embeddingów na nowy model bez przestoju.
+#
+#   1. Wdrożenie z EMBEDDING_MODEL=<nowy> i EMBEDDING_FALLBACK_MODEL=<poprzedni> (ten sam
+#      EMBEDDING_DIMENSIONS - kolumny mają stały wymiar). Nowe i edytowane elementy dostają
+#      embeddingi nowego modelu od razu.
+#   2. POST /api/embeddings/migration albo `python -m app.reembed run` - zadanie przelicza korpus
+#      partiami (REEMBED_BATCH_SIZE elementów na transakcję, pauza REEMBED_THROTTLE_MS między
+#      partiami). Model działa w puli REEMBED_WORKERS procesów (każdy z własną kopią modelu
+#      i częścią rdzeni); REEMBED_WORKERS=0 - serwis embeddingów bieżącego procesu.
+#   3. GET /api/embeddings/migration - postęp. Po statusie completed zmienną
+#      EMBEDDING_FALLBACK_MODEL można usunąć.
+#
+# Każdy wektor ma zapisany model (embedding_model), a wyszukiwanie porównuje zapytanie tylko
+# z wektorami tego samego modelu: w trakcie migracji wiersze przeliczone odpowiadają na embedding
+# zapytania z nowego modelu, pozostałe - z poprzedniego, a wyniki obu list są łączone.
+#
+# Wznawianie: stan (z last_item_id) zapisywany jest w transakcji każdej partii, więc przerwane
+# zadanie (restart, pauza, błąd) rusza od następnego elementu. Jedno zadanie naraz pilnuje
+# advisory lock Postgresa - zwalnia się sam, gdy proces zadania zginie.
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, or_, text, update
+from sqlmodel import Session, select
+
+from . import database
+from .cache import get_search_cache
+from .chunking import chunk_pages
+from .crud import save_chunks
+from .database import open_session
+from .embedding_cache import embed_texts_cached
+from .embeddings import document_embedding, embed_chunks, embedding_service, encode_texts, load_model
+from .models import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_FALLBACK_MODEL,
+    EMBEDDING_MODEL_NAME,
+    EmbeddingMigration,
+    EmbeddingMigrationStatus,
+    KnowledgeChunk,
+    KnowledgeItem,
+)
+from .related import refresh_related
+from .vector_index import bump_db_version, publish_changes
+
+logger = logging.getLogger(__name__)
+
+# Elementy przeliczane w jednej transakcji
+REEMBED_BATCH_SIZE = int(os.getenv("REEMBED_BATCH_SIZE", "50"))
+# Procesy z kopią modelu (każdy ~0.5 GB RAM dla MiniLM); 0 - serwis embeddingów tego procesu
+REEMBED_WORKERS = int(os.getenv("REEMBED_WORKERS", "2"))
+# Pauza między partiami (ms) - zostawia model i bazę dla ruchu użytkowników
+REEMBED_THROTTLE_MS = int(os.getenv("REEMBED_THROTTLE_MS", "200"))
+# Co ile sekund wyszukiwanie sprawdza, czy migracja się zakończyła (wtedy przestaje pytać poprzedni model)
+FALLBACK_CHECK_INTERVAL_S = int(os.getenv("FALLBACK_CHECK_INTERVAL_S", "30"))
+
+_ADVISORY_LOCK_KEY = 0x6B615245 # Stała dla pg_try_advisory_lock - jedno zadanie migracji w bazie
+
+
+class MigrationRunningError(RuntimeError):
+    """Zadanie migracji już działa (w tym albo innym procesie)."""
+
+
+# --- Pula procesów z modelem ---
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    import torch
+
+    global _worker_model
+    torch.set_num_threads(threads) # Procesy dzielą rdzenie zamiast walczyć o wszystkie
+    _worker_model = load_model(model_name)
+
+
+def _encode_in_worker(texts: List[str]) -> List[List[float]]:
+    return encode_texts(_worker_model, texts)
+
+
+class PoolEncoder:
+    """Dzieli teksty partii między procesy puli; wynik w kolejności wejścia."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn zamiast fork: proces rodzica ma już wątki torcha i połączenia do bazy
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(EMBEDDING_MODEL_NAME, threads),
+        )
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        size = -(-len(texts) // self.workers)
+        vectors: List[List[float]] = []
+        for part in self._pool.map(_encode_in_worker, [texts[start:start + size] for start in range(0, len(texts), size)]):
+            vectors.extend(part)
+        return vectors
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _checked(encode: Callable[[List[str]], List[List[float]]]) -> Callable[[List[str]], List[List[float]]]:
+    def encode_checked(texts: List[str]) -> List[List[float]]:
+        vectors = encode(texts)
+        if vectors and len(vectors[0]) != EMBEDDING_DIMENSIONS:
+            raise ValueError(
+                f"{EMBEDDING_MODEL_NAME} returns {len(vectors[0])}-dimensional vectors, but the embedding columns "
+                f"have {EMBEDDING_DIMENSIONS} dimensions - change EMBEDDING_DIMENSIONS with a column migration first"
+            )
+        return vectors
+    return encode_checked
+
+
+# --- Stan migracji ---
+def _pending():
+    """Elementy, których embeddingi policzył inny model (albo nieznany)."""
+    return or_(KnowledgeItem.embedding_model.is_(None), KnowledgeItem.embedding_model != EMBEDDING_MODEL_NAME)
+
+
+def _remaining(session: Session) -> int:
+    return session.exec(select(func.count()).select_from(KnowledgeItem).where(_pending())).one()
+
+
+def _is_locked(session: Session) -> bool:
+    """Czy advisory lock zadania trzyma ktoś inny (sprawdzenie bez zatrzymywania locka)."""
+    acquired = session.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar()
+    if acquired:
+        session.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+    return not acquired
+
+
+_fallback_checked_at = float("-inf")
+_fallback_in_use = True
+
+
+def fallback_in_use(session: Session) -> bool:
+    """Czy wyszukiwanie ma jeszcze pytać wiersze EMBEDDING_FALLBACK_MODEL - do zakończenia migracji."""
+    global _fallback_checked_at, _fallback_in_use
+    if not EMBEDDING_FALLBACK_MODEL or EMBEDDING_FALLBACK_MODEL == EMBEDDING_MODEL_NAME:
+        return False
+    now = time.monotonic()
+    if now - _fallback_checked_at >= FALLBACK_CHECK_INTERVAL_S:
+        status = session.exec(select(EmbeddingMigration.status).where(EmbeddingMigration.model_name == EMBEDDING_MODEL_NAME)).first()
+        _fallback_in_use = status != "completed"
+        _fallback_checked_at = now
+    return _fallback_in_use
+
+
+def migration_status(session: Session) -> EmbeddingMigrationStatus:
+    rows = session.exec(
+        select(func.coalesce(KnowledgeItem.embedding_model, ""), func.count()).group_by(KnowledgeItem.embedding_model)
+    ).all()
+    return EmbeddingMigrationStatus(
+        active_model=EMBEDDING_MODEL_NAME,
+        fallback_model=EMBEDDING_FALLBACK_MODEL,
+        fallback_in_use=fallback_in_use(session),
+        job_running=_is_locked(session),
+        items_by_model=dict(rows),
+        job=session.get(EmbeddingMigration, EMBEDDING_MODEL_NAME),
+    )
+
+
+def request_pause(session: Session) -> Optional[EmbeddingMigration]:
+    """Zadanie zatrzyma się po bieżącej partii (status paused); None, jeśli nic nie działa."""
+    state = session.get(EmbeddingMigration, EMBEDDING_MODEL_NAME)
+    if state is None or state.status != "running":
+        return None
+    state.status = "pausing"
+    session.add(state)
+    session.commit()
+    session.refresh(state)
+    return state
+
+
+# --- Przeliczanie ---
+def _migrate_batch(session: Session, rows: List[tuple], encode) -> tuple:
+    """Nowe embeddingi fragmentów, elementów i tagów partii (bez commita); zwraca (liczba fragmentów, upserty indeksu)."""
+    item_ids = [row.id for row in rows]
+    chunks_by_item: Dict[int, list] = {}
+    for chunk in session.exec(
+        select(KnowledgeChunk.id, KnowledgeChunk.item_id, KnowledgeChunk.content_offset, KnowledgeChunk.chunk_length)
+        .where(KnowledgeChunk.item_id.in_(item_ids))
+        .order_by(KnowledgeChunk.item_id, KnowledgeChunk.id)
+    ).all():
+        chunks_by_item.setdefault(chunk.item_id, []).append(chunk)
+
+    # Teksty całej partii w jednym wywołaniu modelu: fragmenty (z pozycji zapisanych w knowledge_chunk) i tagi
+    plans, texts = [], []
+    for row in rows:
+        chunks = chunks_by_item.get(row.id, [])
+        if chunks and all(chunk.content_offset is not None for chunk in chunks):
+            chunk_texts = [row.text_content[chunk.content_offset:chunk.content_offset + chunk.chunk_length] for chunk in chunks]
+            rechunked = None
+        else:
+            # Brak pozycji w text_content (PDF sprzed d5a1f7c3e9b2) - fragmenty od nowa, bez numerów stron
+            rechunked = chunk_pages([(None, row.text_content)])
+            chunk_texts = [chunk.text for chunk in rechunked]
+        tags_text = " ".join(row.tags or [])
+        plans.append((row, chunks, rechunked, len(chunk_texts), bool(tags_text)))
+        texts.extend(chunk_texts)
+        if tags_text:
+            texts.append(tags_text)
+    # Teksty przeliczone już nowym modelem (np. przy ponownym uploadzie) biorą wektor z cache
+    vectors = embed_texts_cached(texts, session, encode)
+
+    item_updates, chunk_updates, upserts = [], [], []
+    chunk_count = 0
+    position = 0
+    for row, chunks, rechunked, count, has_tags in plans:
+        chunk_vectors = vectors[position:position + count]
+        position += count
+        tags_embedding = None
+        if has_tags:
+            tags_embedding = vectors[position]
+            position += 1
+        if rechunked is not None:
+            knowledge_chunks, embedding = embed_chunks(rechunked, chunk_vectors)
+            save_chunks(session, row.id, knowledge_chunks)
+            if chunks:
+                logger.warning("Item %s re-chunked without page numbers (no content offsets)", row.id)
+        else:
+            embedding = document_embedding(chunk_vectors) if chunk_vectors else None
+            chunk_updates.extend(
+                {"id": chunk.id, "embedding": vector, "embedding_model": EMBEDDING_MODEL_NAME}
+                for chunk, vector in zip(chunks, chunk_vectors)
+            )
+        chunk_count += count
+        # updated_at bez zmian - migracja nie jest edycją (sortowanie listy, eksport przyrostowy)
+        item_updates.append({
+            "id": row.id,
+            "embedding": embedding,
+            "tags_embedding": tags_embedding,
+            "embedding_model": EMBEDDING_MODEL_NAME,
+            "updated_at": row.updated_at,
+        })
+        upserts.append((row.id, embedding, tags_embedding))
+
+    # UPDATE po kluczu głównym dla wielu wierszy naraz (executemany)
+    if chunk_updates:
+        session.execute(update(KnowledgeChunk), chunk_updates)
+    session.execute(update(KnowledgeItem), item_updates)
+    session.flush()
+    # Listy powiązanych porównują tylko wektory jednego modelu - przeliczony element dołącza do list nowego modelu
+    for item_id in item_ids:
+        refresh_related(session, item_id)
+    return chunk_count, upserts
+
+
+def _start(session: Session) -> EmbeddingMigration:
+    state = session.get(EmbeddingMigration, EMBEDDING_MODEL_NAME) or EmbeddingMigration(model_name=EMBEDDING_MODEL_NAME)
+    state.status = "running"
+    state.error = None
+    state.items_total = state.items_done + _remaining(session)
+    session.add(state)
+    session.commit()
+    session.refresh(state)
+    return state
+
+
+def _run(batch_size: int, encode, throttle_ms: int, stop: Optional[threading.Event], progress) -> str:
+    with open_session() as session:
+        state = _start(session)
+        logger.info("Embedding migration to %s: %d items to go", EMBEDDING_MODEL_NAME, state.items_total - state.items_done)
+    while True:
+        with open_session() as session:
+            state = session.get(EmbeddingMigration, EMBEDDING_MODEL_NAME)
+            if state.status == "pausing" or (stop is not None and stop.is_set()):
+                state.status = "paused"
+                session.commit()
+                return "paused"
+            rows = session.exec(
+                select(KnowledgeItem.id, KnowledgeItem.text_content, KnowledgeItem.tags, KnowledgeItem.updated_at)
+                .where(_pending(), KnowledgeItem.id > state.last_item_id)
+                .order_by(KnowledgeItem.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                remaining = _remaining(session)
+                if remaining and state.last_item_id > 0:
+                    # Elementy zapisane za kursorem poprzednim modelem (np. worker sprzed wdrożenia) - kolejne przejście
+                    state.last_item_id = 0
+                    state.items_total = state.items_done + remaining
+                    session.commit()
+                    continue
+                state.status = "completed"
+                session.commit()
+                return "completed"
+            chunk_count, upserts = _migrate_batch(session, rows, encode)
+            state.items_done += len(rows)
+            state.chunks_done += chunk_count
+            state.last_item_id = rows[-1].id
+            version = bump_db_version(session, [row.id for row in rows])
+            session.commit()
+            done, total = state.items_done, state.items_total
+        get_search_cache().bump_corpus_version()
+        publish_changes(version, upserts=upserts)
+        if progress is not None:
+            progress(done, total)
+        if throttle_ms > 0:
+            time.sleep(throttle_ms / 1000)
+
+
+def run_migration(
+    batch_size: int = REEMBED_BATCH_SIZE,
+    workers: int = REEMBED_WORKERS,
+    throttle_ms: int = REEMBED_THROTTLE_MS,
+    stop: Optional[threading.Event] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> str:
+    """Przelicza embeddingi elementów innego modelu; zwraca status końcowy (completed | paused)."""
+    with database.engine.connect() as lock_connection:
+        # Lock sesyjny na osobnym połączeniu - trzymany do końca zadania, zwalniany także po awarii procesu
+        if not lock_connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar():
+            raise MigrationRunningError("Embedding migration is already running")
+        lock_connection.commit()
+        encoder = PoolEncoder(workers) if workers > 0 else None
+        try:
+            status = _run(batch_size, _checked(encoder or embedding_service.embed_sync), throttle_ms, stop, progress)
+            logger.info("Embedding migration to %s %s", EMBEDDING_MODEL_NAME, status)
+            return status
+        except Exception as e:
+            logger.exception("Embedding migration to %s failed", EMBEDDING_MODEL_NAME)
+            with open_session() as session:
+                state = session.get(EmbeddingMigration, EMBEDDING_MODEL_NAME)
+                state.status = "failed"
+                state.error = str(e)
+                session.commit()
+            raise
+        finally:
+            if encoder is not None:
+                encoder.close()
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            lock_connection.commit()
+
+
+# --- Zadanie w tle (endpoint POST /api/embeddings/migration) ---
+_migration_thread: Optional[threading.Thread] = None
+_stop_migration = threading.Event()
+
+
+def _run_in_background():
+    try:
+        run_migration(stop=_stop_migration)
+    except MigrationRunningError:
+        logger.warning("Embedding migration is already running in another process")
+    except Exception:
+        pass # Błąd jest już zapisany w embedding_migration
+
+
+def start_migration(session: Session):
+    """Uruchamia (albo wznawia) migrację w wątku tego workera."""
+    global _migration_thread
+    if (_migration_thread is not None and _migration_thread.is_alive()) or _is_locked(session):
+        raise MigrationRunningError("Embedding migration is already running")
+    _stop_migration.clear()
+    _migration_thread = threading.Thread(target=_run_in_background, name="embedding-migration", daemon=True)
+    _migration_thread.start()
+
+
+def stop_migration(timeout: float = 30.0):
+    """Zatrzymanie przy wyłączaniu workera - zadanie kończy bieżącą partię i zostaje paused."""
+    _stop_migration.set()
+    if _migration_thread is not None and _migration_thread.is_alive():
+        _migration_thread.join(timeout)
+
+
+def main():
+    from .database import _init_db_connection, create_db_and_tables
+    from .logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Migracja embeddingów na model EMBEDDING_MODEL")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Przelicz (albo wznów przeliczanie) embeddingów")
+    run.add_argument("--batch-size", type=int, default=REEMBED_BATCH_SIZE, help="Elementy na transakcję")
+    run.add_argument("--workers", type=int, default=REEMBED_WORKERS, help="Procesy z modelem (0 - w tym procesie)")
+    run.add_argument("--throttle-ms", type=int, default=REEMBED_THROTTLE_MS, help="Pauza między partiami")
+    commands.add_parser("status", help="Postęp migracji")
+    commands.add_parser("pause", help="Zatrzymaj działające zadanie po bieżącej partii")
+    args = parser.parse_args()
+
+    configure_logging()
+    _init_db_connection(statement_timeout_ms=0) # Przebiegi wsadowe - długie zapytania są tu normalne
+    create_db_and_tables()
+    if args.command == "run":
+        def report(done: int, total: int):
+            print(f"items={done}/{total}")
+
+        try:
+            print(run_migration(args.batch_size, args.workers, args.throttle_ms, progress=report))
+        finally:
+            embedding_service.stop()
+    else:
+        with open_session() as session:
+            if args.command == "pause":
+                print("pausing" if request_pause(session) else "not running")
+            else:
+                print(migration_status(session).model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# knowledge-assistant/backend/app/related.py
+# Powiązane elementy: dla każdego elementu trzymamy w item_neighbor listę RELATED_K najbliższych.
+#
+# Po dodaniu / edycji elementu liczymy tylko jego listę (zapytania ANN po indeksach HNSW) i wstawiamy
+# go do list jego sąsiadów (podobieństwo jest symetryczne). Listy, z których element wypadł albo
+# w których był przed zmianą, przeliczamy od nowa - to zwykle kilka elementów, nie cały korpus.
+#
+#   python -m app.related    # pełna przebudowa (np. po migracji na istniejącej bazie)
+import logging
+import os
+from typing import List, Tuple
+
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+
+from .models import ItemNeighbor, KnowledgeItem, RelatedItem
+from .similarity import blend_similarity, dot_distance, item_similarities
+
+logger = logging.getLogger(__name__)
+
+# Długość przechowywanej listy powiązanych elementów
+RELATED_K = int(os.getenv("RELATED_K", "10"))
+# Ilu kandydatów z każdego indeksu ANN bierzemy na jedno miejsce na liście
+RELATED_CANDIDATES_PER_SLOT = int(os.getenv("RELATED_CANDIDATES_PER_SLOT", "3"))
+
+
+def compute_neighbors(session: Session, item_id: int, k: int = RELATED_K) -> List[Tuple[int, float]]:
+    """Najbliższe elementy jako (id, podobieństwo) - kandydaci z HNSW po treści i tagach, potem mieszanie wag."""
+    item = session.get(KnowledgeItem, item_id)
+    if item is None or item.embedding is None:
+        return []
+    wanted = k * RELATED_CANDIDATES_PER_SLOT + 1 # +1 - sam element też jest w indeksie
+
+    # Tylko elementy z embeddingami tego samego modelu (w trakcie migracji korpus jest mieszany - reembed.py)
+    same_model = KnowledgeItem.embedding_model == item.embedding_model
+    content_distance = dot_distance(KnowledgeItem.embedding, item.embedding)
+    candidate_ids = set(session.exec(
+        select(KnowledgeItem.id).where(KnowledgeItem.embedding.is_not(None), same_model).order_by(content_distance).limit(wanted)
+    ).all())
+    if item.tags_embedding is not None:
+        tags_distance = dot_distance(KnowledgeItem.tags_embedding, item.tags_embedding)
+        candidate_ids.update(session.exec(
+            select(KnowledgeItem.id).where(KnowledgeItem.tags_embedding.is_not(None), same_model).order_by(tags_distance).limit(wanted)
+        ).all())
+    candidate_ids.discard(item_id)
+
+    scored = []
+    similarities = item_similarities(session, candidate_ids, item.embedding, item.tags_embedding, item.embedding_model)
+    for candidate_id, (content, tags) in similarities.items():
+        if content is not None:
+            scored.append((candidate_id, blend_similarity(content, tags)))
+    scored.sort(key=lambda pair: pair[1], reverse=True)
+    return scored[:k]
+
+
+def _upsert(session: Session, rows: List[dict]):
+    if not rows:
+        return
+    statement = pg_insert(ItemNeighbor)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["item_id", "neighbor_id"],
+            set_={"similarity": statement.excluded.similarity},
+        ),
+        rows,
+    )
+
+
+def _trim(session: Session, item_id: int, k: int = RELATED_K):
+    """Zostawia k najbliższych na liście item_id."""
+    keep = (
+        select(ItemNeighbor.neighbor_id)
+        .where(ItemNeighbor.item_id == item_id)
+        .order_by(ItemNeighbor.similarity.desc())
+        .limit(k)
+    )
+    session.execute(delete(ItemNeighbor).where(ItemNeighbor.item_id == item_id, ItemNeighbor.neighbor_id.not_in(keep)))
+
+
+def rebuild_related(session: Session, item_id: int) -> List[Tuple[int, float]]:
+    """Przelicza od nowa listę jednego elementu (bez commita)."""
+    session.execute(delete(ItemNeighbor).where(ItemNeighbor.item_id == item_id))
+    neighbors = compute_neighbors(session, item_id)
+    _upsert(session, [{"item_id": item_id, "neighbor_id": n, "similarity": s} for n, s in neighbors])
+    return neighbors
+
+
+def referencing_items(session: Session, item_id: int) -> List[int]:
+    """Elementy, na których listach jest item_id."""
+    return list(session.exec(select(ItemNeighbor.item_id).where(ItemNeighbor.neighbor_id == item_id)).all())
+
+
+def refresh_related(session: Session, item_id: int):
+    """Po dodaniu lub zmianie embeddingów elementu (po flush, przed commitem)."""
+    affected = set(referencing_items(session, item_id))
+    session.execute(delete(ItemNeighbor).where(or_(ItemNeighbor.item_id == item_id, ItemNeighbor.neighbor_id == item_id)))
+    neighbors = rebuild_related(session, item_id)
+    # Symetria: element trafia na listy swoich sąsiadów, jeśli mieści się w ich k najbliższych
+    _upsert(session, [{"item_id": n, "neighbor_id": item_id, "similarity": s} for n, s in neighbors])
+    for neighbor_id, _ in neighbors:
+        _trim(session, neighbor_id)
+        affected.discard(neighbor_id)
+    # Listy, z których element wypadł po zmianie, mają teraz wolne miejsce - uzupełniamy je
+    for other_id in affected:
+        rebuild_related(session, other_id)
+
+
+def get_related(session: Session, item_id: int, k: int = RELATED_K) -> List[RelatedItem]:
+    """Odczyt listy - jedno zapytanie po kluczu głównym item_neighbor, bez treści i embeddingów."""
+    rows = session.exec(
+        select(KnowledgeItem.id, KnowledgeItem.title, KnowledgeItem.original_filename, KnowledgeItem.tags, ItemNeighbor.similarity)
+        .join(ItemNeighbor, ItemNeighbor.neighbor_id == KnowledgeItem.id)
+        .where(ItemNeighbor.item_id == item_id)
+        .order_by(ItemNeighbor.similarity.desc())
+        .limit(k)
+    ).all()
+    return [
+        RelatedItem(id=row_id, title=title, original_filename=filename, tags=tags or [], similarity=similarity)
+        for row_id, title, filename, tags, similarity in rows
+    ]
+
+
+def rebuild_all(session: Session, batch_size: int = 100) -> int:
+    ids = session.exec(select(KnowledgeItem.id).where(KnowledgeItem.embedding.is_not(None)).order_by(KnowledgeItem.id)).all()
+    for position, item_id in enumerate(ids, start=1):
+        rebuild_related(session, item_id)
+        if position % batch_size == 0:
+            session.commit()
+            logger.info("Related lists rebuilt: %d/%d", position, len(ids))
+    session.commit()
+    return len(ids)
+
+
+def main():
+    from .database import _init_db_connection, create_db_and_tables, open_session
+    from .logging_config import configure_logging
+
+    configure_logging()
+    _init_db_connection(statement_timeout_ms=0) # Przebiegi wsadowe - długie zapytania są tu normalne
+    create_db_and_tables()
+    with open_session() as session:
+        count = rebuild_all(session)
+    print(f"Done. Rebuilt related lists for {count} items.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# knowledge-assistant/backend/app/search.py
+# Wyszukiwanie leksykalne (tytuł / tagi / treść) wykonywane w całości w PostgreSQL.
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from .models import SearchHighlights
+
+# Konfiguracja FTS - 'simple' nie robi stemmingu, więc działa tak samo dla PL i EN
+FTS_CONFIG = "simple"
+
+# DDL dla wyszukiwania tekstowego. Kolumna search_vector NIE jest mapowana w modelu
+# KnowledgeItem, żeby select(KnowledgeItem) nie ciągnął ze sobą całego tsvectora.
+# To samo DDL wykonuje migracja 8b2d4e6f1a90 (dla istniejących baz).
+#
+# Treść w search_vector jest przycięta do FTS_CONTENT_CHARS znaków: tsvector ma limit 1 MB
+# i dla dużych PDF-ów INSERT/UPDATE kończył się błędem (upload nie przechodził). Pozycje słów
+# powyżej 16383 Postgres i tak spłaszcza, więc dalsza treść nie działała w wyszukiwaniu fraz;
+# semantycznie (fragmenty) przeszukiwany jest cały dokument.
+FTS_CONTENT_CHARS = 100000
+
+SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # array_to_string jest STABLE, a kolumna generowana / indeks wymaga IMMUTABLE
+    """
+    CREATE OR REPLACE FUNCTION knowledge_tags_text(tags text[]) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT lower(coalesce(array_to_string(tags, ' '), '')) $$
+    """,
+    f"""
+    ALTER TABLE knowledgeitem ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{FTS_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{FTS_CONFIG}', knowledge_tags_text(tags)), 'B') ||
+        setweight(to_tsvector('{FTS_CONFIG}', left(coalesce(text_content, ''), {FTS_CONTENT_CHARS})), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_knowledgeitem_search_vector ON knowledgeitem USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_knowledgeitem_title_trgm ON knowledgeitem USING gin (lower(title) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_knowledgeitem_tags_trgm ON knowledgeitem USING gin (knowledge_tags_text(tags) gin_trgm_ops)",
+]
+
+# Obiekty zarządzane ręcznie (poza SQLModel.metadata) - pomijane przez alembic autogenerate
+SEARCH_DB_OBJECTS = {
+    "search_vector",
+    "ix_knowledgeitem_search_vector",
+    "ix_knowledgeitem_title_trgm",
+    "ix_knowledgeitem_tags_trgm",
+}
+
+# Filtr tagów (tags.py): :tags NULL - bez filtra; :tags_all - wszystkie tagi (@>), inaczej co najmniej jeden (&&)
+_TAG_FILTER = """(CAST(:tags AS varchar[]) IS NULL
+        OR (:tags_all AND k.tags @> CAST(:tags AS varchar[]))
+        OR (NOT :tags_all AND k.tags && CAST(:tags AS varchar[])))"""
+
+# Progi punktowe takie same jak w dotychczasowej pętli w Pythonie:
+# dokładny tytuł 10, część tytułu 5, dokładny tag 8, część tagu 3, treść 1.
+# Kandydaci wybierani są przez indeksy (trigramy na tytule/tagach, GIN na search_vector),
+# a punktacja liczona jest tylko dla nich.
+_LEXICAL_SQL = text(f"""
+    SELECT id, text_score, is_exact FROM (
+        SELECT
+            k.id,
+            (CASE WHEN lower(k.title) = :q THEN 10
+                  WHEN lower(k.title) LIKE :pattern ESCAPE '\\' THEN 5
+                  ELSE 0 END)
+            + coalesce((
+                SELECT sum(CASE WHEN lower(t) = :q THEN 8
+                                WHEN lower(t) LIKE :pattern ESCAPE '\\' THEN 3
+                                ELSE 0 END)
+                FROM unnest(k.tags) AS t
+            ), 0)
+            + (CASE WHEN ts_filter(k.search_vector, '{{c}}') @@ phraseto_tsquery('{FTS_CONFIG}', :q)
+                    THEN 1 ELSE 0 END) AS text_score,
+            (lower(k.title) LIKE :pattern ESCAPE '\\'
+             OR EXISTS (SELECT 1 FROM unnest(k.tags) AS t WHERE lower(t) = :q)) AS is_exact
+        FROM knowledgeitem AS k
+        WHERE (lower(k.title) LIKE :pattern ESCAPE '\\'
+               OR knowledge_tags_text(k.tags) LIKE :pattern ESCAPE '\\'
+               OR k.search_vector @@ phraseto_tsquery('{FTS_CONFIG}', :q))
+          AND {_TAG_FILTER}
+    ) AS scored
+    WHERE text_score > 0
+""")
+
+
+# Gałąź leksykalna wyszukiwania hybrydowego: te same punkty za tytuł i tagi, ale treść dopasowana
+# wszystkimi słowami zapytania (plainto_tsquery, nie tylko fraza) i oceniona ts_rank_cd, żeby
+# kandydatów dało się uszeregować i uciąć na LIMIT.
+_RANKED_LEXICAL_SQL = text(f"""
+    SELECT k.id,
+        (CASE WHEN lower(k.title) = :q THEN 10
+              WHEN lower(k.title) LIKE :pattern ESCAPE '\\' THEN 5
+              ELSE 0 END)
+        + coalesce((
+            SELECT sum(CASE WHEN lower(t) = :q THEN 8
+                            WHEN lower(t) LIKE :pattern ESCAPE '\\' THEN 3
+                            ELSE 0 END)
+            FROM unnest(k.tags) AS t
+        ), 0)
+        + ts_rank_cd(k.search_vector, tsq.query) AS text_score
+    FROM knowledgeitem AS k, plainto_tsquery('{FTS_CONFIG}', :q) AS tsq(query)
+    WHERE (lower(k.title) LIKE :pattern ESCAPE '\\'
+           OR knowledge_tags_text(k.tags) LIKE :pattern ESCAPE '\\'
+           OR k.search_vector @@ tsq.query)
+      AND {_TAG_FILTER}
+    ORDER BY text_score DESC, k.id
+    LIMIT :limit
+""")
+
+
+# Liczba snippetów na wynik i ich przybliżona długość (słowa)
+SEARCH_SNIPPETS = int(os.getenv("SEARCH_SNIPPETS", "3"))
+SNIPPET_WORDS = int(os.getenv("SNIPPET_WORDS", "30"))
+# ts_headline parsuje cały przekazany tekst - w długich PDF-ach patrzymy tylko na początek
+SNIPPET_SCAN_CHARS = int(os.getenv("SNIPPET_SCAN_CHARS", "100000"))
+
+_FRAGMENT_DELIMITER = " ... "
+_HEADLINE_OPTIONS = (
+    f'StartSel=<mark>, StopSel=</mark>, MaxWords={SNIPPET_WORDS}, MinWords={max(SNIPPET_WORDS // 3, 1)}, '
+    f'MaxFragments={SEARCH_SNIPPETS}, FragmentDelimiter="{_FRAGMENT_DELIMITER}"'
+)
+_CHUNK_HEADLINE_OPTIONS = f"StartSel=<mark>, StopSel=</mark>, MaxWords={SNIPPET_WORDS}, MinWords={max(SNIPPET_WORDS // 3, 1)}"
+
+
+def _escaped(expression: str) -> str:
+    """Tekst escapowany jako HTML przed ts_headline - jedynymi znacznikami w wyniku są <mark>."""
+    return f"replace(replace(replace({expression}, '&', '&amp;'), '<', '&lt;'), '>', '&gt;')"
+
+
+# Dane wyników (tylko top_k wierszy, bez pełnej treści): podświetlony tytuł, pasujące tagi i snippety.
+# Snippety: gdy treść pasuje do zapytania - fragmenty z ts_headline; inaczej najlepszy fragment
+# z wyszukiwania wektorowego (offset z knowledge_chunk, bez szukania w treści); na końcu początek tekstu.
+_HITS_SQL = text(f"""
+    SELECT k.id, k.title, k.original_filename, k.tags, k.created_at, k.updated_at,
+        length(k.text_content) AS content_length,
+        ts_headline('{FTS_CONFIG}', {_escaped("k.title")}, tsq.query, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true') AS title_highlight,
+        ARRAY(
+            SELECT t FROM unnest(k.tags) AS t
+            WHERE lower(t) LIKE :pattern ESCAPE '\\' OR to_tsvector('{FTS_CONFIG}', t) @@ tsq.query
+        ) AS matched_tags,
+        CASE WHEN ts_filter(k.search_vector, '{{c}}') @@ tsq.query
+             THEN ts_headline('{FTS_CONFIG}', {_escaped("left(k.text_content, :scan_chars)")}, tsq.query, :headline_options)
+        END AS content_headline,
+        CASE WHEN b.chunk_offset IS NOT NULL
+             THEN ts_headline('{FTS_CONFIG}', {_escaped("substr(k.text_content, b.chunk_offset + 1, b.chunk_length)")}, tsq.query, :chunk_options)
+        END AS chunk_headline,
+        {_escaped("left(k.text_content, :preview_chars)")} AS preview
+    FROM unnest(CAST(:ids AS integer[]), CAST(:offsets AS integer[]), CAST(:lengths AS integer[])) AS b(id, chunk_offset, chunk_length)
+    JOIN knowledgeitem AS k ON k.id = b.id
+    CROSS JOIN plainto_tsquery('{FTS_CONFIG}', :q) AS tsq(query)
+""")
+
+
+def _like_pattern(value: str) -> str:
+    """Wzorzec LIKE '%value%' z escapowaniem znaków specjalnych."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _tag_params(tags: Optional[List[str]], tags_mode: str) -> dict:
+    return {"tags": tags or None, "tags_all": tags_mode == "all"}
+
+
+def lexical_matches(session: Session, query: str, tags: Optional[List[str]] = None, tags_mode: str = "any") -> List[Tuple[int, float, bool]]:
+    """Dopasowania tekstowe jako lista (id, text_score, is_exact) - jedno zapytanie z indeksami."""
+    query_lower = query.lower()
+    rows = session.execute(
+        _LEXICAL_SQL, {"q": query_lower, "pattern": _like_pattern(query_lower), **_tag_params(tags, tags_mode)}
+    ).all()
+    return [(item_id, float(score), bool(is_exact)) for item_id, score, is_exact in rows]
+
+
+def ranked_lexical_matches(
+    session: Session, query: str, limit: int, tags: Optional[List[str]] = None, tags_mode: str = "any"
+) -> List[Tuple[int, float]]:
+    """Najlepsze dopasowania tekstowe jako (id, text_score) malejąco - najwyżej limit wierszy."""
+    query_lower = query.lower()
+    rows = session.execute(
+        _RANKED_LEXICAL_SQL, {"q": query_lower, "pattern": _like_pattern(query_lower), "limit": limit, **_tag_params(tags, tags_mode)}
+    ).all()
+    return [(item_id, float(score)) for item_id, score in rows]
+
+
+def _snippets(row) -> List[str]:
+    if row.content_headline and "<mark>" in row.content_headline:
+        return [fragment.strip() for fragment in row.content_headline.split(_FRAGMENT_DELIMITER) if fragment.strip()][:SEARCH_SNIPPETS]
+    if row.chunk_headline:
+        return [row.chunk_headline.strip()]
+    return [row.preview.strip()] if row.preview.strip() else []
+
+
+def search_hits(session: Session, query: str, best_chunks: Dict[int, Optional[Tuple[int, int]]]) -> Dict[int, dict]:
+    """Pola wyniku wyszukiwania dla wskazanych elementów (klucze best_chunks) - jedno zapytanie.
+
+    best_chunks: id -> (offset, długość) najlepszego fragmentu w text_content albo None.
+    Zwraca id -> pola SemanticSearchHit bez wyników rankingu (score, strony).
+    """
+    if not best_chunks:
+        return {}
+    query_lower = query.lower()
+    ids = list(best_chunks)
+    spans = [best_chunks[item_id] or (None, None) for item_id in ids]
+    rows = session.execute(_HITS_SQL, {
+        "q": query_lower,
+        "pattern": _like_pattern(query_lower),
+        "ids": ids,
+        "offsets": [span[0] for span in spans],
+        "lengths": [span[1] for span in spans],
+        "scan_chars": SNIPPET_SCAN_CHARS,
+        "preview_chars": SNIPPET_WORDS * 8,
+        "headline_options": _HEADLINE_OPTIONS,
+        "chunk_options": _CHUNK_HEADLINE_OPTIONS,
+    }).all()
+    return {
+        row.id: {
+            "id": row.id,
+            "title": row.title,
+            "original_filename": row.original_filename,
+            "tags": row.tags or [],
+            "created_at": row.created_at,
+            "updated_at": row.updated_at,
+            "content_length": row.content_length,
+            "highlights": SearchHighlights(title=row.title_highlight, tags=list(row.matched_tags or [])),
+            "snippets": _snippets(row),
+        }
+        for row in rows
+    }
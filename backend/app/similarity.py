@@ -0,0 +1,69 @@
+# knowledge-assistant/backend/app/similarity.py
+# Podobieństwo wektorowe elementu: treść (embedding) mieszana z tagami (tags_embedding).
+# Wszystkie embeddingi są znormalizowane przy zapisie, więc podobieństwo kosinusowe to iloczyn
+# skalarny - w bazie operator <#> (ujemny iloczyn skalarny) z indeksami HNSW *_ip_ops.
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from .models import KnowledgeItem
+
+# Wagi podobieństwa treści i tagów; elementy bez tagów oceniane są tylko po treści
+SEARCH_CONTENT_WEIGHT = float(os.getenv("SEARCH_CONTENT_WEIGHT", "0.8"))
+SEARCH_TAGS_WEIGHT = float(os.getenv("SEARCH_TAGS_WEIGHT", "0.2"))
+
+
+def dot_distance(column, vector):
+    """Wyrażenie do ORDER BY (rosnąco = najbardziej podobne); korzysta z indeksu HNSW kolumny."""
+    return column.max_inner_product(vector)
+
+
+def to_similarity(distance) -> float:
+    """<#> zwraca -iloczyn skalarny; dla wektorów jednostkowych to -cos."""
+    return -float(distance)
+
+
+def blend_similarity(
+    content: float,
+    tags: Optional[float],
+    content_weight: float = SEARCH_CONTENT_WEIGHT,
+    tags_weight: float = SEARCH_TAGS_WEIGHT,
+) -> float:
+    """Średnia ważona podobieństw; bez embeddingu tagów (albo z zerową wagą) zwraca samą treść."""
+    if tags is None or tags_weight <= 0 or content_weight + tags_weight <= 0:
+        return content
+    return (content_weight * content + tags_weight * tags) / (content_weight + tags_weight)
+
+
+def item_similarities(
+    session: Session,
+    item_ids: Iterable[int],
+    content_vector: List[float],
+    tags_vector: Optional[List[float]],
+    model_name: Optional[str] = None,
+) -> Dict[int, Tuple[Optional[float], Optional[float]]]:
+    """(podobieństwo treści, podobieństwo tagów) dla wskazanych elementów - jedno zapytanie po kluczu.
+
+    Wartość None oznacza brak embeddingu w bazie (albo brak wektora tagów po stronie pytającego).
+    model_name pomija elementy, których embeddingi policzył inny model (wektory nieporównywalne).
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    columns = [KnowledgeItem.id, dot_distance(KnowledgeItem.embedding, content_vector)]
+    if tags_vector is not None:
+        columns.append(dot_distance(KnowledgeItem.tags_embedding, tags_vector))
+    statement = select(*columns).where(KnowledgeItem.id.in_(item_ids))
+    if model_name is not None:
+        statement = statement.where(KnowledgeItem.embedding_model == model_name)
+    rows = session.exec(statement).all()
+    similarities = {}
+    for row in rows:
+        content_distance = row[1]
+        tags_distance = row[2] if tags_vector is not None else None
+        similarities[row[0]] = (
+            to_similarity(content_distance) if content_distance is not None else None,
+            to_similarity(tags_distance) if tags_distance is not None else None,
+        )
+    return similarities
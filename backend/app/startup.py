@@ -0,0 +1,109 @@
+# knowledge-assistant/backend/app/startup.py
+# Start w tle: połączenie z bazą, tabele, model (z rozgrzewką) i indeks wektorowy ładują się
+# w osobnym wątku, a worker od razu odpowiada na /health. Ruch kierujemy na replikę dopiero,
+# gdy /ready zwraca 200.
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+# Maksymalna przerwa (s) między kolejnymi próbami kroku z ponawianiem (baza, indeks wektorowy)
+STARTUP_RETRY_MAX_S = int(os.getenv("STARTUP_RETRY_MAX_S", "60"))
+
+
+class Readiness:
+    """Stan komponentów potrzebnych do obsługi żądań (z czasem ładowania każdego z nich)."""
+
+    def __init__(self, components):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._state: Dict[str, dict] = {name: {"status": PENDING} for name in components}
+
+    def run(self, name: str, step: Callable[[], None], retry: bool = False) -> bool:
+        """retry - po błędzie krok jest ponawiany (przerwa rośnie do STARTUP_RETRY_MAX_S), aż się uda;
+        w międzyczasie /ready pokazuje failed z błędem i numerem próby."""
+        with self._lock:
+            self._state[name] = {"status": LOADING}
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                step()
+                break
+            except Exception as e:
+                logger.exception("Startup step %s failed (attempt %d)", name, attempt)
+                with self._lock:
+                    self._state[name] = {"status": FAILED, "error": str(e), "attempts": attempt}
+                if not retry:
+                    return False
+                time.sleep(min(2 ** attempt, STARTUP_RETRY_MAX_S))
+        with self._lock:
+            self._state[name] = {
+                "status": READY,
+                "seconds": round(time.monotonic() - started, 3),
+                "since_start": round(time.monotonic() - self._started, 3),
+            }
+        return True
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(component["status"] == READY for component in self._state.values())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(component) for name, component in self._state.items()}
+
+
+readiness: Optional[Readiness] = None
+_startup_thread: Optional[threading.Thread] = None
+
+
+def _startup(state: Readiness, with_vector_index: bool):
+    from .database import _init_db_connection, create_db_and_tables, open_session
+    from .embeddings import get_embedding_model, get_fallback_model, warm_up_model
+    from .ingestion import check_jobs
+
+    def database():
+        _init_db_connection() # Ponawia połączenie, jeśli baza jeszcze startuje
+        create_db_and_tables()
+        with open_session() as session:
+            check_jobs(session) # Zadania ingestii przerwane przez poprzedni proces - failed zamiast wiecznie w toku
+
+    def model():
+        get_embedding_model()
+        warm_up_model()
+        get_fallback_model() # Poprzedni model (EMBEDDING_FALLBACK_MODEL) - tylko w trakcie migracji embeddingów
+
+    def vector_index():
+        from .vector_index import get_vector_index
+
+        with open_session() as session:
+            get_vector_index().load(session)
+
+    # Model nie zależy od bazy - ładuje się pierwszy, więc niedostępna baza go nie wstrzymuje
+    state.run("model", model)
+    # Baza bywa chwilowo niedostępna (restart, failover) - ponawiamy zamiast zostawić workera bez /ready
+    state.run("database", database, retry=True)
+    if with_vector_index:
+        state.run("vector_index", vector_index, retry=True)
+
+
+def start_background_startup() -> Readiness:
+    """Uruchamia ładowanie w wątku i od razu wraca - wywoływane w on_startup."""
+    global readiness, _startup_thread
+    from .vector_index import get_vector_index
+
+    with_vector_index = get_vector_index() is not None
+    components = ["database", "model"] + (["vector_index"] if with_vector_index else [])
+    readiness = Readiness(components)
+    _startup_thread = threading.Thread(
+        target=_startup, args=(readiness, with_vector_index), name="startup-loader", daemon=True
+    )
+    _startup_thread.start()
+    return readiness
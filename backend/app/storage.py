@@ -0,0 +1,358 @@
+# knowledge-assistant/backend/app/storage.py
+# Magazyn oryginalnych PDF-ów adresowany treścią: plik leży pod swoim SHA-256 (ten sam hash co
+# KnowledgeItem.content_hash), więc identyczne pliki zajmują miejsce raz, a nazwa nadana przez
+# użytkownika (original_filename) nie może nadpisać cudzego PDF-a.
+#
+# PDF_STORAGE=local (domyślnie) - katalog PDF_UPLOAD_DIR/blobs/ab/cd/<sha>.pdf (dwa poziomy podkatalogów,
+#     żeby żaden katalog nie rósł do setek tysięcy wpisów). Plik trafia na miejsce przez os.replace
+#     z pliku tymczasowego w tym samym systemie plików - czytelnik widzi cały plik albo żaden.
+# PDF_STORAGE=s3 - bucket zgodny z S3 (AWS, MinIO: docker compose --profile s3 up); boto3 jest
+#     wtedy wymagane, ale nie jest zależnością aplikacji. Pobieranie przekierowuje na podpisany URL.
+#
+# Pliki sprzed magazynu (PDF_UPLOAD_DIR/<original_filename>) są dalej serwowane (resolve_legacy_path);
+# przeniesienie: python -m app.storage migrate
+#
+# Usunięcie elementu nie usuwa bloba: sprawdzenie "nikt już go nie wskazuje" i usunięcie pliku nie są
+# atomowe względem równoległego uploadu tych samych bajtów (blob zapisany, element jeszcze bez commita),
+# więc element mógłby wskazywać brakujący plik. Nieużywane bloby zbiera osobny przebieg:
+#   python -m app.storage gc --min-age-hours 24
+# Zapis istniejącego bloba odświeża jego czas modyfikacji, a gc pomija bloby młodsze niż min-age -
+# blob, do którego upload właśnie dopisuje element, nie jest usuwany.
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import IO, Iterator, Optional, Tuple
+
+from .uploads import PDF_UPLOAD_DIR, UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# local | s3
+PDF_STORAGE = os.getenv("PDF_STORAGE", "local")
+PDF_BLOB_DIR = os.getenv("PDF_BLOB_DIR", os.path.join(PDF_UPLOAD_DIR, "blobs"))
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") # Np. http://minio:9000; puste = AWS
+S3_BUCKET = os.getenv("S3_BUCKET", "knowledge-pdfs")
+S3_PREFIX = os.getenv("S3_PREFIX", "pdfs/")
+S3_REGION = os.getenv("S3_REGION")
+# Ważność podpisanego linku do pobrania (sekundy)
+S3_PRESIGNED_TTL = int(os.getenv("S3_PRESIGNED_TTL", "300"))
+
+
+def _shard(key: str) -> str:
+    return f"{key[:2]}/{key[2:4]}/{key}.pdf"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LocalBlobStore:
+    """Pliki na dysku; local_path() pozwala serwować je przez FileResponse (Range, Last-Modified)."""
+
+    def __init__(self, root: str = PDF_BLOB_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, _shard(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def put_file(self, key: str, tmp_path: str):
+        """Przejmuje plik tymczasowy (rename); gdy blob już istnieje, plik tymczasowy jest usuwany."""
+        path = self.local_path(key)
+        if self._touch(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Inny system plików (np. PDF_BLOB_DIR na osobnym wolumenie) - kopia, potem rename
+            self.put_copy(key, tmp_path)
+            os.remove(tmp_path)
+
+    def put_copy(self, key: str, source_path: str):
+        """Kopiuje plik, zostawiając źródło (import z katalogu, migracja)."""
+        path = self.local_path(key)
+        if self._touch(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Odświeża czas modyfikacji istniejącego bloba (gc go pominie); False, jeśli bloba nie ma."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def open(self, key: str) -> IO[bytes]:
+        return open(self.local_path(key), "rb")
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.local_path(key))
+
+    def delete(self, key: str):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.local_path(key))
+        except FileNotFoundError:
+            return None
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        """(klucz, czas modyfikacji) wszystkich blobów."""
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".pdf"): # Pliki .part to zapisy w toku
+                    path = os.path.join(directory, name)
+                    try:
+                        yield name[:-len(".pdf")], os.path.getmtime(path)
+                    except FileNotFoundError:
+                        continue
+
+    def presigned_url(self, key: str, filename: str) -> Optional[str]:
+        return None
+
+
+class S3BlobStore:
+    """Bucket zgodny z S3 - put_object jest atomowy po stronie serwera, więc nie ma plików częściowych."""
+
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX, endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+                 region: Optional[str] = S3_REGION):
+        import boto3 # Opcjonalne - potrzebne tylko przy PDF_STORAGE=s3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client_error = ClientError
+        # Klucze dostępu z AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY (standardowy łańcuch boto3)
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        try:
+            self._client.head_bucket(Bucket=bucket)
+        except ClientError:
+            self._client.create_bucket(Bucket=bucket)
+            logger.info("Created S3 bucket %s", bucket)
+
+    def _name(self, key: str) -> str:
+        return self.prefix + _shard(key)
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._name(key))
+            return True
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put_copy(self, key: str, source_path: str):
+        if self.exists(key):
+            # Kopia obiektu na siebie (po stronie serwera) odświeża LastModified - gc go pominie
+            self._client.copy_object(
+                Bucket=self.bucket, Key=self._name(key), CopySource={"Bucket": self.bucket, "Key": self._name(key)},
+                MetadataDirective="REPLACE", ContentType="application/pdf",
+            )
+            return
+        self._client.upload_file(source_path, self.bucket, self._name(key), ExtraArgs={"ContentType": "application/pdf"})
+
+    def put_file(self, key: str, tmp_path: str):
+        try:
+            self.put_copy(key, tmp_path)
+        finally:
+            os.remove(tmp_path)
+
+    def open(self, key: str) -> IO[bytes]:
+        return self._client.get_object(Bucket=self.bucket, Key=self._name(key))["Body"]
+
+    def size(self, key: str) -> int:
+        return self._client.head_object(Bucket=self.bucket, Key=self._name(key))["ContentLength"]
+
+    def delete(self, key: str):
+        self._client.delete_object(Bucket=self.bucket, Key=self._name(key))
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return self._client.head_object(Bucket=self.bucket, Key=self._name(key))["LastModified"].timestamp()
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        for page in self._client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for entry in page.get("Contents", []):
+                name = entry["Key"].rsplit("/", 1)[-1]
+                if name.endswith(".pdf"):
+                    yield name[:-len(".pdf")], entry["LastModified"].timestamp()
+
+    def presigned_url(self, key: str, filename: str) -> Optional[str]:
+        # Range, ETag i Last-Modified obsługuje wtedy sam serwer S3
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._name(key),
+                "ResponseContentType": "application/pdf",
+                "ResponseContentDisposition": f'inline; filename="{filename}"',
+            },
+            ExpiresIn=S3_PRESIGNED_TTL,
+        )
+
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """Wspólna instancja - tworzona leniwie, żeby import nie łączył się z S3."""
+    global _blob_store
+    if _blob_store is None:
+        with _blob_store_lock:
+            if _blob_store is None:
+                if PDF_STORAGE == "s3":
+                    _blob_store = S3BlobStore()
+                    logger.info("PDF storage: S3 bucket %s at %s", S3_BUCKET, S3_ENDPOINT_URL or "AWS")
+                else:
+                    _blob_store = LocalBlobStore()
+    return _blob_store
+
+
+def resolve_legacy_path(original_filename: str) -> Optional[str]:
+    """PDF zapisany przed magazynem pod nazwą pliku (None, jeśli go nie ma)."""
+    path = os.path.join(PDF_UPLOAD_DIR, os.path.basename(original_filename))
+    return path if os.path.isfile(path) else None
+
+
+def open_item_pdf(original_filename: str, content_hash: Optional[str]) -> Optional[tuple]:
+    """(strumień, rozmiar) PDF-u elementu - z magazynu albo spod starej nazwy; None, jeśli pliku nie ma."""
+    store = get_blob_store()
+    if content_hash and store.exists(content_hash):
+        return store.open(content_hash), store.size(content_hash)
+    legacy_path = resolve_legacy_path(original_filename)
+    if legacy_path is None:
+        return None
+    return open(legacy_path, "rb"), os.path.getsize(legacy_path)
+
+
+def migrate_legacy_files(remove: bool = False) -> dict:
+    """Przenosi PDF-y zapisane pod nazwą pliku do magazynu i uzupełnia content_hash.
+
+    Bez --remove pliki źródłowe zostają (można je usunąć po sprawdzeniu pobierania).
+    """
+    from sqlmodel import select
+
+    from .database import _init_db_connection, open_session
+    from .models import KnowledgeItem
+
+    _init_db_connection(statement_timeout_ms=0)
+    store = get_blob_store()
+    stats = {"migrated": 0, "already_stored": 0, "missing": 0}
+    with open_session() as session:
+        items = session.exec(
+            select(KnowledgeItem.id, KnowledgeItem.original_filename, KnowledgeItem.content_hash)
+            .where(KnowledgeItem.original_filename.is_not(None))
+            .order_by(KnowledgeItem.id)
+        ).all()
+        for item_id, original_filename, content_hash in items:
+            if content_hash and store.exists(content_hash):
+                stats["already_stored"] += 1
+                continue
+            legacy_path = resolve_legacy_path(original_filename)
+            if legacy_path is None:
+                logger.warning("Item %s: file %s not found", item_id, original_filename)
+                stats["missing"] += 1
+                continue
+            file_hash = file_sha256(legacy_path)
+            store.put_copy(file_hash, legacy_path)
+            if file_hash != content_hash:
+                # Stare elementy mają hash treści tekstowej albo żaden - blob wskazuje hash bajtów pliku
+                session.get(KnowledgeItem, item_id).content_hash = file_hash
+                session.commit()
+            stats["migrated"] += 1
+        if remove:
+            for _, original_filename, _ in items:
+                legacy_path = resolve_legacy_path(original_filename)
+                if legacy_path is not None:
+                    os.remove(legacy_path)
+    return stats
+
+
+def collect_garbage(min_age_s: float, dry_run: bool = False) -> dict:
+    """Usuwa bloby, których nie wskazuje żaden element i które nie były zapisywane od min_age_s sekund."""
+    from sqlmodel import select
+
+    from .database import _init_db_connection, open_session
+    from .models import KnowledgeItem
+
+    _init_db_connection(statement_timeout_ms=0)
+    store = get_blob_store()
+    cutoff = time.time() - min_age_s
+    # Najpierw lista blobów, potem referencje - element zapisany w międzyczasie jest już w zbiorze
+    candidates = [key for key, modified_at in store.iter_blobs() if modified_at < cutoff]
+    with open_session() as session:
+        referenced = set(session.exec(
+            select(KnowledgeItem.content_hash)
+            .where(KnowledgeItem.original_filename.is_not(None), KnowledgeItem.content_hash.is_not(None))
+            .distinct()
+        ).all())
+    stats = {"checked": len(candidates), "deleted": 0, "referenced": 0}
+    for key in candidates:
+        if key in referenced:
+            stats["referenced"] += 1
+            continue
+        modified_at = store.modified_at(key)
+        if modified_at is None or modified_at >= cutoff:
+            continue # Usunięty albo ponownie zapisany przez upload w trakcie przebiegu
+        if not dry_run:
+            store.delete(key)
+        logger.info("Unreferenced blob %s %s", key, "would be deleted" if dry_run else "deleted")
+        stats["deleted"] += 1
+    return stats
+
+
+def main():
+    from .logging_config import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Magazyn PDF-ów adresowany treścią")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="Przenieś PDF-y zapisane pod nazwą pliku do magazynu")
+    migrate.add_argument("--remove", action="store_true", help="Usuń pliki źródłowe po przeniesieniu")
+    gc = commands.add_parser("gc", help="Usuń bloby, których nie wskazuje żaden element")
+    gc.add_argument("--min-age-hours", type=float, default=24, help="Pomiń bloby zapisane w tym czasie")
+    gc.add_argument("--dry-run", action="store_true", help="Tylko wypisz bloby do usunięcia")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        print(migrate_legacy_files(remove=args.remove))
+    elif args.command == "gc":
+        print(collect_garbage(args.min_age_hours * 3600, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
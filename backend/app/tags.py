@@ -0,0 +1,89 @@
+# knowledge-assistant/backend/app/tags.py
+# Tagi po stronie serwera: liczniki (GET /api/tags), filtr tags=a,b pchany do SQL i facety wyników.
+#
+# Liczniki leżą w tabeli tag_count i są utrzymywane przyrostowo przez trigger na knowledgeitem
+# (INSERT / DELETE / UPDATE OF tags) - w tej samej transakcji co zapis elementu, więc upload,
+# edycja, usunięcie i import masowy (INSERT) nie muszą o nich pamiętać, a odczyt to zwykły SELECT.
+# Trigger liczy tylko różnicę starych i nowych tagów; wiersze blokuje w kolejności tagów, żeby
+# równoległe zapisy z tymi samymi tagami nie zakleszczały się. TRUNCATE knowledgeitem triggera
+# nie wywołuje - tag_count trzeba wtedy wyczyścić razem z nią.
+# Filtrowanie elementów po tagach korzysta z indeksu GIN ix_knowledgeitem_tags_gin (&& i @>).
+# To samo DDL wykonuje migracja a7c3e5b9d1f4 (dla istniejących baz).
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from sqlalchemy import String, cast
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, select
+
+from .models import KnowledgeItem, TagCount
+
+TAG_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION knowledge_tag_counts() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        old_tags text[] := '{}';
+        new_tags text[] := '{}';
+        removed_tag text;
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN old_tags := coalesce(OLD.tags, '{}'); END IF;
+        IF TG_OP <> 'DELETE' THEN new_tags := coalesce(NEW.tags, '{}'); END IF;
+        FOR removed_tag IN
+            SELECT DISTINCT t FROM unnest(old_tags) AS t WHERE NOT t = ANY(new_tags) ORDER BY t
+        LOOP
+            UPDATE tag_count SET item_count = item_count - 1 WHERE tag = removed_tag;
+        END LOOP;
+        DELETE FROM tag_count WHERE tag = ANY(old_tags) AND item_count <= 0;
+        INSERT INTO tag_count (tag, item_count)
+        SELECT DISTINCT t, 1 FROM unnest(new_tags) AS t WHERE NOT t = ANY(old_tags) ORDER BY t
+        ON CONFLICT (tag) DO UPDATE SET item_count = tag_count.item_count + 1;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE TRIGGER knowledgeitem_tag_counts
+    AFTER INSERT OR DELETE OR UPDATE OF tags ON knowledgeitem
+    FOR EACH ROW EXECUTE FUNCTION knowledge_tag_counts()
+    """,
+    # Baza sprzed tabeli tag_count (create_all bez migracji) - jednorazowe wypełnienie
+    """
+    INSERT INTO tag_count (tag, item_count)
+    SELECT t, count(DISTINCT k.id) FROM knowledgeitem AS k, unnest(k.tags) AS t
+    WHERE NOT EXISTS (SELECT 1 FROM tag_count)
+    GROUP BY t
+    ON CONFLICT (tag) DO NOTHING
+    """,
+]
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """Tagi z parametru 'a,b' (puste pozycje pomijane)."""
+    return [tag.strip() for tag in tags.split(',') if tag.strip()] if tags else []
+
+
+def tag_condition(tags: List[str], mode: str = "any"):
+    """Warunek WHERE dla KnowledgeItem: any - co najmniej jeden tag (&&), all - wszystkie (@>).
+
+    Kolumna ma ogólny typ ARRAY (bez .overlap / .contains), więc operator podajemy wprost;
+    parametr rzutowany na varchar[] jak kolumna - inaczej Postgres nie dobierze operatora.
+    """
+    return KnowledgeItem.tags.bool_op("@>" if mode == "all" else "&&")(cast(tags, ARRAY(String)))
+
+
+def list_tags(session: Session, prefix: Optional[str] = None, limit: int = 100) -> List[TagCount]:
+    """Tagi z liczbą elementów, od najczęstszych; prefix zawęża do tagów zaczynających się od niego."""
+    statement = select(TagCount)
+    if prefix:
+        escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        statement = statement.where(TagCount.tag.ilike(f"{escaped}%", escape="\\"))
+    return session.exec(statement.order_by(TagCount.item_count.desc(), TagCount.tag).limit(limit)).all()
+
+
+def facet_counts(tag_lists: Iterable[List[str]], limit: int) -> List[TagCount]:
+    """Liczba wyników z każdym tagiem (każdy element liczony raz), od najczęstszych."""
+    counter = Counter(tag for tags in tag_lists for tag in set(tags))
+    ranked = sorted(counter.items(), key=lambda pair: (-pair[1], pair[0]))[:limit]
+    return [TagCount(tag=tag, item_count=count) for tag, count in ranked]
@@ -0,0 +1,63 @@
+# knowledge-assistant/backend/app/uploads.py
+# Zapis przesłanych plików na dysk porcjami, z limitem rozmiaru.
+import hashlib
+import os
+import uuid
+from typing import NamedTuple
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# Ścieżka do katalogu na pliki PDF
+PDF_UPLOAD_DIR = os.getenv("PDF_UPLOAD_DIR", "uploaded_pdfs")
+os.makedirs(PDF_UPLOAD_DIR, exist_ok=True)
+
+# Rozmiar porcji kopiowanej z uploadu na dysk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Maksymalny rozmiar przesyłanego pliku
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "200")) * 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Plik przekracza MAX_UPLOAD_BYTES."""
+
+
+class SavedUpload(NamedTuple):
+    size: int
+    sha256: str # Liczony w locie podczas zapisu - bez ponownego czytania pliku
+
+
+def incoming_upload_path() -> str:
+    """Tymczasowa nazwa w PDF_UPLOAD_DIR - plik dostaje docelową nazwę dopiero, gdy nie jest duplikatem."""
+    return os.path.join(PDF_UPLOAD_DIR, f".incoming-{uuid.uuid4().hex}")
+
+
+async def save_upload(upload: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> SavedUpload:
+    """Kopiuje upload do dest_path porcjami po UPLOAD_CHUNK_SIZE; zwraca rozmiar i SHA-256.
+
+    Zapis idzie do pliku tymczasowego i jest podmieniany atomowo, więc przerwany upload
+    nie zostawia uciętego PDF-a pod docelową nazwą.
+    """
+    tmp_path = f"{dest_path}.part"
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as out:
+            def write(chunk: bytes):
+                digest.update(chunk)
+                out.write(chunk)
+
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit.")
+                await run_in_threadpool(write, chunk) # Hash i zapis poza pętlą zdarzeń
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return SavedUpload(written, digest.hexdigest())
@@ -0,0 +1,303 @@
+# knowledge-assistant/backend/app/vector_index.py
+# Indeks wektorowy w pamięci procesu (VECTOR_INDEX=memory): ciągła macierz float32 embeddingów
+# elementów (wiersze jednostkowe) + tablica id. Zapytanie to jeden iloczyn macierz-wektor
+# i np.argpartition zamiast zapytania ANN do bazy.
+#
+# Spójność między workerami: każdy zapis podbija licznik w tabeli corpus_state i zapisuje id
+# zmienionych elementów w corpus_change (w tej samej transakcji). Przed wyszukiwaniem worker
+# porównuje swoją wersję z bazą; jeśli inny worker coś zmienił, pobiera z dziennika id elementów
+# z nowszych wersji i tylko je dociąga (albo usuwa - usunięcie zostawia wpis w dzienniku).
+# Koszt synchronizacji zależy od liczby zmian, nie od rozmiaru korpusu. Pełne ładowanie tylko
+# przy starcie i gdy worker został w tyle o więcej niż CORPUS_CHANGE_RETENTION wersji.
+#
+# Indeks trzyma tylko embeddingi aktywnego modelu (EMBEDDING_MODEL) - elementy innego modelu
+# (np. w trakcie migracji embeddingów, reembed.py) są z niego usuwane.
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, text
+from sqlmodel import Session, select
+
+from .models import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL_NAME, CorpusChange, KnowledgeItem
+from .similarity import SEARCH_CONTENT_WEIGHT, SEARCH_TAGS_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+# pgvector (domyślnie) - ranking w bazie przez HNSW; memory - indeks w pamięci każdego workera
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "pgvector")
+# Ile ostatnich wersji trzyma dziennik corpus_change (starsze wpisy są usuwane przy zapisach)
+CORPUS_CHANGE_RETENTION = int(os.getenv("CORPUS_CHANGE_RETENTION", "10000"))
+# Wiersze pobierane naraz przy ładowaniu
+VECTOR_INDEX_LOAD_BATCH = int(os.getenv("VECTOR_INDEX_LOAD_BATCH", "1000"))
+
+Upsert = Tuple[int, object, Optional[object]] # (id, embedding, tags_embedding)
+
+
+# --- Wersja korpusu w bazie ---
+_BUMP_SQL = text("""
+    INSERT INTO corpus_state (id, version) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE SET version = corpus_state.version + 1
+    RETURNING version
+""")
+_LOG_SQL = text("""
+    INSERT INTO corpus_change (version, item_id)
+    SELECT :version, unnest(CAST(:item_ids AS integer[]))
+    ON CONFLICT DO NOTHING
+""")
+_PRUNE_SQL = text("DELETE FROM corpus_change WHERE version <= :version")
+_PRUNE_EVERY = 1000 # Co tyle wersji czyszczenie dziennika
+
+
+def bump_db_version(session: Session, item_ids: Iterable[int] = ()) -> int:
+    """Podbija wersję korpusu w transakcji zapisu (przed commitem) i zapisuje zmienione elementy; zwraca nową wersję.
+
+    UPDATE wiersza corpus_state blokuje go do commita, więc wersje są commitowane po kolei -
+    wersja odczytana z bazy obejmuje wszystkie wpisy dziennika do niej włącznie.
+    """
+    version = int(session.execute(_BUMP_SQL).scalar_one())
+    item_ids = list(item_ids)
+    if item_ids:
+        session.execute(_LOG_SQL, {"version": version, "item_ids": item_ids})
+    if version % _PRUNE_EVERY == 0:
+        session.execute(_PRUNE_SQL, {"version": version - CORPUS_CHANGE_RETENTION})
+    return version
+
+
+def read_db_version(session: Session) -> int:
+    version = session.execute(text("SELECT version FROM corpus_state WHERE id = 1")).scalar()
+    return int(version) if version is not None else 0
+
+
+def _as_array(value) -> np.ndarray:
+    # vector -> numpy.ndarray, halfvec -> HalfVector; listy z endpointów też przyjmujemy
+    if hasattr(value, "to_numpy"):
+        value = value.to_numpy()
+    return np.asarray(value, dtype=np.float32)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class VectorIndex:
+    """Embeddingi treści i tagów elementów w prealokowanych macierzach (size wierszy zajętych z capacity)."""
+
+    def __init__(self, dim: int = EMBEDDING_DIMENSIONS):
+        self.dim = dim
+        self.version = -1 # Wersja korpusu z bazy, której odpowiada zawartość indeksu
+        self._size = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._content = np.empty((0, dim), dtype=np.float32)
+        self._tags = np.empty((0, dim), dtype=np.float32)
+        self._has_tags = np.empty(0, dtype=bool)
+        self._rows: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    # --- Przechowywanie ---
+    def _reserve(self, needed: int):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, int(capacity * 1.5) + 64) # Geometryczny wzrost - amortyzowane O(1) na dodanie
+        for name in ("_ids", "_content", "_tags", "_has_tags"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _put(self, item_id: int, content, tags):
+        row = self._rows.get(item_id)
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._rows[item_id] = row
+            self._ids[row] = item_id
+        self._content[row] = _unit(_as_array(content))
+        if tags is None:
+            self._tags[row] = 0.0
+            self._has_tags[row] = False
+        else:
+            self._tags[row] = _unit(_as_array(tags))
+            self._has_tags[row] = True
+
+    def _drop(self, item_id: int):
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            # Ostatni wiersz na miejsce usuniętego - macierz zostaje ciągła
+            moved_id = int(self._ids[last])
+            self._ids[row] = moved_id
+            self._content[row] = self._content[last]
+            self._tags[row] = self._tags[last]
+            self._has_tags[row] = self._has_tags[last]
+            self._rows[moved_id] = row
+        self._size = last
+
+    # --- Ładowanie i synchronizacja z bazą ---
+    def _fetch(self, session: Session, item_ids: Optional[List[int]] = None) -> Iterable[tuple]:
+        """(id, embedding, tags_embedding); embedding None dla elementów innego modelu."""
+        active = KnowledgeItem.embedding_model == EMBEDDING_MODEL_NAME
+        statement = select(
+            KnowledgeItem.id,
+            case((active, KnowledgeItem.embedding)),
+            case((active, KnowledgeItem.tags_embedding)),
+        )
+        if item_ids is not None:
+            statement = statement.where(KnowledgeItem.id.in_(item_ids))
+        return session.exec(statement.execution_options(yield_per=VECTOR_INDEX_LOAD_BATCH))
+
+    @staticmethod
+    def _live_filter():
+        return KnowledgeItem.embedding.is_not(None), KnowledgeItem.embedding_model == EMBEDDING_MODEL_NAME
+
+    def load(self, session: Session):
+        """Pełne ładowanie (start workera)."""
+        version = read_db_version(session) # Przed odczytem danych - zmiany w trakcie wymuszą kolejną synchronizację
+        total = session.exec(select(func.count()).select_from(KnowledgeItem).where(*self._live_filter())).one()
+        with self._lock:
+            self._size = 0
+            self._rows.clear()
+            self._reserve(total) # Jedna alokacja na cały korpus
+            for item_id, embedding, tags_embedding in self._fetch(session):
+                if embedding is not None:
+                    self._put(item_id, embedding, tags_embedding)
+            self.version = version
+        logger.info("Vector index loaded: %d items, version %d", self._size, version)
+
+    def sync(self, session: Session):
+        """Sprawdzenie wersji (jedno zapytanie po kluczu) i dociągnięcie zmian innych workerów."""
+        version = read_db_version(session)
+        if version == self.version:
+            return
+        # Pod lockiem także odczyt z bazy - apply() z tego workera nie nadpisze się starszymi danymi
+        with self._lock:
+            if version == self.version:
+                return # Zsynchronizował inny wątek
+            if self.version < 0 or version < self.version or version - self.version > CORPUS_CHANGE_RETENTION:
+                # Indeks niezaładowany, baza wyczyszczona albo wpisy dziennika już usunięte
+                self.load(session)
+                return
+            changed_ids = session.exec(
+                select(CorpusChange.item_id)
+                .where(CorpusChange.version > self.version, CorpusChange.version <= version)
+                .distinct()
+            ).all()
+            present = set()
+            for start in range(0, len(changed_ids), VECTOR_INDEX_LOAD_BATCH):
+                for item_id, embedding, tags_embedding in self._fetch(session, item_ids=changed_ids[start:start + VECTOR_INDEX_LOAD_BATCH]):
+                    if embedding is None:
+                        continue # Bez embeddingu albo innego modelu - usuwany niżej
+                    present.add(item_id)
+                    self._put(item_id, embedding, tags_embedding)
+            for item_id in changed_ids:
+                if item_id not in present:
+                    self._drop(item_id)
+            self.version = version
+
+    def apply(self, version: int, upserts: Iterable[Upsert] = (), removals: Iterable[int] = ()):
+        """Zmiany z zapisu w tym workerze (po commicie). Jeśli między naszą a nową wersją był
+        zapis innego workera, wersji nie przesuwamy - dociągnie go najbliższe sync()."""
+        with self._lock:
+            for item_id, embedding, tags_embedding in upserts:
+                if embedding is None:
+                    self._drop(item_id)
+                else:
+                    self._put(item_id, embedding, tags_embedding)
+            for item_id in removals:
+                self._drop(item_id)
+            if self.version == version - 1:
+                self.version = version
+
+    # --- Zapytania ---
+    def _scores(self, query: np.ndarray, rows, content_weight: float, tags_weight: float) -> tuple:
+        content = self._content[rows] @ query
+        if tags_weight <= 0 or content_weight + tags_weight <= 0:
+            return content, content, None
+        tags = self._tags[rows] @ query
+        blended = np.where(
+            self._has_tags[rows],
+            (content_weight * content + tags_weight * tags) / (content_weight + tags_weight),
+            content,
+        )
+        return blended, content, tags
+
+    def top_k(
+        self,
+        query,
+        k: int,
+        content_weight: float = SEARCH_CONTENT_WEIGHT,
+        tags_weight: float = SEARCH_TAGS_WEIGHT,
+        item_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """k najlepszych (id, podobieństwo) - argpartition O(n) zamiast pełnego sortowania.
+
+        item_ids zawęża ranking do wskazanych elementów (np. filtr tagów policzony w bazie).
+        """
+        query = _unit(_as_array(query))
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return []
+            rows = None # Bez filtra wycinek (widok macierzy), z filtrem - indeksy wierszy (kopia tylko ich)
+            if item_ids is not None:
+                rows = np.fromiter((self._rows[item_id] for item_id in item_ids if item_id in self._rows), dtype=np.int64)
+                if rows.size == 0:
+                    return []
+            blended, _, _ = self._scores(query, slice(0, self._size) if rows is None else rows, content_weight, tags_weight)
+            k = min(k, blended.size)
+            top = np.argpartition(-blended, k - 1)[:k]
+            top = top[np.argsort(-blended[top])]
+            row_of = top if rows is None else rows[top]
+            return [(int(self._ids[row]), float(blended[position])) for row, position in zip(row_of, top)]
+
+    def similarities(self, item_ids: Iterable[int], query) -> Dict[int, Tuple[Optional[float], Optional[float]]]:
+        """(podobieństwo treści, podobieństwo tagów) - ten sam format co similarity.item_similarities."""
+        query = _unit(_as_array(query))
+        with self._lock:
+            rows = [self._rows[item_id] for item_id in item_ids if item_id in self._rows]
+            if not rows:
+                return {}
+            rows = np.asarray(rows)
+            content = self._content[rows] @ query
+            tags = self._tags[rows] @ query
+            return {
+                int(self._ids[row]): (float(content[i]), float(tags[i]) if self._has_tags[row] else None)
+                for i, row in enumerate(rows)
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": self._size,
+                "capacity": len(self._ids),
+                "version": self.version,
+                "memory_mb": round((self._content.nbytes + self._tags.nbytes) / (1024 * 1024), 2),
+            }
+
+
+_vector_index: Optional[VectorIndex] = None
+
+
+def get_vector_index() -> Optional[VectorIndex]:
+    """Indeks workera albo None, gdy ranking odbywa się w pgvector."""
+    global _vector_index
+    if VECTOR_INDEX != "memory":
+        return None
+    if _vector_index is None:
+        _vector_index = VectorIndex()
+    return _vector_index
+
+
+def publish_changes(version: int, upserts: Iterable[Upsert] = (), removals: Iterable[int] = ()):
+    index = get_vector_index()
+    if index is not None:
+        index.apply(version, upserts, removals)
@@ -0,0 +1,123 @@
+# knowledge-assistant/backend/benchmarks/bench_payload.py
+# Rozmiar odpowiedzi wyszukiwania i czas jej serializacji dla trzech schematów wyniku:
+#   full_with_embeddings - pełny element z embeddingami (pierwotna odpowiedź semantic_search)
+#   full_text            - pełny element bez embeddingów (KnowledgeItemRead + matched_pages)
+#   snippets             - SemanticSearchHit: id, tytuł, tagi, wynik i do 3 snippetów
+#
+# Wyniki budujemy z syntetycznego korpusu (notatki i "PDF-y" o --pdf-pages stronach tekstu);
+# serializacja to ta sama ścieżka co w aplikacji: model_dump(mode="json") + json.dumps.
+# Nie wymaga bazy - koszt ts_headline po stronie Postgresa mierzy bench_hybrid/bench_suite.
+#
+# Uruchomienie (z katalogu backend):
+#   python -m benchmarks.bench_payload --hits 10 --pdf-pages 50 --output payload.json
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlmodel import SQLModel
+
+from app.models import EMBEDDING_DIMENSIONS, KnowledgeItemRead, SearchHighlights, SemanticSearchHit
+
+from .bench_suite import latency_summary
+from .corpus import CorpusGenerator
+
+
+class _HitWithText(KnowledgeItemRead):
+    matched_pages: List[int] = []
+
+
+class _HitWithEmbeddings(_HitWithText):
+    embedding: Optional[List[float]] = None
+    tags_embedding: Optional[List[float]] = None
+
+
+def build_items(generator: CorpusGenerator, hits: int, pdf_ratio: float, pdf_pages: int) -> List[dict]:
+    rng = random.Random(generator.seed)
+    items = []
+    for index in range(hits):
+        note = generator.note(index)
+        is_pdf = rng.random() < pdf_ratio
+        text = note["content"]
+        if is_pdf:
+            text = " ".join(generator.text(rng, 400, True, [index % 8]) for _ in range(pdf_pages))
+        items.append({
+            "id": index + 1,
+            "title": note["title"],
+            "text_content": text,
+            "original_filename": f"document-{index}.pdf" if is_pdf else None,
+            "tags": note["tags"],
+            "created_at": datetime(2024, 1, 1),
+            "updated_at": datetime(2024, 1, 1),
+            "matched_pages": sorted(rng.sample(range(1, pdf_pages + 1), 3)) if is_pdf else [],
+        })
+    return items
+
+
+def _snippets(text: str, rng: random.Random, count: int = 3, words: int = 30) -> List[str]:
+    tokens = text.split()
+    snippets = []
+    for _ in range(count):
+        start = rng.randrange(max(len(tokens) - words, 1))
+        fragment = tokens[start:start + words]
+        fragment[len(fragment) // 2] = f"<mark>{fragment[len(fragment) // 2]}</mark>"
+        snippets.append(" ".join(fragment))
+    return snippets
+
+
+def build_hits(items: List[dict], schema: str) -> List[SQLModel]:
+    rng = random.Random(0)
+    hits = []
+    for rank, item in enumerate(items, start=1):
+        if schema == "snippets":
+            hits.append(SemanticSearchHit(
+                id=item["id"], title=item["title"], original_filename=item["original_filename"], tags=item["tags"],
+                created_at=item["created_at"], updated_at=item["updated_at"], content_length=len(item["text_content"]),
+                score=1 / rank, snippets=_snippets(item["text_content"], rng), matched_pages=item["matched_pages"],
+                highlights=SearchHighlights(title=item["title"], tags=item["tags"][:1]),
+            ))
+        elif schema == "full_text":
+            hits.append(_HitWithText(**item))
+        else:
+            vector = [rng.uniform(-0.1, 0.1) for _ in range(EMBEDDING_DIMENSIONS)]
+            hits.append(_HitWithEmbeddings(**item, embedding=vector, tags_embedding=vector))
+    return hits
+
+
+def measure(hits: List[SQLModel], repeats: int) -> dict:
+    timings, payload = [], b""
+    for _ in range(repeats):
+        started = time.perf_counter()
+        payload = json.dumps([hit.model_dump(mode="json") for hit in hits], ensure_ascii=False).encode("utf-8")
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"payload_bytes": len(payload), **latency_summary(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rozmiar i czas serializacji odpowiedzi wyszukiwania")
+    parser.add_argument("--hits", type=int, default=10)
+    parser.add_argument("--pdf-ratio", type=float, default=0.5, help="Udział PDF-ów wśród wyników")
+    parser.add_argument("--pdf-pages", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Plik JSON z wynikami (domyślnie stdout)")
+    args = parser.parse_args()
+
+    items = build_items(CorpusGenerator(seed=args.seed), args.hits, args.pdf_ratio, args.pdf_pages)
+    results = {
+        schema: measure(build_hits(items, schema), args.repeats)
+        for schema in ("full_with_embeddings", "full_text", "snippets")
+    }
+    report = {"config": {key: value for key, value in vars(args).items() if key != "output"}, "results": results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
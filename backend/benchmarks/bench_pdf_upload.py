@@ -0,0 +1,125 @@
+# knowledge-assistant/backend/benchmarks/bench_pdf_upload.py
+# Szczytowe zużycie pamięci (peak RSS) przy przyjmowaniu dużego PDF-a:
+#   legacy    - cały plik w pamięci, PdfReader na tym samym strumieniu, full_text += strona
+#   streaming - save_upload porcjami na dysk, ekstrakcja z pliku przez mmap, "".join(stron)
+# Każdy tryb działa w osobnym procesie, żeby ru_maxrss nie mieszał się między pomiarami.
+#
+# Uruchomienie (z katalogu backend):
+#   python -m benchmarks.bench_pdf_upload --pages 500
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+WORDS = (
+    "wiedza notatka dokument embedding wyszukiwanie baza danych indeks wektor model "
+    "knowledge note document search vector index database query page chunk tag"
+).split()
+
+
+def generate_pdf(path: str, pages: int, words_per_page: int, seed: int = 42):
+    from fpdf import FPDF
+
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    for page in range(pages):
+        pdf.add_page()
+        body = " ".join(rng.choice(WORDS) for _ in range(words_per_page))
+        pdf.multi_cell(0, 5, f"Strona {page + 1}\n{body}")
+    pdf.output(path)
+
+
+def peak_rss_mb() -> float:
+    # Linux raportuje ru_maxrss w KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_legacy(pdf_path: str, upload_dir: str) -> dict:
+    import shutil
+    from io import BytesIO
+    from pypdf import PdfReader
+
+    with open(pdf_path, "rb") as source:
+        upload = BytesIO(source.read()) # Tak wyglądał plik w pamięci po stronie serwera
+    dest = os.path.join(upload_dir, "legacy.pdf")
+    with open(dest, "wb") as f:
+        shutil.copyfileobj(upload, f)
+    upload.seek(0)
+    reader = PdfReader(upload)
+    full_text = ""
+    for page in reader.pages:
+        full_text += page.extract_text() or ""
+    return {"chars": len(full_text)}
+
+
+def run_streaming(pdf_path: str, upload_dir: str) -> dict:
+    from fastapi import UploadFile
+    from app.pdf_text import extract_pdf_pages
+    from app.uploads import save_upload
+
+    dest = os.path.join(upload_dir, "streaming.pdf")
+    with open(pdf_path, "rb") as source:
+        asyncio.run(save_upload(UploadFile(file=source, filename="streaming.pdf"), dest))
+    pages = extract_pdf_pages(dest)
+    full_text = "".join(page_text for _, page_text in pages)
+    return {"chars": len(full_text)}
+
+
+MODES = {"legacy": run_legacy, "streaming": run_streaming}
+
+
+def run_child(mode: str, pdf_path: str) -> dict:
+    baseline = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as upload_dir:
+        started = time.perf_counter()
+        result = MODES[mode](pdf_path, upload_dir)
+        elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "baseline_rss_mb": round(baseline, 1),
+        **result,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS przy przyjmowaniu dużego PDF-a")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--modes", default="legacy,streaming")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.pdf)))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = os.path.join(workdir, "synthetic.pdf")
+        generate_pdf(pdf_path, args.pages, args.words_per_page)
+        report = {
+            "pages": args.pages,
+            "words_per_page": args.words_per_page,
+            "pdf_size_mb": round(os.path.getsize(pdf_path) / (1024 * 1024), 2),
+            "results": [],
+        }
+        for mode in args.modes.split(","):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_pdf_upload", "--child", mode, "--pdf", pdf_path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            report["results"].append(json.loads(output))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# knowledge-assistant/backend/benchmarks/bench_startup.py
+# Czas startu backendu:
+#   import_s          - import app.main w świeżym interpreterze (mediana z --runs)
+#   health_s          - od uruchomienia uvicorn do pierwszej odpowiedzi 200 z /health
+#   ready_s           - ... do 200 z /ready (baza + model załadowane; przed podziałem /health == gotowość)
+#   first_search_s    - ... do pierwszej udanej odpowiedzi semantic_search
+# Pomiary serwera wymagają działającej bazy (DATABASE_URL). Porównanie przed/po: uruchomić
+# skrypt na obu wersjach kodu z tym samym --label i zestawić wyniki JSON.
+#
+# Uruchomienie (z katalogu backend):
+#   python -m benchmarks.bench_startup --runs 5               # tylko import
+#   python -m benchmarks.bench_startup --server --port 8765   # import + serwer
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_import(runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return {"import_s_median": round(statistics.median(timings), 3), "import_s_min": round(min(timings), 3)}
+
+
+def heaviest_imports(top: int) -> list:
+    """Moduły z najdłuższym łącznym czasem importu (python -X importtime)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        try:
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        rows.append((cumulative_us, parts[2].strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_s": round(us / 1e6, 3)} for us, name in rows[:top]]
+
+
+def _wait_for(url: str, deadline: float) -> bool:
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def measure_server(port: int, timeout: float, query: str) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        deadline = started + timeout
+        endpoints = [
+            ("health_s", "/health"),
+            ("ready_s", "/ready"),
+            ("first_search_s", f"/api/knowledge_items/semantic_search?query={urllib.request.quote(query)}"),
+        ]
+        for name, path in endpoints:
+            results[name] = round(time.monotonic() - started, 3) if _wait_for(base + path, deadline) else None
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Czas importu i time-to-first-search backendu")
+    parser.add_argument("--runs", type=int, default=5, help="Powtórzenia pomiaru importu")
+    parser.add_argument("--top", type=int, default=10, help="Ile najcięższych importów pokazać")
+    parser.add_argument("--server", action="store_true", help="Mierz też start serwera (wymaga bazy)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--query", default="notatka")
+    parser.add_argument("--label", default="", help="Etykieta wyniku, np. nazwa gałęzi")
+    args = parser.parse_args()
+
+    report = {"label": args.label, **measure_import(args.runs), "heaviest_imports": heaviest_imports(args.top)}
+    if args.server:
+        report.update(measure_server(args.port, args.timeout, args.query))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
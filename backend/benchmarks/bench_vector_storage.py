@@ -0,0 +1,147 @@
+# knowledge-assistant/backend/benchmarks/bench_vector_storage.py
+# Jakość wyszukiwania (recall@k) a rozmiar embeddingów dla formatów przechowywania:
+#   float32  - pgvector vector(n), 4 B/wymiar
+#   float16  - pgvector halfvec(n), 2 B/wymiar
+#   int8     - kwantyzacja skalarna per wektor (int8 + skala float32), np. bytea + np.frombuffer
+#   binary   - sam znak każdego wymiaru (1 bit/wymiar), ranking odległością Hamminga
+# Korpus jest syntetyczny (skupiska wokół losowych centroidów, jak tematy notatek), wektory
+# znormalizowane, ranking iloczynem skalarnym; punktem odniesienia jest dokładny ranking float32.
+#
+# Uruchomienie (z katalogu backend):
+#   python -m benchmarks.bench_vector_storage --items 20000 --queries 200
+import argparse
+import json
+import time
+
+import numpy as np
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def synthetic_corpus(items: int, queries: int, dim: int, clusters: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=items)
+    corpus = normalize(centroids[labels] + noise * rng.standard_normal((items, dim)).astype(np.float32))
+    # Zapytania: zaszumione elementy korpusu (parafraza istniejącej notatki)
+    sources = rng.integers(0, items, size=queries)
+    query_vectors = normalize(corpus[sources] + noise * rng.standard_normal((queries, dim)).astype(np.float32))
+    return corpus, query_vectors
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+# --- Formaty: encode(corpus) -> dane, score(dane, zapytanie) -> wyniki (większy = bliżej) ---
+def encode_float32(corpus):
+    return corpus
+
+
+def score_float32(data, query):
+    return data @ query
+
+
+def encode_float16(corpus):
+    return corpus.astype(np.float16)
+
+
+def score_float16(data, query):
+    # pgvector liczy iloczyn dla halfvec w float32 - odtwarzamy to samo
+    return data.astype(np.float32) @ query
+
+
+def encode_int8(corpus):
+    scales = np.abs(corpus).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(corpus / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def score_int8(data, query):
+    quantized, scales = data
+    return (quantized.astype(np.float32) @ query) * scales
+
+
+def encode_binary(corpus):
+    return np.packbits(corpus > 0, axis=1)
+
+
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint16)
+
+
+def score_binary(data, query):
+    query_bits = np.packbits(query > 0)
+    hamming = _POPCOUNT[np.bitwise_xor(data, query_bits)].sum(axis=1)
+    return -hamming.astype(np.float32)
+
+
+def nbytes(data) -> int:
+    if isinstance(data, tuple):
+        return sum(part.nbytes for part in data)
+    return data.nbytes
+
+
+FORMATS = [
+    # (nazwa, encode, score, bajty wiersza w pgvector albo None)
+    ("float32", encode_float32, score_float32, lambda dim: 4 * dim + 8),
+    ("float16", encode_float16, score_float16, lambda dim: 2 * dim + 8),
+    ("int8", encode_int8, score_int8, None),
+    ("binary", encode_binary, score_binary, None),
+]
+
+
+def run(args) -> dict:
+    corpus, queries = synthetic_corpus(args.items, args.queries, args.dim, args.clusters, args.noise, args.seed)
+    truth = [set(top_k(corpus @ query, args.k).tolist()) for query in queries]
+
+    results = []
+    for name, encode, score, pg_row_bytes in FORMATS:
+        data = encode(corpus)
+        recalls, timings = [], []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = top_k(score(data, query), args.k)
+            timings.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected.intersection(found.tolist())) / args.k)
+        size = nbytes(data)
+        results.append({
+            "format": name,
+            "bytes_per_vector": size / args.items,
+            "pg_bytes_per_vector": pg_row_bytes(args.dim) if pg_row_bytes else None,
+            "corpus_mb": round(size / (1024 * 1024), 2),
+            f"recall_at_{args.k}": round(float(np.mean(recalls)), 4),
+            f"min_recall_at_{args.k}": round(float(np.min(recalls)), 4),
+            "query_ms_p50": round(float(np.percentile(timings, 50)), 3),
+        })
+    return {
+        "items": args.items,
+        "queries": args.queries,
+        "dim": args.dim,
+        "clusters": args.clusters,
+        "noise": args.noise,
+        "k": args.k,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs rozmiar formatów embeddingów")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200, help="Liczba tematów w korpusie")
+    parser.add_argument("--noise", type=float, default=0.6, help="Rozrzut wokół centroidu (większy = trudniej)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
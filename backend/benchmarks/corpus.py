@@ -0,0 +1,123 @@
+# knowledge-assistant/backend/benchmarks/corpus.py
+# Deterministyczny generator korpusu do benchmarków: notatki po polsku i angielsku (tematy ze
+# wspólnym słownictwem, więc wyszukiwanie ma co znaleźć), zapytania i PDF-y o zadanym rozmiarze.
+# Ten sam seed daje zawsze te same teksty - wyniki kolejnych uruchomień można porównywać.
+import json
+import random
+from typing import Iterator, List
+
+# Tematy: (tag, słowa PL, słowa EN)
+TOPICS = [
+    ("finanse", "budżet faktura koszt przychód podatek księgowość raport kwartał płatność bank".split(),
+     "budget invoice cost revenue tax accounting report quarter payment bank".split()),
+    ("projekt", "projekt harmonogram zadanie termin zespół wdrożenie wymagania sprint plan ryzyko".split(),
+     "project schedule task deadline team rollout requirements sprint plan risk".split()),
+    ("technologia", "serwer baza danych indeks zapytanie wektor model wyszukiwanie kopia zapasowa".split(),
+     "server database index query vector model search backup cache latency".split()),
+    ("klient", "klient umowa spotkanie oferta reklamacja wsparcie zamówienie dostawa cena rabat".split(),
+     "customer contract meeting offer complaint support order delivery price discount".split()),
+    ("zdrowie", "lekarz wizyta badanie dieta sen trening recepta szpital objawy leczenie".split(),
+     "doctor appointment checkup diet sleep workout prescription hospital symptoms treatment".split()),
+    ("podróże", "lot hotel rezerwacja bilet paszport walizka plaża góry pociąg mapa".split(),
+     "flight hotel booking ticket passport suitcase beach mountains train map".split()),
+    ("nauka", "kurs egzamin notatki wykład książka ćwiczenia ocena semestr projekt zaliczenie".split(),
+     "course exam notes lecture book exercises grade semester assignment thesis".split()),
+    ("dom", "remont kuchnia ogród rachunki czynsz meble sprzątanie zakupy lista naprawa".split(),
+     "renovation kitchen garden bills rent furniture cleaning groceries list repair".split()),
+]
+FILLER_PL = "i w na z do że jest się nie jak oraz po dla przez także już tylko bardzo".split()
+FILLER_EN = "the and of to in is for on with as that this by from at also very".split()
+
+# Helvetica w fpdf obsługuje tylko Latin-1 - w PDF-ach polskie znaki zamieniamy na najbliższe ASCII
+_ASCII_FOLD = str.maketrans("ąćęłńśźżĄĆĘŁŃŚŹŻ", "acelnszzACELNSZZ")
+
+
+class CorpusGenerator:
+    def __init__(self, seed: int = 42, polish_ratio: float = 0.5, min_words: int = 80, max_words: int = 400):
+        self.seed = seed
+        self.polish_ratio = polish_ratio
+        self.min_words = min_words
+        self.max_words = max_words
+
+    def _rng(self, *key) -> random.Random:
+        # Osobny generator na element - notatka i nie zależy od tego, ile notatek wygenerowano wcześniej
+        return random.Random(f"{self.seed}:" + ":".join(map(str, key)))
+
+    def _sentence(self, rng: random.Random, topic_words: List[str], filler: List[str]) -> str:
+        words = [rng.choice(topic_words) if rng.random() < 0.6 else rng.choice(filler) for _ in range(rng.randint(6, 16))]
+        return " ".join(words).capitalize() + "."
+
+    def text(self, rng: random.Random, words: int, polish: bool, topics: List[int]) -> str:
+        filler = FILLER_PL if polish else FILLER_EN
+        vocabulary = [word for topic in topics for word in TOPICS[topic][1 if polish else 2]]
+        sentences, count = [], 0
+        while count < words:
+            sentence = self._sentence(rng, vocabulary, filler)
+            sentences.append(sentence)
+            count += sentence.count(" ") + 1
+        return " ".join(sentences)
+
+    def note(self, index: int) -> dict:
+        rng = self._rng("note", index)
+        polish = rng.random() < self.polish_ratio
+        main_topic = rng.randrange(len(TOPICS))
+        topics = [main_topic] + ([rng.randrange(len(TOPICS))] if rng.random() < 0.3 else [])
+        content = self.text(rng, rng.randint(self.min_words, self.max_words), polish, topics)
+        title_words = TOPICS[main_topic][1 if polish else 2]
+        return {
+            "id": f"bench-{self.seed}-{index}",
+            "title": " ".join(rng.sample(title_words, 3)).capitalize(),
+            "content": content,
+            "tags": sorted({TOPICS[topic][0] for topic in topics} | {"pl" if polish else "en"}),
+        }
+
+    def notes(self, start: int, count: int) -> Iterator[dict]:
+        for index in range(start, start + count):
+            yield self.note(index)
+
+    def queries(self, count: int, offset: int = 0) -> List[str]:
+        """Krótkie frazy z losowych tematów - indeks w kluczu, więc kolejne zapytania się nie powtarzają."""
+        queries = []
+        for index in range(offset, offset + count):
+            rng = self._rng("query", index)
+            polish = rng.random() < self.polish_ratio
+            words = TOPICS[rng.randrange(len(TOPICS))][1 if polish else 2]
+            queries.append(" ".join(rng.sample(words, rng.randint(2, 4))))
+        return queries
+
+    def labeled_queries(self, corpus_size: int, count: int, offset: int = 0) -> List[dict]:
+        """Zapytania z oczekiwanym wynikiem (recall): fraza wycięta z treści notatki albo kilka jej
+        słów tematycznych w losowej kolejności. "relevant" to id z note() - w bazie klucz źródła importu."""
+        labeled = []
+        for index in range(offset, offset + count):
+            rng = self._rng("labeled", index)
+            target = self.note(rng.randrange(corpus_size))
+            words = target["content"].rstrip(".").replace(".", "").split()
+            if rng.random() < 0.5:
+                start = rng.randrange(max(len(words) - 6, 1))
+                kind, query = "phrase", " ".join(words[start:start + 6]).lower()
+            else:
+                vocabulary = sorted({word.lower() for word in words} - set(FILLER_PL) - set(FILLER_EN))
+                kind, query = "words", " ".join(rng.sample(vocabulary, min(4, len(vocabulary))))
+            labeled.append({"query": query, "kind": kind, "relevant": target["id"]})
+        return labeled
+
+    def write_ndjson(self, path: str, start: int, count: int):
+        """Format importu masowego (app/ingest.py): {"id", "title", "content", "tags"} w każdej linii."""
+        with open(path, "w", encoding="utf-8") as output:
+            for note in self.notes(start, count):
+                output.write(json.dumps(note, ensure_ascii=False) + "\n")
+
+    def write_pdf(self, path: str, pages: int, words_per_page: int = 400, index: int = 0):
+        from fpdf import FPDF
+
+        rng = self._rng("pdf", index)
+        polish = rng.random() < self.polish_ratio
+        topics = [rng.randrange(len(TOPICS))]
+        pdf = FPDF()
+        pdf.set_font("Helvetica", size=10)
+        for page in range(pages):
+            pdf.add_page()
+            body = self.text(rng, words_per_page, polish, topics).translate(_ASCII_FOLD)
+            pdf.multi_cell(0, 5, f"{'Strona' if polish else 'Page'} {page + 1}\n{body}")
+        pdf.output(path)
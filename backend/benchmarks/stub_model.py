@@ -0,0 +1,50 @@
+# knowledge-assistant/backend/benchmarks/stub_model.py
+# Zastępczy model embeddingów dla benchmarków: bez pobierania wag i bez torch. Embedding tekstu
+# to znormalizowana suma pseudolosowych wektorów jego słów (wektor słowa wyznacza hash słowa),
+# więc wynik jest deterministyczny, a teksty o wspólnym słownictwie są do siebie podobne -
+# ranking ma sens, choć jakość nie przypomina prawdziwego modelu. Mierzymy kod aplikacji, nie model.
+import hashlib
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from app.models import EMBEDDING_DIMENSIONS
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class StubEmbeddingModel:
+    """Interfejs zgodny z SentenceTransformer.encode w zakresie używanym przez app/embeddings.py."""
+
+    def __init__(self, dim: int = EMBEDDING_DIMENSIONS):
+        self.dim = dim
+        self._word_vectors: Dict[str, np.ndarray] = {}
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._word_vectors[word] = vector
+        return vector
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                embeddings[row] += self._word_vector(word)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings /= norms
+        return embeddings
+
+
+def install() -> StubEmbeddingModel:
+    """Podmienia model w app.embeddings - get_embedding_model() zwróci stub zamiast ładować wagi."""
+    from app import embeddings
+
+    stub = StubEmbeddingModel()
+    embeddings.model = stub
+    return stub
@@ -0,0 +1,70 @@
+# knowledge-assistant/backend/gunicorn.conf.py
+# Produkcyjne uruchomienie: gunicorn (zarządca procesów) + workery uvicorn.
+#
+#   gunicorn -c gunicorn.conf.py app.main:app
+#
+# Przy preload_app aplikacja i model embeddingów ładują się raz w procesie głównym, a workery
+# powstają przez fork - wagi modelu (kilkaset MB) są współdzielone copy-on-write zamiast
+# osobnej kopii w każdym workerze. Połączenia z bazą, serwis embeddingów i indeks wektorowy
+# tworzy każdy worker sam po forku (on_startup -> startup.py).
+import gc
+import multiprocessing
+import os
+import shutil
+import sys
+
+# Metryki z wszystkich workerów sumowane przez pliki w tym katalogu (app/metrics.py) - ustawiane
+# przed importem aplikacji, bo prometheus_client wybiera tryb przy imporcie
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 4))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "true").lower() in ("1", "true", "yes")
+# Upload dużego PDF-a i pierwsze żądanie w workerze (rozgrzewka modelu) trwają dłużej niż domyślne 30 s
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Restart workera po tylu żądaniach (z rozrzutem) - ogranicza narastanie pamięci
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+
+# Wątki obliczeń torch na worker - domyślnie rdzenie dzielone po równo, żeby N workerów
+# nie walczyło o te same rdzenie przy równoczesnym kodowaniu
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", str(max(1, multiprocessing.cpu_count() // max(1, workers)))))
+
+
+def on_starting(server):
+    # Pliki metryk z poprzedniego uruchomienia zawyżałyby liczniki
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def when_ready(server):
+    """Proces główny, po załadowaniu aplikacji, przed utworzeniem workerów."""
+    if not preload_app:
+        return
+    from app.embeddings import get_embedding_model
+
+    # Tylko ładowanie - bez inferencji, żeby pule wątków torch/OpenMP nie istniały przed forkiem
+    # (rozgrzewkę robi każdy worker w startup.py)
+    try:
+        get_embedding_model()
+        server.log.info("Embedding model preloaded in master process")
+    except Exception as e:
+        # Worker spróbuje załadować model sam, a /ready pokaże błąd
+        server.log.warning(f"Embedding model preload failed: {e}")
+    # Obiekty z procesu głównego poza GC - zbieranie nie dotyka ich stron pamięci, więc zostają współdzielone
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(TORCH_THREADS_PER_WORKER)
+
+
+def child_exit(server, worker):
+    from app.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
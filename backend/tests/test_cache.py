@@ -0,0 +1,136 @@
+# knowledge-assistant/backend/tests/test_cache.py
+# Cache wyszukiwania (app/cache.py) na lokalnym fakeredis - bez prawdziwego Redisa i bazy.
+import time
+
+import fakeredis
+import pytest
+
+from app import cache
+from app.cache import MemoryCacheBackend, RedisCacheBackend, SearchCache
+
+QUERY_VECTOR = [0.6, 0.8]
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def search_cache(server):
+    return SearchCache(RedisCacheBackend(fakeredis.FakeRedis(server=server)), "test-model")
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return QUERY_VECTOR
+
+
+def test_query_embedding_hit_and_miss_counters(search_cache):
+    encode = CountingEncoder()
+
+    first = search_cache.query_embedding("Umowa  Najmu", encode)
+    second = search_cache.query_embedding("umowa najmu", encode) # Ten sam klucz po normalizacji
+
+    assert encode.calls == 1
+    assert second == pytest.approx(first)
+    stats = search_cache.stats()
+    assert (stats["embedding_misses"], stats["embedding_hits"]) == (1, 1)
+    assert stats["backend"] == "RedisCacheBackend"
+
+
+def test_query_embedding_is_keyed_by_model(search_cache):
+    encode = CountingEncoder()
+
+    search_cache.query_embedding("umowa", encode)
+    search_cache.query_embedding("umowa", encode, model_name="other-model")
+
+    assert encode.calls == 2
+
+
+def test_result_hit_and_miss_counters(search_cache):
+    assert search_cache.get_results("umowa", 10, 0.3) is None
+
+    search_cache.set_results("umowa", 10, 0.3, results=[{"id": 1}])
+
+    assert search_cache.get_results("umowa", 10, 0.3) == [{"id": 1}]
+    assert search_cache.get_results("umowa", 5, 0.3) is None # Inne parametry - inny klucz
+    stats = search_cache.stats()
+    assert (stats["result_misses"], stats["result_hits"]) == (2, 1)
+
+
+def test_results_expire_after_ttl(search_cache, monkeypatch):
+    monkeypatch.setattr(cache, "SEARCH_RESULT_TTL", 1)
+    search_cache.set_results("umowa", 10, results=[{"id": 1}])
+    assert search_cache.get_results("umowa", 10) == [{"id": 1}]
+
+    time.sleep(1.1)
+
+    assert search_cache.get_results("umowa", 10) is None
+
+
+def test_memory_backend_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    backend = MemoryCacheBackend()
+    backend.set("key", b"value", ttl=10)
+
+    now[0] += 9
+    assert backend.get("key") == b"value"
+    now[0] += 2
+    assert backend.get("key") is None
+
+
+def test_bumping_corpus_version_invalidates_results(search_cache):
+    version = search_cache.corpus_version()
+    search_cache.set_results("umowa", 10, results=[{"id": 1}], version=version)
+
+    search_cache.bump_corpus_version()
+
+    assert search_cache.corpus_version() == version + 1
+    assert search_cache.get_results("umowa", 10) is None
+
+
+def test_corpus_version_is_shared_between_workers(server):
+    # Dwa workery gunicorna = dwie instancje cache na tym samym Redisie
+    worker_a = SearchCache(RedisCacheBackend(fakeredis.FakeRedis(server=server)), "test-model")
+    worker_b = SearchCache(RedisCacheBackend(fakeredis.FakeRedis(server=server)), "test-model")
+    worker_b.set_results("umowa", 10, results=[{"id": 1}])
+
+    worker_a.bump_corpus_version()
+
+    assert worker_b.get_results("umowa", 10) is None
+
+
+def test_memory_backend_is_not_shared():
+    assert SearchCache(MemoryCacheBackend(), "test-model").shared is False
+
+
+def test_redis_down_falls_back_to_computing(search_cache, server):
+    encode = CountingEncoder()
+    server.connected = False
+
+    assert search_cache.query_embedding("umowa", encode) == QUERY_VECTOR
+    assert search_cache.corpus_version() == -1
+    search_cache.set_results("umowa", 10, results=[{"id": 1}]) # Wersja nieznana - nic nie zapisuje
+    assert search_cache.get_results("umowa", 10) is None
+    search_cache.bump_corpus_version()
+
+    assert encode.calls == 1
+    assert search_cache.stats()["errors"] >= 3
+
+
+def test_unreachable_redis_uses_memory_backend(monkeypatch):
+    monkeypatch.setattr(cache, "REDIS_URL", "redis://127.0.0.1:1/0")
+
+    assert isinstance(cache._create_backend(), MemoryCacheBackend)
+
+
+def test_without_redis_url_uses_memory_backend(monkeypatch):
+    monkeypatch.setattr(cache, "REDIS_URL", None)
+
+    assert isinstance(cache._create_backend(), MemoryCacheBackend)
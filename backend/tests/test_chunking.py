@@ -0,0 +1,52 @@
+# knowledge-assistant/backend/tests/test_chunking.py
+# Dzielenie tekstu na fragmenty (app/chunking.py).
+import pytest
+
+from app.chunking import CHUNK_WORDS, chunk_pages
+
+
+def words(start, count):
+    return " ".join(f"w{n}" for n in range(start, start + count))
+
+
+def test_windows_overlap_and_cover_page():
+    text = words(0, 10)
+
+    chunks = chunk_pages([(1, text)], chunk_words=4, overlap_words=1)
+
+    assert [chunk.text for chunk in chunks] == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+    assert all(chunk.page == 1 for chunk in chunks)
+    assert [text[chunk.offset:chunk.offset + len(chunk.text)] for chunk in chunks] == [chunk.text for chunk in chunks]
+
+
+def test_last_window_ends_at_page_end():
+    chunks = chunk_pages([(None, words(0, 5))], chunk_words=4, overlap_words=2)
+
+    assert [chunk.text for chunk in chunks] == ["w0 w1 w2 w3", "w2 w3 w4"]
+
+
+def test_chunks_do_not_cross_pages_and_keep_content_offset():
+    pages = [(1, words(0, 3) + "\n"), (2, ""), (3, words(3, 3))]
+    content = "".join(text for _, text in pages)
+
+    chunks = chunk_pages(pages, chunk_words=4, overlap_words=0)
+
+    assert [(chunk.page, chunk.text) for chunk in chunks] == [(1, "w0 w1 w2"), (3, "w3 w4 w5")]
+    for chunk in chunks:
+        assert content[chunk.content_offset:chunk.content_offset + len(chunk.text)] == chunk.text
+
+
+def test_overlap_not_smaller_than_window_still_advances():
+    chunks = chunk_pages([(None, words(0, 3))], chunk_words=2, overlap_words=5)
+
+    assert [chunk.text for chunk in chunks] == ["w0 w1", "w1 w2"]
+
+
+def test_default_window_fits_model_input():
+    # 128 word pieces / ~2.5 na polskie słowo - dłuższe okno model by obcinał
+    assert CHUNK_WORDS <= 50
+
+
+def test_invalid_window_size():
+    with pytest.raises(ValueError):
+        chunk_pages([(None, "tekst")], chunk_words=0)
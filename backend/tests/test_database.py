@@ -0,0 +1,77 @@
+# knowledge-assistant/backend/tests/test_database.py
+# Nawiązywanie połączenia z ponawianiem (app/database.py) na atrapie engine'u.
+from contextlib import contextmanager
+
+import pytest
+
+from app import database
+
+
+class FakeEngine:
+    def __init__(self, failures):
+        self.failures = failures
+        self.connects = 0
+        self.disposed = False
+
+    @contextmanager
+    def connect(self):
+        self.connects += 1
+        if self.connects <= self.failures:
+            raise ConnectionError("database is starting up")
+        yield self
+
+    def execute(self, statement):
+        return None
+
+    def dispose(self):
+        self.disposed = True
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    created = []
+
+    def create(statement_timeout_ms):
+        engine = FakeEngine(create.failures)
+        created.append(engine)
+        return engine
+
+    create.failures = 0
+    monkeypatch.setattr(database, "_create_engine", create)
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(database, "retry_delay", 0)
+    monkeypatch.setattr(database, "max_retries", 3)
+    return create, created
+
+
+def test_retries_ping_on_one_engine(engines):
+    create, created = engines
+    create.failures = 2
+
+    database._init_db_connection()
+
+    assert len(created) == 1
+    assert created[0].connects == 3
+    assert database.engine is created[0]
+    assert not created[0].disposed
+
+
+def test_failed_engine_is_disposed(engines):
+    create, created = engines
+    create.failures = 5
+
+    with pytest.raises(ConnectionError):
+        database._init_db_connection()
+
+    assert created[0].disposed
+    assert database.engine is None
+
+
+def test_reconnect_disposes_previous_engine(engines):
+    _, created = engines
+
+    database._init_db_connection()
+    database._init_db_connection()
+
+    assert created[0].disposed
+    assert database.engine is created[1]
@@ -0,0 +1,103 @@
+# knowledge-assistant/backend/tests/test_embedding_service.py
+# Serwis embeddingów (app/embedding_service.py) z prostą funkcją kodującą zamiast modelu.
+import threading
+
+import pytest
+
+from app.embedding_service import EmbeddingQueueFullError, EmbeddingService
+
+
+class RecordingEncoder:
+    """Zapisuje batche; gate (jeśli ustawiony) wstrzymuje pierwsze wywołanie do set()."""
+
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+        self.started = threading.Event()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+            self.gate = None
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def make_service():
+    services = []
+
+    def factory(encoder, **kwargs):
+        service = EmbeddingService(encoder, **kwargs)
+        services.append(service)
+        return service
+
+    yield factory
+    for service in services:
+        service.stop()
+
+
+def test_large_request_is_split_into_batches(make_service):
+    encoder = RecordingEncoder()
+    service = make_service(encoder, max_batch_size=4, max_wait_ms=1)
+    texts = ["x" * n for n in range(1, 11)]
+
+    vectors = service.embed_sync(texts)
+
+    assert vectors == [[float(n)] for n in range(1, 11)]
+    assert [len(batch) for batch in encoder.batches] == [4, 4, 2]
+
+
+def test_small_request_is_not_stuck_behind_large_one(make_service):
+    gate = threading.Event()
+    encoder = RecordingEncoder(gate)
+    service = make_service(encoder, max_batch_size=4, max_wait_ms=1)
+
+    large = service.submit([f"doc-{n}" for n in range(12)], block=True)
+    assert encoder.started.wait(5)
+    small = service.submit(["query"])
+    gate.set()
+
+    assert small.result(5) == [[5.0]]
+    assert len(large.result(5)) == 12
+    # Zapytanie weszło do drugiego batcha, przed resztą dokumentu
+    assert encoder.batches[0] == [f"doc-{n}" for n in range(4)]
+    assert encoder.batches[1][0] == "query"
+    assert all(len(batch) <= 4 for batch in encoder.batches)
+
+
+def test_queue_limit_counts_texts(make_service):
+    gate = threading.Event()
+    encoder = RecordingEncoder(gate)
+    service = make_service(encoder, max_batch_size=2, max_wait_ms=1, max_queue_size=5)
+
+    running = service.submit(["a"])
+    assert encoder.started.wait(5)  # Pierwsze żądanie jest już w modelu, kolejka pusta
+    queued = service.submit(["b"] * 4)
+    with pytest.raises(EmbeddingQueueFullError):
+        service.submit(["c"] * 2)
+    last = service.submit(["d"])
+    assert service.queue_depth == 5
+    gate.set()
+
+    assert running.result(5) == [[1.0]]
+    assert len(queued.result(5)) == 4
+    assert last.result(5) == [[1.0]]
+
+
+def test_oversized_request_enters_empty_queue(make_service):
+    service = make_service(RecordingEncoder(), max_batch_size=8, max_wait_ms=1, max_queue_size=4)
+
+    assert len(service.embed_sync(["t"] * 10)) == 10
+
+
+def test_encode_error_fails_whole_request(make_service):
+    def failing(texts):
+        raise RuntimeError("model failed")
+
+    service = make_service(failing, max_batch_size=2, max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        service.embed_sync(["a", "b", "c"])
+    assert service.queue_depth == 0
@@ -0,0 +1,115 @@
+# knowledge-assistant/backend/tests/test_export.py
+# Eksport (app/export.py): strumieniowy ZIP/NDJSON bez bazy i cache PDF-ów notatek w katalogu tymczasowym.
+import io
+import json
+import random
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import export
+
+UPDATED = datetime(2026, 10, 1, 12, 0, 0)
+# 1 MB nieściskalnych danych - skompresowany wpis ZIP-a też ma kilkanaście kawałków
+PDF_BYTES = b"%PDF-1.4\n" + random.Random(0).randbytes(1024 * 1024)
+
+
+@pytest.fixture
+def items(monkeypatch):
+    rows = [
+        {"id": 1, "title": "Notatka", "text_content": "Zażółć gęślą jaźń", "original_filename": None,
+         "content_hash": None, "tags": ["pl"], "created_at": UPDATED, "updated_at": UPDATED},
+        {"id": 2, "title": "Raport", "text_content": "tekst z PDF", "original_filename": "raport.pdf",
+         "content_hash": "abc", "tags": None, "created_at": UPDATED, "updated_at": UPDATED},
+        {"id": 3, "title": "Zgubiony", "text_content": "", "original_filename": "brak.pdf",
+         "content_hash": None, "tags": [], "created_at": UPDATED, "updated_at": UPDATED},
+    ]
+
+    def iter_items(with_content=True):
+        for row in rows:
+            yield row if with_content else {key: value for key, value in row.items() if key != "text_content"}
+
+    def open_pdf(original_filename, content_hash):
+        return (io.BytesIO(PDF_BYTES), len(PDF_BYTES)) if content_hash == "abc" else None
+
+    monkeypatch.setattr(export, "_iter_items", iter_items)
+    monkeypatch.setattr(export, "open_item_pdf", open_pdf)
+    monkeypatch.setattr(export, "UPLOAD_CHUNK_SIZE", 64 * 1024)
+    return rows
+
+
+def test_zip_export_streams_valid_archive(items):
+    chunks = [chunk for chunk in export.iter_zip_export() if chunk]
+
+    # PDF kopiowany kawałkami - odpowiedź nie czeka na cały plik
+    assert len(chunks) > len(PDF_BYTES) // (64 * 1024) // 2
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.read("notes/1.md").decode("utf-8") == "# Notatka\n\nZażółć gęślą jaźń\n"
+        assert archive.read("pdfs/2_raport.pdf") == PDF_BYTES
+        manifest = [json.loads(line) for line in archive.read("items.ndjson").splitlines()]
+    assert [record["id"] for record in manifest] == [1, 2, 3]
+    assert manifest[2]["pdf_missing"] is True
+    assert "text_content" not in manifest[0] and manifest[1]["tags"] == []
+
+
+def test_zip_export_without_pdfs(items):
+    with zipfile.ZipFile(io.BytesIO(b"".join(export.iter_zip_export(include_pdfs=False)))) as archive:
+        assert archive.namelist() == ["notes/1.md", "items.ndjson"]
+
+
+def test_ndjson_export_one_line_per_item(items):
+    lines = list(export.iter_ndjson_export())
+
+    records = [json.loads(line) for line in lines]
+    assert len(lines) == 3 and all(line.endswith(b"\n") for line in lines)
+    assert records[0]["text_content"] == "Zażółć gęślą jaźń"
+    assert records[0]["updated_at"] == UPDATED.isoformat()
+    assert "content_hash" not in records[1]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "PDF_EXPORT_CACHE_DIR", str(tmp_path))
+
+    def render(title, text_content, path):
+        with open(path, "wb") as f:
+            f.write(f"{title}\n{text_content}".encode("utf-8"))
+
+    monkeypatch.setattr(export, "_render_note_pdf", render)
+    return tmp_path
+
+
+def test_note_pdf_rendered_once_per_version(cache_dir):
+    loads = []
+
+    def load_item():
+        loads.append(1)
+        return "Tytuł", "treść"
+
+    first = export.cached_note_pdf(7, UPDATED, load_item)
+    second = export.cached_note_pdf(7, UPDATED, load_item)
+
+    assert first == second and len(loads) == 1
+    assert sorted(path.name for path in cache_dir.iterdir()) == [first.rsplit("/", 1)[-1]]
+
+
+def test_stale_render_does_not_remove_newer_version(cache_dir):
+    newer = export.cached_note_pdf(7, UPDATED + timedelta(seconds=5), lambda: ("Nowa", "wersja"))
+    # Żądanie z nieaktualnym updated_at renderuje swoją wersję, ale nowszej nie rusza
+    older = export.cached_note_pdf(7, UPDATED, lambda: ("Stara", "wersja"))
+    assert {path.name for path in cache_dir.iterdir()} == {newer.rsplit("/", 1)[-1], older.rsplit("/", 1)[-1]}
+
+    newest = export.cached_note_pdf(7, UPDATED + timedelta(seconds=9), lambda: ("Najnowsza", "wersja"))
+
+    assert {path.name for path in cache_dir.iterdir()} == {newest.rsplit("/", 1)[-1]}
+
+
+def test_drop_cached_note_pdfs(cache_dir):
+    export.cached_note_pdf(7, UPDATED, lambda: ("A", "b"))
+    kept = export.cached_note_pdf(8, UPDATED, lambda: ("C", "d"))
+
+    export.drop_cached_note_pdfs(7)
+
+    assert [path.name for path in cache_dir.iterdir()] == [kept.rsplit("/", 1)[-1]]
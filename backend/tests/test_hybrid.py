@@ -0,0 +1,127 @@
+# knowledge-assistant/backend/tests/test_hybrid.py
+# Fuzja rankingów i wczesne zakończenie (app/hybrid.py).
+import random
+
+import pytest
+
+from app.hybrid import RRF_K, LegResult, fuse, hybrid_rank, is_settled
+
+WEIGHTS = {"lexical": 1.0, "semantic": 1.0}
+
+
+def test_rrf_sums_contributions_of_both_lists():
+    legs = {
+        "lexical": LegResult([(1, 10.0), (2, 5.0)], exhausted=True),
+        "semantic": LegResult([(2, 0.9), (3, 0.8)], exhausted=True),
+    }
+
+    ranked, upper = fuse(legs, WEIGHTS, "rrf")
+
+    assert [hit.id for hit in ranked] == [2, 1, 3]
+    assert ranked[0].score == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert (ranked[0].lexical_rank, ranked[0].semantic_rank) == (2, 1)
+    assert ranked[2].lexical_rank is None and ranked[2].lexical_score is None
+    # Obie listy wyczerpane - nic spoza nich nie może dostać punktów
+    assert upper[-1] == 0.0
+    assert upper[3] == pytest.approx(ranked[2].score)
+
+
+def test_weighted_normalizes_lexical_by_best_and_clips_cosine():
+    legs = {
+        "lexical": LegResult([(1, 8.0), (2, 2.0)], exhausted=True),
+        "semantic": LegResult([(2, 1.2), (1, -0.3)], exhausted=True),
+    }
+
+    ranked, _ = fuse(legs, {"lexical": 2.0, "semantic": 1.0}, "weighted")
+
+    scores = {hit.id: hit.score for hit in ranked}
+    assert scores[1] == pytest.approx(2.0 * 1.0 + 0.0)
+    assert scores[2] == pytest.approx(2.0 * 0.25 + 1.0)
+
+
+def test_ties_are_ordered_by_id_and_do_not_settle():
+    legs = {
+        "lexical": LegResult([(7, 3.0), (4, 3.0)], exhausted=False),
+        "semantic": LegResult([(4, 0.5), (7, 0.5)], exhausted=False),
+    }
+
+    ranked, upper = fuse(legs, WEIGHTS, "rrf")
+
+    assert [hit.id for hit in ranked] == [4, 7] # Ten sam wynik - niższe id pierwsze
+    assert ranked[0].score == ranked[1].score
+    # k-ty wynik równy granicy elementu spoza top_k - remis mógłby zmienić zbiór
+    assert not is_settled(ranked, {**upper, -1: 0.0}, 1)
+
+
+def test_one_sided_lists():
+    legs = {
+        "lexical": LegResult([(1, 4.0), (2, 3.0), (3, 1.0)], exhausted=False),
+        "semantic": LegResult([], exhausted=True),
+    }
+
+    ranked, upper = fuse(legs, WEIGHTS, "rrf")
+
+    assert [hit.id for hit in ranked] == [1, 2, 3]
+    assert all(hit.semantic_rank is None for hit in ranked)
+    # Wyczerpana, pusta gałąź nie podnosi granic; niepobrane elementy dostaną najwyżej pozycję 4
+    assert upper[-1] == pytest.approx(1 / (RRF_K + 4))
+    assert is_settled(ranked, upper, 2)
+
+
+def test_too_few_candidates_settle_only_when_exhausted():
+    hits = [(1, 0.9)]
+    open_legs = {"lexical": LegResult([], exhausted=True), "semantic": LegResult(hits, exhausted=False)}
+    closed_legs = {"lexical": LegResult([], exhausted=True), "semantic": LegResult(hits, exhausted=True)}
+
+    assert not is_settled(*fuse(open_legs, WEIGHTS, "rrf"), 2)
+    assert is_settled(*fuse(closed_legs, WEIGHTS, "rrf"), 2)
+
+
+def ranked_lists(seed, agreement=0.3, size=300):
+    rng = random.Random(seed)
+    lexical = sorted(((item_id, rng.uniform(0, 20)) for item_id in rng.sample(range(1, size + 1), size // 2)),
+                     key=lambda hit: -hit[1])
+    # Lista wektorowa zgodna z leksykalną na początku (ułamek agreement), dalej przemieszana
+    order = [item_id for item_id, _ in lexical]
+    agreed = int(len(order) * agreement)
+    tail = order[agreed:]
+    rng.shuffle(tail)
+    order = order[:agreed] + tail
+    semantic = [(item_id, 1.0 - n / size) for n, item_id in enumerate(order)]
+    return {"lexical": lexical, "semantic": semantic}
+
+
+def fetcher(hits, calls):
+    def fetch(depth):
+        calls.append(depth)
+        return LegResult(hits[:depth], exhausted=depth >= len(hits))
+    return fetch
+
+
+@pytest.mark.parametrize("fusion", ["rrf", "weighted"])
+@pytest.mark.parametrize("agreement", [0.3, 0.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_early_stop_returns_same_top_k_as_full_depth(fusion, agreement, seed):
+    lists = ranked_lists(seed, agreement)
+    calls = {name: [] for name in lists}
+    fetch_legs = {name: fetcher(hits, calls[name]) for name, hits in lists.items()}
+
+    top, stats = hybrid_rank(fetch_legs, 5, fusion=fusion, weights=WEIGHTS, max_depth=200)
+
+    full = {name: LegResult(hits, exhausted=True) for name, hits in lists.items()}
+    expected, _ = fuse(full, WEIGHTS, fusion)
+    assert [hit.id for hit in top] == [hit.id for hit in expected[:5]]
+    if stats.settled_early:
+        assert stats.depth < 200
+        assert max(calls["lexical"]) == stats.depth
+
+
+def test_zero_weight_leg_is_not_fetched():
+    calls = {"lexical": [], "semantic": []}
+    lists = ranked_lists(0)
+    fetch_legs = {name: fetcher(hits, calls[name]) for name, hits in lists.items()}
+
+    top, _ = hybrid_rank(fetch_legs, 3, fusion="rrf", weights={"lexical": 1.0, "semantic": 0.0}, max_depth=50)
+
+    assert calls["semantic"] == []
+    assert [hit.id for hit in top] == [item_id for item_id, _ in lists["lexical"][:3]]
@@ -0,0 +1,67 @@
+# knowledge-assistant/backend/tests/test_ingestion_jobs.py
+# Zadania ingestii przerwane razem z procesem (app/ingestion.py) - zapytania sprawdzane na sesji zapisującej SQL.
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app import ingestion
+
+
+class RecordingSession:
+    def __init__(self, interrupted=0):
+        self.statements = []
+        self.interrupted = interrupted
+        self.committed = False
+
+    def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.statements.append((str(compiled), compiled.params))
+        self.rowcount = self.interrupted
+        return self
+
+    def commit(self):
+        self.committed = True
+
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def test_stale_unfinished_jobs_are_marked_failed():
+    session = RecordingSession(interrupted=2)
+
+    assert ingestion.check_jobs(session, now=NOW) == 2
+
+    assert session.committed
+    [(sql, params)] = session.statements # Brak zadań w tym procesie - bez heartbeatu
+    assert sql.startswith("UPDATE ingestion_job SET status=")
+    assert "ingestion_job.status NOT IN" in sql and "ingestion_job.updated_at <" in sql
+    assert params["status"] == "failed"
+    assert params["error"] == ingestion.INTERRUPTED_JOB_ERROR
+    assert params["updated_at_1"] == NOW - timedelta(seconds=ingestion.INGEST_JOB_STALE_S)
+    assert set(params["status_1"]) == set(ingestion.FINISHED_JOB_STATUSES)
+
+
+def test_jobs_of_this_process_get_heartbeat_before_sweep():
+    async def scenario():
+        release = asyncio.Event()
+        task = asyncio.create_task(release.wait())
+        ingestion.track_job("job-1", task)
+
+        session = RecordingSession()
+        ingestion.check_jobs(session, now=NOW)
+        release.set()
+        await task
+        await asyncio.sleep(0) # Callback zakończenia zadania
+        return session
+
+    session = asyncio.run(scenario())
+
+    heartbeat_sql, heartbeat_params = session.statements[0]
+    assert heartbeat_sql.startswith("UPDATE ingestion_job SET updated_at=")
+    assert heartbeat_params["id_1"] == ["job-1"]
+    assert heartbeat_params["updated_at"] == NOW
+    # Heartbeat w tej samej transakcji przed oznaczaniem przerwanych
+    assert "SET status=" in session.statements[1][0]
+    assert "job-1" not in ingestion._active_jobs
+    assert not ingestion._running_tasks
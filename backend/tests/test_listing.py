@@ -0,0 +1,80 @@
+# knowledge-assistant/backend/tests/test_listing.py
+# Lista elementów z kursorem keyset (GET /api/knowledge_items).
+# Test stronicowania potrzebuje Postgresa z pgvector: TEST_DATABASE_URL=postgresql://... (np. baza z docker-compose).
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, create_engine, delete
+
+from app import database, main
+from app.models import KnowledgeItem
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def list_page(session, **params):
+    query = {"limit": 50, "after_id": None, "tags": None, "tags_mode": "any", "sort": "created_at", "order": "desc"}
+    query.update(params)
+    return main.get_all_knowledge_items(session=session, **query)
+
+
+class EmptySession:
+    def exec(self, statement):
+        return self
+
+    def first(self):
+        return None
+
+
+def test_missing_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        list_page(EmptySession(), after_id=123)
+
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    monkeypatch.setattr(database, "engine", engine)
+    database.create_db_and_tables()
+    with Session(engine) as session:
+        yield session
+        session.rollback()
+        session.exec(delete(KnowledgeItem).where(KnowledgeItem.title.startswith("listing-test-")))
+        session.commit()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+def test_pages_follow_stable_order(db_session, order):
+    base = datetime(2026, 1, 1)
+    # Część elementów ma ten sam created_at - o kolejności decyduje wtedy id
+    created = [base, base, base, base + timedelta(seconds=1), base + timedelta(seconds=1), base + timedelta(seconds=2), base]
+    items = [KnowledgeItem(title=f"listing-test-{n}", text_content="x", tags=[], created_at=at) for n, at in enumerate(created)]
+    db_session.add_all(items)
+    db_session.commit()
+    ids = {item.id for item in items}
+    expected = [item.id for item in sorted(items, key=lambda item: (item.created_at, item.id), reverse=order == "desc")]
+
+    seen = []
+    after_id = None
+    while True:
+        page = [row.id for row in list_page(db_session, limit=3, after_id=after_id, order=order)]
+        if not page:
+            break
+        seen.extend(item_id for item_id in page if item_id in ids) # Baza może mieć też inne elementy
+        after_id = page[-1]
+
+    assert seen == expected
+
+    deleted_id = expected[1]
+    db_session.exec(delete(KnowledgeItem).where(KnowledgeItem.id == deleted_id))
+    db_session.commit()
+    with pytest.raises(HTTPException) as error:
+        list_page(db_session, after_id=deleted_id, order=order)
+    assert error.value.status_code == 400
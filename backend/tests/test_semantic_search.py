@@ -0,0 +1,58 @@
+# knowledge-assistant/backend/tests/test_semantic_search.py
+# Zapytania ANN w _semantic_candidates (app/main.py) na sesji, która tylko zapisuje wykonane polecenia.
+from app import main
+
+
+class RecordingSession:
+    def __init__(self):
+        self.settings = []
+        self.limits = []
+
+    def execute(self, statement, params=None):
+        self.settings.append((str(statement), dict(params or {})))
+
+    def exec(self, statement):
+        # Każde zapytanie ANN musi się wykonać po ustawieniu ef_search w tej samej transakcji
+        assert self.settings, "query executed before hnsw.ef_search was set"
+        self.limits.append(statement._limit)
+        return self
+
+    def all(self):
+        return []
+
+
+def ef_search(session):
+    sql, params = session.settings[-1]
+    assert "set_config('hnsw.ef_search'" in sql and sql.rstrip().endswith("true)")
+    return int(params["value"])
+
+
+def test_ef_search_covers_limits_above_default():
+    session = RecordingSession()
+
+    main._semantic_candidates(session, [0.0] * 384, 60, 0.0, set(), content_weight=0.8, tags_weight=0.2)
+
+    wanted_chunks = 60 * main.CHUNK_CANDIDATES_PER_ITEM
+    assert ef_search(session) == wanted_chunks
+    assert wanted_chunks > main.HNSW_EF_SEARCH_DEFAULT
+    # Zapytanie o fragmenty, o elementy i o tagi - każde z LIMIT nie większym niż ef_search
+    assert max(session.limits) == wanted_chunks
+    assert len(session.limits) == 3
+
+
+def test_ef_search_counts_excluded_ids():
+    session = RecordingSession()
+
+    main._semantic_candidates(session, [0.0] * 384, 10, 0.0, {1, 2, 3, 4, 5}, tags_weight=0.0)
+
+    assert ef_search(session) == 15 * main.CHUNK_CANDIDATES_PER_ITEM
+    assert max(session.limits) <= ef_search(session)
+
+
+def test_ef_search_bounds():
+    session = RecordingSession()
+
+    main._set_ef_search(session, 3)
+    assert ef_search(session) == main.HNSW_EF_SEARCH_DEFAULT
+    main._set_ef_search(session, 10 ** 6)
+    assert ef_search(session) == main.HNSW_EF_SEARCH_MAX
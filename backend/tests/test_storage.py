@@ -0,0 +1,150 @@
+# knowledge-assistant/backend/tests/test_storage.py
+# Magazyn PDF-ów (app/storage.py): lokalny w katalogu tymczasowym, S3 na atrapie moto; gc bez prawdziwej bazy.
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from moto import mock_aws
+
+from app import database, storage
+from app.storage import LocalBlobStore, S3BlobStore
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0123456789" * 1000
+KEY = "ab" * 32
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    for name, value in (("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"),
+                        ("AWS_SESSION_TOKEN", "testing"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        yield
+
+
+@pytest.fixture
+def s3_store(aws):
+    return S3BlobStore(bucket="test-pdfs", prefix="pdfs/", endpoint_url=None, region="us-east-1")
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return LocalBlobStore(str(tmp_path / "blobs"))
+    return request.getfixturevalue("s3_store")
+
+
+def write_tmp(tmp_path, name, data=PDF_BYTES):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_put_file_takes_over_upload(store, tmp_path):
+    upload = write_tmp(tmp_path, "upload.part")
+
+    store.put_file(KEY, upload)
+
+    assert not (tmp_path / "upload.part").exists()
+    assert store.exists(KEY) and not store.exists("cd" * 32)
+    assert store.size(KEY) == len(PDF_BYTES)
+    with store.open(KEY) as source:
+        assert source.read() == PDF_BYTES
+    assert [key for key, _ in store.iter_blobs()] == [KEY]
+
+
+def test_put_existing_blob_keeps_bytes_and_refreshes_time(store, tmp_path):
+    store.put_file(KEY, write_tmp(tmp_path, "first.part"))
+    first = store.modified_at(KEY)
+    time.sleep(1.1) # S3 podaje LastModified z dokładnością do sekundy
+
+    store.put_copy(KEY, write_tmp(tmp_path, "second.pdf"))
+
+    assert store.modified_at(KEY) > first
+    assert (tmp_path / "second.pdf").exists() # put_copy zostawia źródło
+    with store.open(KEY) as source:
+        assert source.read() == PDF_BYTES
+    store.delete(KEY)
+    assert store.modified_at(KEY) is None
+
+
+def test_s3_presigned_url_serves_ranges_from_bucket(s3_store, tmp_path):
+    s3_store.put_file(KEY, write_tmp(tmp_path, "upload.part"))
+
+    url = urlparse(s3_store.presigned_url(KEY, "raport.pdf"))
+    query = parse_qs(url.query)
+
+    assert url.path.endswith(f"/pdfs/ab/ab/{KEY}.pdf")
+    assert query["response-content-type"] == ["application/pdf"]
+    assert query["response-content-disposition"] == ['inline; filename="raport.pdf"']
+    # Range po stronie S3 - ten sam obiekt, który wskazuje podpisany URL
+    part = s3_store._client.get_object(Bucket="test-pdfs", Key=f"pdfs/ab/ab/{KEY}.pdf", Range="bytes=5-14")
+    assert part["Body"].read() == PDF_BYTES[5:15]
+    assert part["ContentRange"] == f"bytes 5-14/{len(PDF_BYTES)}"
+
+
+class ReferenceSession:
+    """Zapytanie o content_hash elementów; on_query symuluje upload równoległy do przebiegu gc."""
+
+    def __init__(self, referenced, on_query=None):
+        self.referenced = referenced
+        self.on_query = on_query
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def exec(self, statement):
+        # Wynik to stan sprzed commita uploadu, który kończy się już po zapytaniu
+        self.visible = set(self.referenced)
+        if self.on_query:
+            self.on_query()
+        return self
+
+    def all(self):
+        return sorted(self.visible)
+
+
+@pytest.fixture
+def sweep(monkeypatch):
+    def run(store, session, **kwargs):
+        monkeypatch.setattr(database, "_init_db_connection", lambda **kw: None)
+        monkeypatch.setattr(database, "open_session", lambda: session)
+        monkeypatch.setattr(storage, "_blob_store", store)
+        return storage.collect_garbage(**kwargs)
+    return run
+
+
+def test_gc_keeps_referenced_recent_and_raced_blobs(store, tmp_path, sweep):
+    keys = dict(zip(("orphan", "referenced", "raced", "young"), ("a" * 64, "b" * 64, "c" * 64, "d" * 64)))
+    for name in ("orphan", "referenced", "raced"):
+        store.put_file(keys[name], write_tmp(tmp_path, f"{name}.part"))
+    time.sleep(2.5)
+    store.put_file(keys["young"], write_tmp(tmp_path, "young.part"))
+
+    rows = {keys["referenced"]}
+
+    def upload_during_sweep():
+        # Upload tych samych bajtów: blob zapisany (odświeżony) przed elementem, element po odczycie referencji
+        store.put_copy(keys["raced"], write_tmp(tmp_path, "again.pdf"))
+        rows.add(keys["raced"])
+
+    stats = sweep(store, ReferenceSession(rows, upload_during_sweep), min_age_s=2)
+
+    assert stats == {"checked": 3, "deleted": 1, "referenced": 1}
+    assert not store.exists(keys["orphan"])
+    for name in ("referenced", "raced", "young"):
+        assert store.exists(keys[name])
+    assert keys["raced"] in rows
+
+
+def test_gc_dry_run_deletes_nothing(store, tmp_path, sweep):
+    store.put_file(KEY, write_tmp(tmp_path, "orphan.part"))
+    time.sleep(0.01)
+
+    stats = sweep(store, ReferenceSession(set()), min_age_s=0, dry_run=True)
+
+    assert stats == {"checked": 1, "deleted": 1, "referenced": 0}
+    assert store.exists(KEY)
@@ -0,0 +1,181 @@
+# knowledge-assistant/backend/tests/test_vector_index.py
+# Indeks wektorowy w pamięci (app/vector_index.py): ranking przez argpartition i synchronizacja z dziennikiem zmian.
+import numpy as np
+import pytest
+
+from app.models import EMBEDDING_MODEL_NAME
+from app.vector_index import VectorIndex
+
+DIM = 8
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def brute_force(vectors, query, k, content_weight, tags_weight):
+    query = unit(query)
+    scores = {}
+    for item_id, (content, tags) in vectors.items():
+        score = float(unit(content) @ query)
+        if tags is not None and tags_weight > 0:
+            score = (content_weight * score + tags_weight * float(unit(tags) @ query)) / (content_weight + tags_weight)
+        scores[item_id] = score
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(7)
+    return {
+        item_id: (rng.normal(size=DIM), rng.normal(size=DIM) if item_id % 3 else None)
+        for item_id in range(1, 201)
+    }
+
+
+def build(corpus):
+    index = VectorIndex(dim=DIM)
+    index.apply(0, [(item_id, content, tags) for item_id, (content, tags) in corpus.items()])
+    return index
+
+
+@pytest.mark.parametrize("weights", [(0.8, 0.2), (1.0, 0.0)])
+def test_top_k_matches_full_sort(corpus, weights):
+    index = build(corpus)
+    query = np.random.default_rng(1).normal(size=DIM)
+
+    result = index.top_k(query, 10, *weights)
+
+    expected = brute_force(corpus, query, 10, *weights)
+    assert [item_id for item_id, _ in result] == [item_id for item_id, _ in expected]
+    assert [score for _, score in result] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+
+def test_top_k_with_filter_and_k_above_size(corpus):
+    index = build(corpus)
+    query = np.random.default_rng(2).normal(size=DIM)
+    allowed = [5, 17, 42, 999] # 999 - nie ma go w indeksie
+
+    result = index.top_k(query, 50, 0.8, 0.2, item_ids=allowed)
+
+    expected = brute_force({item_id: corpus[item_id] for item_id in (5, 17, 42)}, query, 50, 0.8, 0.2)
+    assert [item_id for item_id, _ in result] == [item_id for item_id, _ in expected]
+    assert index.top_k(query, 5, item_ids=[999]) == []
+
+
+def test_drop_keeps_rows_consistent(corpus):
+    index = build(corpus)
+    for item_id in range(1, 201, 2):
+        index.apply(0, removals=[item_id])
+    remaining = {item_id: vectors for item_id, vectors in corpus.items() if item_id % 2 == 0}
+    query = np.random.default_rng(3).normal(size=DIM)
+
+    assert len(index) == len(remaining)
+    result = index.top_k(query, len(remaining), 0.8, 0.2)
+    assert [item_id for item_id, _ in result] == [item_id for item_id, _ in brute_force(remaining, query, 200, 0.8, 0.2)]
+    content, tags = index.similarities([4], query)[4]
+    assert content == pytest.approx(float(unit(corpus[4][0]) @ unit(query)), abs=1e-5)
+
+
+def test_apply_advances_only_consecutive_versions():
+    index = VectorIndex(dim=DIM)
+    index.version = 3
+
+    index.apply(4, [(1, np.ones(DIM), None)])
+    assert index.version == 4
+    index.apply(6, [(2, np.ones(DIM), None)]) # Wersję 5 zapisał inny worker - dociągnie ją sync()
+    assert index.version == 4
+
+
+class FakeDatabase:
+    """Sesja odpowiadająca na zapytania indeksu: wersja korpusu, dziennik corpus_change i embeddingi."""
+
+    def __init__(self):
+        self.version = 0
+        self.items = {} # id -> (embedding, tags_embedding, model)
+        self.changes = [] # (wersja, id)
+        self.fetched = []
+
+    def write(self, item_id, embedding=None, tags=None, model=EMBEDDING_MODEL_NAME, delete=False):
+        self.version += 1
+        if delete:
+            self.items.pop(item_id, None)
+        else:
+            self.items[item_id] = (embedding, tags, model)
+        self.changes.append((self.version, item_id))
+
+    # Session.execute - odczyt wersji z corpus_state
+    def execute(self, statement):
+        return self
+
+    def scalar(self):
+        return self.version
+
+    def exec(self, statement):
+        sql = str(statement)
+        params = statement.compile().params
+        if "corpus_change" in sql:
+            low, high = params["version_1"], params["version_2"]
+            return Rows(sorted({item_id for version, item_id in self.changes if low < version <= high}))
+        if "count(" in sql:
+            return Rows([sum(1 for embedding, _, model in self.items.values() if embedding is not None and model == EMBEDDING_MODEL_NAME)])
+        ids = params.get("id_1")
+        self.fetched.append(ids)
+        rows = []
+        for item_id, (embedding, tags, model) in self.items.items():
+            if ids is not None and item_id not in ids:
+                continue
+            active = model == EMBEDDING_MODEL_NAME
+            rows.append((item_id, embedding if active else None, tags if active else None))
+        return Rows(rows)
+
+
+class Rows(list):
+    def all(self):
+        return list(self)
+
+    def one(self):
+        return self[0]
+
+
+def test_sync_fetches_only_changed_items():
+    db = FakeDatabase()
+    for item_id in range(1, 6):
+        db.write(item_id, np.full(DIM, item_id, dtype=np.float32))
+    index = VectorIndex(dim=DIM)
+    index.sync(db) # Pierwsza synchronizacja - pełne ładowanie
+    assert len(index) == 5 and index.version == 5
+    assert db.fetched == [None]
+
+    db.write(2, np.ones(DIM), tags=np.ones(DIM)) # Zmiana
+    db.write(3, delete=True) # Usunięcie - zostaje wpis w dzienniku
+    db.write(6, np.ones(DIM)) # Nowy element
+    db.write(4, np.ones(DIM), model="inny-model") # Przeliczony innym modelem - znika z indeksu
+    index.sync(db)
+
+    assert index.version == 9
+    assert sorted(db.fetched[-1]) == [2, 3, 4, 6]
+    assert sorted(index._rows) == [1, 2, 5, 6]
+    assert index.similarities([2], np.ones(DIM))[2][1] == pytest.approx(1.0)
+
+    fetches = len(db.fetched)
+    index.sync(db) # Bez zmian w bazie - tylko odczyt wersji
+    assert len(db.fetched) == fetches
+
+
+def test_sync_reloads_when_log_was_pruned(monkeypatch):
+    from app import vector_index
+
+    monkeypatch.setattr(vector_index, "CORPUS_CHANGE_RETENTION", 2)
+    db = FakeDatabase()
+    db.write(1, np.ones(DIM))
+    index = VectorIndex(dim=DIM)
+    index.sync(db)
+    for item_id in range(2, 6):
+        db.write(item_id, np.ones(DIM))
+
+    index.sync(db)
+
+    assert db.fetched[-1] is None # Pełne ładowanie zamiast dziennika
+    assert len(index) == 5 and index.version == 5
@@ -35,6 +35,7 @@ const App: React.FC = () => {
   const [simpleToasts, setSimpleToasts] = useState<{ id: string; type: ToastType; message: string }[]>([]);
   const [filteredItems, setFilteredItems] = useState<KnowledgeItem[]>([]);
   const [editingItem, setEditingItem] = useState<KnowledgeItem | null>(null);
+  const [availableTags, setAvailableTags] = useState<string[]>([]);
   const debounceTimeout = useRef<NodeJS.Timeout | null>(null);
 
   // Load knowledge items
@@ -184,6 +185,18 @@ const App: React.FC = () => {
     }
   };
 
+  // Lista ma tylko podgląd treści - szczegóły pobieramy pełne z backendu
+  const handleOpenItem = async (id: number) => {
+    try {
+      setSelectedItem(await apiService.getKnowledgeItem(id));
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : 'Failed to load item';
+      addSimpleToast('error', errorMessage);
+    }
+  };
+
+  const handleViewItem = (item: KnowledgeItem) => handleOpenItem(item.id);
+
   const getViewTitle = () => {
     switch (activeView) {
       case 'all': return 'Asystent Wiedzy';
@@ -193,7 +206,12 @@ const App: React.FC = () => {
     }
   };
 
-  const availableTags = Array.from(new Set(knowledgeItems.flatMap(item => item.tags))).sort();
+  // Lista tagów z backendu (liczniki utrzymywane w bazie) - odświeżana po każdej zmianie elementów
+  useEffect(() => {
+    apiService.getTags()
+      .then(tags => setAvailableTags(tags.map(tag => tag.tag).sort()))
+      .catch(err => console.error('Failed to load tags:', err));
+  }, [knowledgeItems]);
 
   // SEMANTIC SEARCH z debounce - optymalizowane
   useEffect(() => {
@@ -204,7 +222,7 @@ const App: React.FC = () => {
     if (searchQuery.trim()) {
       debounceTimeout.current = setTimeout(async () => {
         try {
-          const results = await apiService.semanticSearch(searchQuery, 50);
+          const results = await apiService.semanticSearch(searchQuery, 50, filters.tags);
           const filteredResults = filterKnowledgeItems(results, '', filters);
           setFilteredItems(filteredResults);
         } catch (err) {
@@ -319,6 +337,7 @@ const App: React.FC = () => {
                     onBack={() => setSelectedItem(null)}
                     onEdit={item => setEditingItem(item)}
                     onDelete={handleDeleteItem}
+                    onOpenRelated={handleOpenItem}
                   />
               ) : (
                 <div className="item-list">
@@ -376,7 +395,7 @@ const App: React.FC = () => {
                           item={item}
                           onEdit={() => console.log('Edit item:', item)}
                           onDelete={handleDeleteItem}
-                          onView={setSelectedItem} // <- to wywoła KnowledgeItemDetail
+                          onView={handleViewItem} // <- to wywoła KnowledgeItemDetail
                         />
                       ))}
                     </div>
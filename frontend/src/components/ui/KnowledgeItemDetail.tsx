@@ -1,6 +1,6 @@
 import { ArrowLeft, Calendar, Download, Edit, FileText, Trash2 } from 'lucide-react';
-import React from 'react';
-import { KnowledgeItem } from '../../services/api';
+import React, { useEffect, useState } from 'react';
+import { apiService, KnowledgeItem, RelatedItem } from '../../services/api';
 import '../../styles/KnowledgeItemDetail.css';
 
 interface KnowledgeItemDetailProps {
@@ -8,6 +8,7 @@ interface KnowledgeItemDetailProps {
   onBack: () => void;
   onEdit: (item: KnowledgeItem) => void;
   onDelete: (id: number) => void;
+  onOpenRelated?: (id: number) => void;
 }
 
 const handleDownloadPdf = async (itemId: number, isNote = false) => {
@@ -100,7 +101,18 @@ const testEndpoint = async (itemId: number, isNote = false) => {
   }
 };
 
-const KnowledgeItemDetail: React.FC<KnowledgeItemDetailProps> = ({ item, onBack, onEdit, onDelete }) => {
+const KnowledgeItemDetail: React.FC<KnowledgeItemDetailProps> = ({ item, onBack, onEdit, onDelete, onOpenRelated }) => {
+  const [related, setRelated] = useState<RelatedItem[]>([]);
+
+  // Powiązane elementy to gotowa lista z backendu - jedno lekkie zapytanie na widok
+  useEffect(() => {
+    let cancelled = false;
+    apiService.getRelatedItems(item.id)
+      .then(items => { if (!cancelled) setRelated(items); })
+      .catch(() => { if (!cancelled) setRelated([]); });
+    return () => { cancelled = true; };
+  }, [item.id, item.updated_at]);
+
   return (
     <div className="item-details">
       <div className="item-details__header">
@@ -187,6 +199,25 @@ const KnowledgeItemDetail: React.FC<KnowledgeItemDetailProps> = ({ item, onBack,
           )}
         </div>
       </div>
+      {related.length > 0 && (
+        <div className="item-details__related">
+          <h3 className="item-details__related-title">Powiązane</h3>
+          <ul className="item-details__related-list">
+            {related.map(relatedItem => (
+              <li key={relatedItem.id}>
+                <button
+                  className="item-details__related-item"
+                  onClick={() => onOpenRelated?.(relatedItem.id)}
+                >
+                  {relatedItem.original_filename && <FileText className="item-details__meta-icon" />}
+                  {relatedItem.title}
+                  <span className="item-details__related-score">{Math.round(relatedItem.similarity * 100)}%</span>
+                </button>
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
       <div className="item-details__footer">
         <div className="item-details__footer-meta">
           <span>ID: {item.id}</span>
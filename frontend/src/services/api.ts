@@ -9,10 +9,45 @@ export interface KnowledgeItem {
   tags: string[];
   embedding?: number[]; // Wektory embeddings dla wyszukiwania semantycznego
   tags_embedding?: number[]; // Wektory embeddings dla tagów
+  matched_pages?: number[]; // Strony PDF z pasującymi fragmentami (tylko wyniki wyszukiwania)
+  content_length?: number; // Długość pełnej treści (lista zwraca w text_content tylko podgląd)
   created_at: string;
   updated_at: string;
 }
 
+// Powiązany element (bez treści) z podobieństwem do oglądanego elementu
+export interface RelatedItem {
+  id: number;
+  title: string;
+  original_filename?: string;
+  tags: string[];
+  similarity: number;
+}
+
+// Tag z liczbą elementów (GET /api/tags)
+export interface TagCount {
+  tag: string;
+  item_count: number;
+}
+
+// Wynik wyszukiwania - bez pełnej treści; snippety to HTML z <mark> wokół słów zapytania
+export interface SearchHit {
+  id: number;
+  title: string;
+  original_filename?: string;
+  tags: string[];
+  created_at: string;
+  updated_at: string;
+  content_length: number;
+  score: number;
+  snippets: string[];
+  matched_pages: number[];
+}
+
+// Snippet jako zwykły tekst (karty listy nie renderują HTML)
+const snippetText = (snippet: string) =>
+  snippet.replace(/<\/?mark>/g, '').replace(/&lt;/g, '<').replace(/&gt;/g, '>').replace(/&amp;/g, '&');
+
 // Interfejs dla żądania utworzenia notatki tekstowej
 export interface CreateTextItemRequest {
   title: string;
@@ -81,9 +116,42 @@ class ApiService {
     return this.request('/health');
   }
 
-  // Pobieranie wszystkich elementów wiedzy z backendu
-  async getKnowledgeItems(): Promise<KnowledgeItem[]> {
-    return this.request('/api/knowledge_items');
+  // Pobieranie wszystkich elementów wiedzy z backendu (stronami, kursorem after_id).
+  // Lista zawiera tylko podgląd treści - pełny element pobiera getKnowledgeItem.
+  async getKnowledgeItems(pageSize = 200): Promise<KnowledgeItem[]> {
+    const items: KnowledgeItem[] = [];
+    let afterId: number | undefined;
+    while (true) {
+      const params = new URLSearchParams({ limit: pageSize.toString() });
+      if (afterId !== undefined) {
+        params.set('after_id', afterId.toString());
+      }
+      const page = await this.request<KnowledgeItem[]>(`/api/knowledge_items?${params.toString()}`);
+      items.push(...page);
+      if (page.length < pageSize) {
+        return items;
+      }
+      afterId = page[page.length - 1].id;
+    }
+  }
+
+  // Tagi z liczbą elementów - liczone na backendzie, bez pobierania całej listy
+  async getTags(prefix = '', limit = 1000): Promise<TagCount[]> {
+    const params = new URLSearchParams({ limit: limit.toString() });
+    if (prefix) {
+      params.set('prefix', prefix);
+    }
+    return this.request(`/api/tags?${params.toString()}`);
+  }
+
+  // Pobieranie pełnego elementu wiedzy po id
+  async getKnowledgeItem(id: number): Promise<KnowledgeItem> {
+    return this.request(`/api/knowledge_items/${id}`);
+  }
+
+  // Powiązane elementy - lista liczona wcześniej na backendzie
+  async getRelatedItems(id: number, k = 5): Promise<RelatedItem[]> {
+    return this.request(`/api/knowledge_items/${id}/related?k=${k}`);
   }
 
   // Przesyłanie nowej notatki tekstowej
@@ -162,14 +230,18 @@ class ApiService {
   }
 
   // Wyszukiwanie semantyczne po embeddingach
-  async semanticSearch(query: string, topK = 10): Promise<KnowledgeItem[]> {
+  async semanticSearch(query: string, topK = 10, tags: string[] = []): Promise<KnowledgeItem[]> {
     const params = new URLSearchParams({ 
       query, 
       top_k: topK.toString()
       // threshold używa domyślnej wartości z backendu (0.5)
     });
-    const result = await this.request<KnowledgeItem[]>(`/api/knowledge_items/semantic_search?${params.toString()}`);
-    return result;
+    if (tags.length > 0) {
+      params.set('tags', tags.join(',')); // Filtr w SQL - element musi mieć co najmniej jeden z tagów
+    }
+    const hits = await this.request<SearchHit[]>(`/api/knowledge_items/semantic_search?${params.toString()}`);
+    // Karty pokazują snippety zamiast treści - pełny element pobiera getKnowledgeItem po kliknięciu
+    return hits.map(hit => ({ ...hit, text_content: hit.snippets.map(snippetText).join(' ... ') }));
   }
 }
 